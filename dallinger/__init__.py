@@ -1,23 +1,9 @@
 """This is Dallinger, a platform for simulating evolution with people."""
 
 import logging
+from importlib import import_module
 from logging import NullHandler
 
-from . import (
-    bots,
-    command_line,
-    config,
-    experiment,
-    experiments,
-    heroku,
-    information,
-    models,
-    networks,
-    nodes,
-    processes,
-    registration,
-    transformations,
-)
 from .patches import patch
 
 logger = logging.getLogger(__name__)
@@ -41,3 +27,16 @@ __all__ = (
     "registration",
     "logger",
 )
+
+
+def __getattr__(name):
+    """Import submodules like ``dallinger.experiment`` when they are first
+    used, so that the command line and workers only import what they need.
+    """
+    if not name.startswith("_"):
+        try:
+            return import_module("{}.{}".format(__name__, name))
+        except ModuleNotFoundError as err:
+            if err.name != "{}.{}".format(__name__, name):
+                raise
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,339 @@
+"""Benchmark the experiment server with scripted participants.
+
+``dallinger benchmark`` runs the experiment server in process, against the
+local Postgres and redis, and drives it with participants following one of
+the scripted :data:`FLOWS`, modelled on the demos. The latency and number of
+SQL statements of every request are recorded, along with the number of
+serializable transactions which had to be retried, and the results are
+written as a JSON report which can be compared with a report from another
+commit.
+"""
+
+import logging
+import os
+import random
+import subprocess
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from json import dumps
+
+from psycopg2.extensions import TransactionRollbackError
+from sqlalchemy import event
+from werkzeug.exceptions import HTTPException
+
+from dallinger.utils import generate_random_id, latency_percentiles
+from dallinger.version import __version__
+
+logger = logging.getLogger(__file__)
+
+#: Scripted participant behaviours, by name. Each is a function taking a
+#: :class:`ScriptedParticipant` and the number of trials to attempt.
+FLOWS = OrderedDict()
+
+
+def flow(name):
+    """Register a participant flow under ``name``."""
+
+    def register(func):
+        FLOWS[name] = func
+        return func
+
+    return register
+
+
+class ScriptedParticipant(object):
+    """A participant driving the experiment server through a benchmark."""
+
+    def __init__(self, benchmark):
+        self.benchmark = benchmark
+        self.id = None
+
+    def request(self, method, path, data=None):
+        """Make a request, returning the decoded JSON response, or ``None``
+        if the request failed.
+        """
+        response = self.benchmark.request(method, path, data=data)
+        if response.status_code >= 400:
+            return None
+        if response.mimetype == "application/json" and response.data:
+            return response.get_json()
+        return {}
+
+    def sign_up(self):
+        path = "/participant/{}/{}/{}/debug?fingerprint_hash={}&recruiter=hotair"
+        path = path.format(
+            generate_random_id(),
+            generate_random_id(),
+            generate_random_id(),
+            uuid.uuid4().hex,
+        )
+        data = self.request("POST", path)
+        if data is None:
+            return False
+        self.id = data["participant"]["id"]
+        return True
+
+    def create_node(self):
+        """Create a node, returning its id, or ``None`` once the participant
+        has no network left to join.
+        """
+        data = self.request("POST", "/node/{}".format(self.id))
+        if data is None:
+            return None
+        return data["node"]["id"]
+
+    def create_info(self, node_id, contents, info_type="Info", **fields):
+        fields.update(contents=contents, info_type=info_type)
+        data = self.request("POST", "/info/{}".format(node_id), data=fields)
+        return data and data["info"]["id"]
+
+    def sign_off(self):
+        self.request(
+            "POST",
+            "/question/{}".format(self.id),
+            data={
+                "question": "questionnaire",
+                "number": 1,
+                "response": dumps({"engagement": 4, "difficulty": 3}),
+            },
+        )
+        self.request("GET", "/worker_complete?participant_id={}".format(self.id))
+
+
+@flow("chain")
+def chain_flow(participant, trials):
+    """Read the story from the previous participant and retell it, as in
+    the bartlett1932 demo.
+    """
+    for _ in range(trials):
+        node_id = participant.create_node()
+        if node_id is None:
+            break
+        participant.request("GET", "/node/{}/received_infos".format(node_id))
+        participant.create_info(node_id, "A retold story. " * 20)
+
+
+@flow("chatroom")
+def chatroom_flow(participant, trials):
+    """Post a message per trial and poll for those of other participants, as
+    in the chatroom demo.
+    """
+    node_id = participant.create_node()
+    if node_id is None:
+        return
+    for i in range(trials):
+        participant.create_info(node_id, "Message {}".format(i))
+        data = participant.request(
+            "GET", "/node/{}/transmissions?status=pending".format(node_id)
+        )
+        for transmission in (data or {}).get("transmissions", []):
+            participant.request(
+                "GET", "/info/{}/{}".format(node_id, transmission["info_id"])
+            )
+
+
+@flow("mcmcp")
+def mcmcp_flow(participant, trials):
+    """Choose between the node's infos, as in the mcmcp demo."""
+    for _ in range(trials):
+        node_id = participant.create_node()
+        if node_id is None:
+            break
+        participant.request("GET", "/node/{}/infos".format(node_id))
+        participant.request(
+            "POST", "/choice/{}/{}".format(node_id, random.choice([0, 1]))
+        )
+
+
+@flow("rogers")
+def rogers_flow(participant, trials):
+    """Read the node's genes and received infos, then report a meme, as in
+    the rogers demo.
+    """
+    for _ in range(trials):
+        node_id = participant.create_node()
+        if node_id is None:
+            break
+        participant.request(
+            "GET", "/node/{}/infos?info_type=LearningGene".format(node_id)
+        )
+        participant.request("GET", "/node/{}/received_infos".format(node_id))
+        participant.create_info(node_id, random.choice(["blue", "yellow"]), "Meme")
+
+
+@flow("info")
+def info_flow(participant, trials):
+    """Post infos with details and every property to one node, to measure
+    the throughput of ``/info`` POST requests on their own.
+    """
+    node_id = participant.create_node()
+    if node_id is None:
+        return
+    for i in range(trials):
+        participant.create_info(
+            node_id,
+            "Info {}".format(i),
+            details=dumps({"trial": i}),
+            **{"property{}".format(n): str(n) for n in range(1, 6)},
+        )
+
+
+class Benchmark(object):
+    """Run scripted participants through an experiment server app.
+
+    :param app: the experiment server's Flask app
+    :param engine: the SQLAlchemy engine the app uses
+    :param flow: the name of one of the :data:`FLOWS`
+    :param participants: the number of participants to run
+    :param trials: the number of trials each participant attempts, for
+        flows with repeated trials
+    """
+
+    def __init__(self, app, engine, flow="chain", participants=20, trials=5):
+        if flow not in FLOWS:
+            raise ValueError(
+                "Unknown flow {}; choose from {}".format(flow, ", ".join(FLOWS))
+            )
+        self.app = app
+        self.engine = engine
+        self.flow = flow
+        self.participants = participants
+        self.trials = trials
+        self.client = app.test_client()
+        self.urls = app.url_map.bind("localhost")
+        self.statements = 0
+        self.retries = 0
+        self.latencies = defaultdict(list)
+        self.statement_counts = defaultdict(list)
+        self.route_retries = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.elapsed = None
+
+    def _count_statement(self, *args):
+        self.statements += 1
+
+    def _count_retry(self, context):
+        if isinstance(context.original_exception, TransactionRollbackError):
+            self.retries += 1
+
+    def route_for(self, method, path):
+        """Name the route matching ``path``, e.g. ``POST /info/<int:node_id>``."""
+        try:
+            rule, _ = self.urls.match(
+                path.split("?")[0], method=method, return_rule=True
+            )
+        except HTTPException:
+            return "{} {}".format(method, path.split("?")[0])
+        return "{} {}".format(method, rule.rule)
+
+    def request(self, method, path, data=None):
+        """Make a timed request, recording its statements and retries."""
+        statements, retries = self.statements, self.retries
+        start = time.monotonic()
+        response = self.client.open(path, method=method, data=data)
+        seconds = time.monotonic() - start
+
+        route = self.route_for(method, path)
+        self.latencies[route].append(seconds)
+        self.statement_counts[route].append(self.statements - statements)
+        self.route_retries[route] += self.retries - retries
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def run(self):
+        """Run all the participants, one after another."""
+        event.listen(self.engine, "before_cursor_execute", self._count_statement)
+        event.listen(self.engine, "handle_error", self._count_retry)
+        start = time.monotonic()
+        try:
+            for _ in range(self.participants):
+                participant = ScriptedParticipant(self)
+                if not participant.sign_up():
+                    continue
+                FLOWS[self.flow](participant, self.trials)
+                participant.sign_off()
+        finally:
+            self.elapsed = time.monotonic() - start
+            event.remove(self.engine, "before_cursor_execute", self._count_statement)
+            event.remove(self.engine, "handle_error", self._count_retry)
+
+    def report(self):
+        """Return the results as a JSON-serializable dict."""
+        routes = OrderedDict()
+        for route in sorted(self.latencies):
+            latencies = sorted(self.latencies[route])
+            statements = self.statement_counts[route]
+            row = OrderedDict()
+            row["requests"] = len(latencies)
+            row["errors"] = self.errors[route]
+            row.update(latency_percentiles(latencies))
+            row["mean_statements"] = sum(statements) / float(len(statements))
+            row["max_statements"] = max(statements)
+            row["serialization_retries"] = self.route_retries[route]
+            routes[route] = row
+
+        requests = sum(row["requests"] for row in routes.values())
+        return OrderedDict(
+            [
+                ("dallinger_version", __version__),
+                ("commit", _current_commit()),
+                ("created", datetime.now().isoformat()),
+                ("flow", self.flow),
+                ("participants", self.participants),
+                ("trials", self.trials),
+                ("requests", requests),
+                ("errors", sum(self.errors.values())),
+                ("elapsed_seconds", self.elapsed),
+                ("requests_per_second", requests / self.elapsed),
+                ("statements", self.statements),
+                ("serialization_retries", self.retries),
+                ("routes", routes),
+            ]
+        )
+
+
+def compare(baseline, current):
+    """Compare two benchmark reports route by route.
+
+    Returns rows of the route name, the p95 latency in each report and
+    the relative change, and the mean statement count in each report.
+    """
+    rows = []
+    for route in sorted(set(baseline["routes"]) | set(current["routes"])):
+        before = baseline["routes"].get(route, {})
+        after = current["routes"].get(route, {})
+        p95_before = before.get("p95_ms")
+        p95_after = after.get("p95_ms")
+        change = None
+        if p95_before and p95_after is not None:
+            change = (p95_after - p95_before) / p95_before
+        rows.append(
+            [
+                route,
+                p95_before,
+                p95_after,
+                change,
+                before.get("mean_statements"),
+                after.get("mean_statements"),
+            ]
+        )
+    return rows
+
+
+def _current_commit():
+    """The git commit of the Dallinger checkout being benchmarked, if any."""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode("utf8")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
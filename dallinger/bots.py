@@ -8,6 +8,7 @@ import uuid
 import gevent
 import requests
 from cached_property import cached_property
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from selenium import webdriver
 from selenium.common.exceptions import TimeoutException
@@ -29,6 +30,37 @@ CAPABILITY_MAP = {
     "chrome_headless": webdriver.DesiredCapabilities.CHROME,
 }
 
+# The number of connections to each host kept open by a shared HTTP session.
+DEFAULT_MAX_CONNECTIONS = 10
+
+_http_session = None
+
+
+def pooled_session(max_connections=DEFAULT_MAX_CONNECTIONS, session_class=None):
+    """Build a ``requests`` session whose connection pool holds
+    ``max_connections`` keep-alive connections per host.
+
+    When the pool is exhausted, requests wait for a free connection rather
+    than opening more sockets.
+    """
+    session = (session_class or requests.Session)()
+    adapter = HTTPAdapter(
+        pool_connections=max_connections,
+        pool_maxsize=max_connections,
+        pool_block=True,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def shared_session():
+    """Return the pooled HTTP session shared by bots in this process."""
+    global _http_session
+    if _http_session is None:
+        _http_session = pooled_session()
+    return _http_session
+
 
 class BotBase(object):
     """A base class for bots that works with the built-in demos.
@@ -232,12 +264,31 @@ class HighPerformanceBotBase(BotBase):
     """A base class for bots that do not interact using a real browser.
 
     Instead, this kind of bot makes requests directly to the experiment server.
+    Requests go through :attr:`http`, a keep-alive session shared by the bots
+    in a process, so that many bots can run concurrently in one process (see
+    :mod:`dallinger.loadtest`).
     """
 
+    #: Whether to listen on the quorum channel before signing up. This
+    #: needs a connection to the experiment's redis.
+    listen_for_quorum = True
+
+    #: The minimum delay, in seconds, before retrying a failed request.
+    min_retry_delay = 10.0
+
+    #: A function returning the number of seconds to pause between the
+    #: phases of the experiment, or ``None`` to move straight on.
+    think_time = None
+
     @property
     def driver(self):
         raise NotImplementedError
 
+    @cached_property
+    def http(self):
+        """The HTTP session used to talk to the experiment server."""
+        return shared_session()
+
     @property
     def host(self):
         parsed = urllib.parse.urlparse(self.URL)
@@ -248,19 +299,27 @@ class HighPerformanceBotBase(BotBase):
         including signup, participation, signoff, and recording completion.
         """
         self.sign_up()
+        self.think()
         self.participate()
+        self.think()
         if self.sign_off():
             self.complete_experiment("worker_complete")
         else:
             self.complete_experiment("worker_failed")
 
+    def think(self):
+        """Pause for a sampled think time, if one is configured."""
+        if self.think_time is not None:
+            gevent.sleep(self.think_time())
+
     def sign_up(self):
         """Signs up a participant for the experiment.
 
         This is done using a POST request to the /participant/ endpoint.
         """
         self.log("Bot player signing up.")
-        self.subscribe_to_quorum_channel()
+        if self.listen_for_quorum:
+            self.subscribe_to_quorum_channel()
         while True:
             url = (
                 "{host}/participant/{self.worker_id}/"
@@ -273,7 +332,7 @@ class HighPerformanceBotBase(BotBase):
                 )
             )
             try:
-                result = requests.post(url)
+                result = self.http.post(url)
                 result.raise_for_status()
             except RequestException:
                 self.stochastic_sleep()
@@ -306,7 +365,7 @@ class HighPerformanceBotBase(BotBase):
                 host=self.host, participant_id=self.participant_id, status=status
             )
             try:
-                result = requests.get(url)
+                result = self.http.get(url)
                 result.raise_for_status()
             except RequestException:
                 self.stochastic_sleep()
@@ -314,7 +373,7 @@ class HighPerformanceBotBase(BotBase):
             return result
 
     def stochastic_sleep(self):
-        delay = max(1.0 / random.expovariate(0.5), 10.0)
+        delay = max(1.0 / random.expovariate(0.5), self.min_retry_delay)
         gevent.sleep(delay)
 
     def subscribe_to_quorum_channel(self):
@@ -349,7 +408,7 @@ class HighPerformanceBotBase(BotBase):
                 host=self.host, self=self
             )
             try:
-                result = requests.post(url, data=data)
+                result = self.http.post(url, data=data)
                 result.raise_for_status()
             except RequestException:
                 self.stochastic_sleep()
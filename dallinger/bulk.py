@@ -0,0 +1,149 @@
+"""Run many remote API calls concurrently, with rate limiting and retries.
+
+Recruitment services like MTurk and Prolific throttle callers who exceed
+their request rate, so bulk operations (qualifying thousands of workers,
+paying bonuses, etc.) are executed through a bounded thread pool, with a
+shared token bucket limiting the request rate and throttled calls retried
+with exponential backoff.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__file__)
+
+DEFAULT_MAX_WORKERS = 10
+
+
+#: The outcome of a single call in a bulk operation. Exactly one of ``result``
+#: and ``error`` is meaningful: ``error`` is the exception raised by the final
+#: attempt, or ``None`` if the call succeeded.
+BulkResult = namedtuple("BulkResult", ["args", "kwargs", "result", "error"])
+
+
+class TokenBucket(object):
+    """A thread-safe token bucket rate limiter.
+
+    Tokens accumulate at ``rate`` per second, up to ``capacity``; each call
+    to ``acquire()`` consumes one, blocking until one is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BulkExecutor(object):
+    """Call a function many times concurrently.
+
+    :param max_workers: the number of calls in flight at once
+    :param rate: the maximum number of calls started per second, or ``None``
+        for no limit
+    :param is_retryable: a predicate on exceptions, returning ``True`` for
+        errors (typically throttling) after which the call should be retried
+    :param max_attempts: the number of attempts per call before giving up
+    :param backoff: the base delay in seconds between retries, doubled after
+        each attempt, with random jitter
+    """
+
+    def __init__(
+        self,
+        max_workers=DEFAULT_MAX_WORKERS,
+        rate=None,
+        is_retryable=lambda ex: False,
+        max_attempts=5,
+        backoff=1.0,
+    ):
+        self.max_workers = max_workers
+        self.limiter = TokenBucket(rate) if rate else None
+        self.is_retryable = is_retryable
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def call(self, func, *args, **kwargs):
+        """Call ``func`` once, subject to the rate limit and retry policy."""
+        attempt = 1
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as ex:
+                if attempt >= self.max_attempts or not self.is_retryable(ex):
+                    raise
+                delay = self.backoff * 2 ** (attempt - 1)
+                delay += random.uniform(0, delay)
+                logger.warning(
+                    "Retrying {} in {:.1f}s after attempt {} failed: {}".format(
+                        getattr(func, "__name__", func), delay, attempt, ex
+                    )
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def imap(self, func, calls):
+        """Run ``func`` for each ``(args, kwargs)`` pair in ``calls``,
+        yielding a :data:`BulkResult` for each as it completes, in the order
+        of ``calls``.
+
+        Errors are captured in the results rather than raised, so one failed
+        call does not abandon the rest.
+        """
+
+        def run(args, kwargs):
+            try:
+                return BulkResult(args, kwargs, self.call(func, *args, **kwargs), None)
+            except Exception as ex:
+                return BulkResult(args, kwargs, None, ex)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(run, args, kwargs) for args, kwargs in calls]
+            for future in futures:
+                yield future.result()
+
+    def map(self, func, calls):
+        """Like :meth:`imap`, but return a list of all the results."""
+        return list(self.imap(func, calls))
+
+
+def paginate(method, result_key, token_key="NextToken", **kwargs):
+    """Stream the items of a paginated list operation.
+
+    ``method`` is called with ``kwargs`` and, after the first page, with the
+    pagination token from the previous response. Items under ``result_key``
+    are yielded one at a time, so callers can stop early without fetching
+    further pages.
+    """
+    next_token = None
+    while True:
+        if next_token is not None:
+            response = method(**dict(kwargs, **{token_key: next_token}))
+        else:
+            response = method(**kwargs)
+        if response:
+            for item in response[result_key]:
+                yield item
+        next_token = response.get(token_key) if response else None
+        if next_token is None:
+            return
@@ -0,0 +1,310 @@
+"""A content-addressed cache for the files of experiment bundles.
+
+Each ``debug``, ``sandbox``, ``deploy`` and docker command assembles a new
+bundle directory of experiment and Dallinger files (see
+:func:`dallinger.utils.assemble_experiment_temp_dir`). Large files are stored
+once in the cache, named by the hash of their contents, and hard-linked into
+each bundle rather than copied. Each bundle gets a manifest of its files'
+hashes, which is reused to tag docker images, and the Dallinger distribution
+built from an editable install is reused until its sources change.
+
+Set the environment variable ``DALLINGER_NO_BUNDLE_CACHE`` to disable the
+cache, or ``DALLINGER_BUNDLE_CACHE`` to the directory to keep it in.
+"""
+
+import errno
+import json
+import os
+import shutil
+import tempfile
+import time
+from hashlib import sha256
+from pathlib import Path
+
+#: The name of the manifest written to each bundle.
+MANIFEST_NAME = "bundle_manifest.json"
+#: Files at least this large are hard-linked from the cache; smaller ones are
+#: copied, so they can still be written to in place.
+LINK_MIN_SIZE = 64 * 1024
+#: Seconds after which cached files no bundle links to are removed.
+OBJECT_MAX_AGE = 24 * 60 * 60
+#: The number of Dallinger distributions kept.
+KEEP_DISTRIBUTIONS = 3
+#: Files modified this recently are hashed again next time, since a later
+#: change might not alter their modification time.
+RACY_SECONDS = 2
+
+#: Files in a Dallinger checkout which don't affect the distribution built.
+SOURCE_EXCLUSIONS = shutil.ignore_patterns(
+    ".git", ".pytest_cache", "__pycache__", "*.pyc", "*.egg-info"
+)
+#: Directories at the top of a Dallinger checkout which don't affect the
+#: distribution built.
+SOURCE_TOP_LEVEL_EXCLUSIONS = {
+    ".tox",
+    ".venv",
+    "build",
+    "demos",
+    "dist",
+    "node_modules",
+    "tests",
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def enabled():
+    return not os.environ.get("DALLINGER_NO_BUNDLE_CACHE")
+
+
+def default_root():
+    """The cache directory, which is private to the user and shares the
+    filesystem of the temporary directories bundles are assembled in, so
+    that files can be hard-linked into them.
+    """
+    root = os.environ.get("DALLINGER_BUNDLE_CACHE")
+    if root:
+        return Path(root)
+    user = os.getuid() if hasattr(os, "getuid") else os.getlogin()
+    return Path(tempfile.gettempdir()) / "dallinger-bundle-cache-{}".format(user)
+
+
+def hash_file(path):
+    """The hex SHA-256 digest of the contents of the file at ``path``."""
+    digest = sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _signature(stat):
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+def file_digests(bundle_dir, names):
+    """The hex SHA-256 digests of the files ``names`` in ``bundle_dir``,
+    taken from its manifest for files unchanged since it was written.
+    """
+    try:
+        manifest = json.loads((Path(bundle_dir) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    digests = []
+    for name in names:
+        path = Path(bundle_dir) / name
+        entry = manifest.get(name)
+        if entry and entry[:3] == _signature(path.stat()):
+            digests.append(entry[3])
+        else:
+            digests.append(hash_file(path))
+    return digests
+
+
+def manifest_signature(bundle_dir):
+    """The stat signature of the manifest of the bundle at ``bundle_dir``,
+    which changes whenever the bundle is assembled again, or ``None`` if it
+    has no manifest.
+    """
+    try:
+        return _signature(os.stat(os.path.join(bundle_dir, MANIFEST_NAME)))
+    except OSError:
+        return None
+
+
+class BundleCache(object):
+    """The files cached for assembling bundles, and the hashes of files
+    they were copied from, keyed by path and stat signature.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.distributions = self.root / "distributions"
+        self.hashes_path = self.root / "hashes.json"
+        self.hashes = {}
+        self.placed = {}
+
+    @classmethod
+    def open(cls, log=None):
+        """The user's cache, or ``None`` if it is disabled or its directory
+        is not safe to use.
+        """
+        if not enabled():
+            return None
+        root = default_root()
+        try:
+            root.mkdir(mode=0o700, parents=True, exist_ok=True)
+            stat = os.lstat(root)
+        except OSError as err:
+            if log:
+                log("Not caching bundle files: {}".format(err))
+            return None
+        if os.path.islink(root) or (
+            hasattr(os, "getuid")
+            and (stat.st_uid != os.getuid() or stat.st_mode & 0o022)
+        ):
+            if log:
+                log("Not caching bundle files in unsafe directory {}".format(root))
+            return None
+        cache = cls(root)
+        cache.load()
+        return cache
+
+    def load(self):
+        try:
+            self.hashes = json.loads(self.hashes_path.read_text())
+        except (OSError, ValueError):
+            self.hashes = {}
+
+    def save(self):
+        """Record the hashes of source files, forgetting those which no
+        longer exist, and remove stale cached files.
+        """
+        self.hashes = {
+            path: entry for path, entry in self.hashes.items() if os.path.exists(path)
+        }
+        self._write_atomically(self.hashes_path, json.dumps(self.hashes).encode())
+        self.prune()
+
+    def digest(self, path):
+        """The hex SHA-256 digest of the file at ``path``, hashed again only
+        if it has changed since it was last hashed.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = _signature(stat)
+        entry = self.hashes.get(path)
+        if entry and entry[:3] == signature:
+            return entry[3]
+        digest = hash_file(path)
+        if time.time() - stat.st_mtime > RACY_SECONDS:
+            self.hashes[path] = signature + [digest]
+        return digest
+
+    def place(self, from_path, to_path):
+        """Put the file ``from_path`` at ``to_path``, hard-linking large
+        files from the cache. Suitable as the ``copy_func`` of
+        :meth:`dallinger.utils.FileSource.apply_to`.
+        """
+        digest = self.digest(from_path)
+        if os.path.getsize(from_path) < LINK_MIN_SIZE:
+            shutil.copyfile(from_path, to_path)
+        else:
+            cached = self.objects / digest[:2] / digest
+            if not cached.exists():
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                with open(from_path, "rb") as f:
+                    self._write_atomically(cached, f, mode=0o444)
+            self._link(cached, to_path)
+        self.placed[os.path.abspath(to_path)] = digest
+
+    def build_and_place(self, source, destination, build):
+        """Place a distribution of the package at ``source`` in
+        ``destination``, calling ``build(source, directory)`` to build one
+        only if the source has changed since the last build.
+
+        Returns the file name of the distribution.
+        """
+        cached = self.distributions / self.tree_digest(
+            source, SOURCE_EXCLUSIONS, SOURCE_TOP_LEVEL_EXCLUSIONS
+        )
+        if not cached.is_dir():
+            self.distributions.mkdir(parents=True, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=".build-", dir=self.distributions)
+            try:
+                build(source, staging)
+                os.replace(staging, cached)
+            except OSError as err:
+                # Another process cached the same build first.
+                if err.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        os.utime(cached)
+        (name,) = os.listdir(cached)
+        self._link(cached / name, os.path.join(destination, name))
+        return name
+
+    def tree_digest(self, root, ignore=None, top_level_ignored=()):
+        """A hex SHA-256 digest of the names and contents of the files under
+        ``root``, leaving out those matched by ``ignore``, a callable like
+        those made by :func:`shutil.ignore_patterns`, and the names
+        ``top_level_ignored`` directly under ``root``.
+        """
+        digest = sha256()
+        for dirpath, dirnames, filenames in os.walk(root, topdown=True):
+            ignored = set(ignore(dirpath, dirnames + filenames)) if ignore else set()
+            if dirpath == root:
+                ignored.update(top_level_ignored)
+            dirnames[:] = sorted(d for d in dirnames if d not in ignored)
+            for filename in sorted(f for f in filenames if f not in ignored):
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, root).replace(os.sep, "/")
+                digest.update(
+                    "{}\0{}\n".format(relative, self.digest(path)).encode("utf8")
+                )
+        return digest.hexdigest()
+
+    def write_manifest(self, bundle_dir):
+        """Record the stat signature and hash of every file in the bundle."""
+        manifest = {}
+        for dirpath, dirnames, filenames in os.walk(bundle_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, bundle_dir).replace(os.sep, "/")
+                if relative == MANIFEST_NAME:
+                    continue
+                digest = self.placed.get(os.path.abspath(path)) or hash_file(path)
+                manifest[relative] = _signature(os.stat(path)) + [digest]
+        Path(bundle_dir, MANIFEST_NAME).write_text(json.dumps(manifest, indent=1))
+        return manifest
+
+    def prune(self):
+        """Remove cached files which no bundle links to and which haven't
+        been used recently, and all but the latest distributions.
+        """
+        cutoff = time.time() - OBJECT_MAX_AGE
+        for path in self.objects.glob("*/*"):
+            try:
+                stat = path.stat()
+                if stat.st_nlink == 1 and stat.st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+        if self.distributions.is_dir():
+            builds = sorted(
+                (p for p in self.distributions.iterdir() if not p.name.startswith(".")),
+                key=os.path.getmtime,
+                reverse=True,
+            )
+            for path in builds[KEEP_DISTRIBUTIONS:]:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _link(self, cached, to_path):
+        try:
+            os.link(cached, to_path)
+        except OSError:
+            # Not supported by the filesystem, or across filesystems.
+            shutil.copyfile(cached, to_path)
+        else:
+            # Keep files in use from being pruned.
+            os.utime(cached)
+
+    def _write_atomically(self, path, content, mode=0o600):
+        """Write ``content``, bytes or a binary file, to ``path`` so that it
+        is never seen partly written.
+        """
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(content, bytes):
+                    f.write(content)
+                else:
+                    shutil.copyfileobj(content, f, CHUNK_SIZE)
+            os.chmod(tmp, mode)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
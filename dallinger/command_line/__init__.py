@@ -11,7 +11,6 @@ import shutil
 import signal
 import sys
 import time
-import warnings
 import webbrowser
 from collections import Counter
 from functools import wraps
@@ -19,16 +18,10 @@ from os.path import exists
 from pathlib import Path
 
 import click
-import requests
 import tabulate
-from rq import Connection, Worker
-from sqlalchemy import exc as sa_exc
 
-from dallinger import data, db
-from dallinger.command_line.develop import develop
-from dallinger.command_line.docker import docker
-from dallinger.command_line.docker_ssh import docker_ssh
 from dallinger.command_line.utils import (
+    LazyGroup,
     Output,
     header,
     log,
@@ -37,30 +30,9 @@ from dallinger.command_line.utils import (
     verify_package,
 )
 from dallinger.config import get_config
-from dallinger.deployment import (
-    DebugDeployment,
-    LoaderDeployment,
-    deploy_sandbox_shared_setup,
-    setup_experiment,
-)
-from dallinger.heroku.tools import HerokuApp, HerokuInfo
-from dallinger.mturk import MTurkService, MTurkServiceException
-from dallinger.notifications import (
-    EmailConfig,
-    MessengerError,
-    SMTPMailer,
-    admin_notifier,
-)
-from dallinger.recruiters import by_name
-from dallinger.utils import (
-    check_call,
-    ensure_constraints_file_presence,
-    generate_random_id,
-)
 from dallinger.version import __version__
 
 click.disable_unicode_literals_warning = True
-warnings.simplefilter("ignore", category=sa_exc.SAWarning)
 
 
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
@@ -88,6 +60,8 @@ def report_idle_after(seconds):
     def decorator(func):
         def wrapper(*args, **kwargs):
             def _handle_timeout(signum, frame):
+                from dallinger.notifications import admin_notifier
+
                 config = get_config()
                 if not config.ready:
                     config.load()
@@ -113,7 +87,15 @@ def report_idle_after(seconds):
     return decorator
 
 
-@click.group(context_settings=CONTEXT_SETTINGS)
+@click.group(
+    cls=LazyGroup,
+    context_settings=CONTEXT_SETTINGS,
+    lazy_subcommands={
+        "develop": "dallinger.command_line.develop:develop",
+        "docker": "dallinger.command_line.docker:docker",
+        "docker-ssh": "dallinger.command_line.docker_ssh:docker_ssh",
+    },
+)
 @click.version_option(__version__, "--version", "-v", message="%(version)s")
 def dallinger():
     """Dallinger command-line utility."""
@@ -125,11 +107,6 @@ def dallinger():
     )
 
 
-dallinger.add_command(develop)
-dallinger.add_command(docker)
-dallinger.add_command(docker_ssh)
-
-
 @dallinger.command()
 def setup():
     """Walk the user though the Dallinger setup."""
@@ -167,6 +144,10 @@ def uuid():
 
 
 def get_summary(app):
+    import requests
+
+    from dallinger.heroku.tools import HerokuApp
+
     heroku_app = HerokuApp(app)
     r = requests.get("{}/summary".format(heroku_app.url))
     summary = r.json()["summary"]
@@ -201,12 +182,16 @@ def get_summary(app):
 @require_exp_directory
 def debug(verbose, bot, proxy, no_browsers=False, exp_config=None):
     """Run the experiment locally."""
+    from dallinger.deployment import DebugDeployment
+
     debugger = DebugDeployment(Output(), verbose, bot, proxy, exp_config, no_browsers)
     log(header, chevrons=False)
     debugger.run()
 
 
 def _mturk_service_from_config(sandbox):
+    from dallinger.mturk import MTurkService
+
     config = get_config()
     config.load()
     return MTurkService(
@@ -219,6 +204,8 @@ def _mturk_service_from_config(sandbox):
 
 def prelaunch_db_bootstrapper(zip_path, log):
     def bootstrap_db(heroku_app, config):
+        from dallinger import data, db
+
         # Pre-populate the database if an archive was given
         log("Ingesting dataset from {}...".format(os.path.basename(zip_path)))
         engine = db.create_db_engine(heroku_app.db_url)
@@ -228,6 +215,8 @@ def prelaunch_db_bootstrapper(zip_path, log):
 
 
 def _deploy_in_mode(mode, verbose, log, app=None, archive=None):
+    from dallinger.deployment import deploy_sandbox_shared_setup
+
     if app:
         verify_id(None, None, app)
 
@@ -333,8 +322,11 @@ def qualify(workers, qualification, value, by_name, notify, sandbox):
             qid, value, len(workers), "s" if len(workers) > 1 else ""
         )
     )
-    for worker in workers:
-        if mturk.assign_qualification(qid, worker, int(value), notify=notify):
+    for result in mturk.assign_qualifications(qid, workers, int(value), notify=notify):
+        worker = result.args[1]
+        if result.error is not None:
+            click.echo("{} failed: {}".format(worker, result.error))
+        elif result.result:
             click.echo("{} OK".format(worker))
 
     # print out the current set of workers with the qualification
@@ -349,6 +341,8 @@ def qualify(workers, qualification, value, by_name, notify, sandbox):
 @dallinger.command()
 def email_test():
     """Test email configuration and send a test email."""
+    from dallinger.notifications import EmailConfig, MessengerError, SMTPMailer
+
     out = Output()
     config = get_config()
     config.load()
@@ -395,6 +389,8 @@ def email_test():
 @click.option("--sandbox", is_flag=True, flag_value=True, help="Use the MTurk sandbox")
 def compensate(recruiter, worker_id, email, dollars, sandbox):
     """Credit a specific worker by ID through their recruiter"""
+    from dallinger.recruiters import by_name
+
     out = Output()
     config = get_config()
     config.load()
@@ -475,8 +471,15 @@ def revoke(workers, qualification, by_name, reason, sandbox):
         click.echo("Aborting...")
         return
 
-    for worker in workers:
-        if mturk.revoke_qualification(qid, worker, reason):
+    for result in mturk.revoke_qualifications(qid, workers, reason):
+        worker = result.args[1]
+        if result.error is not None:
+            click.echo(
+                'Failed to revoke qualification "{}" from worker "{}": {}'.format(
+                    qid, worker, result.error
+                )
+            )
+        elif result.result:
             click.echo(
                 'Revoked qualification "{}" from worker "{}"'.format(qid, worker)
             )
@@ -492,6 +495,9 @@ def revoke(workers, qualification, by_name, reason, sandbox):
 @click.option("--app", default=None, callback=verify_id, help="Experiment id")
 def hibernate(app):
     """Pause an experiment and remove costly resources."""
+    from dallinger import data
+    from dallinger.heroku.tools import HerokuApp
+
     log("The database backup URL is...")
     backup_url = data.backup(app)
     log(backup_url)
@@ -533,6 +539,8 @@ def prolific_check(recruiter, sandbox):
 @click.option("--recruiter", default="mturk", help="Experiment id")
 def hits(app, sandbox, recruiter):
     """List all HITs for the recruiter account or for a specific experiment id."""
+    from dallinger.recruiters import by_name
+
     if app is not None:
         verify_id(None, "--app", app)
     prolific_check(recruiter, sandbox)
@@ -551,6 +559,8 @@ def hits(app, sandbox, recruiter):
 @click.option("--recruiter", default="mturk", help="Experiment id")
 def hit_details(hit_id, sandbox, recruiter):
     """Print the details of a specific HIT for a recruiter."""
+    from dallinger.recruiters import by_name
+
     prolific_check(recruiter, sandbox)
     rec = by_name(recruiter, skip_config_validation=True)
     details = rec.hit_details(hit_id, sandbox)
@@ -569,6 +579,8 @@ def hit_details(hit_id, sandbox, recruiter):
 @click.option("--path", default=None, help="Filename/path for the qualification file")
 def copy_qualifications(hit_id, sandbox, recruiter, path):
     """Copy qualifications from an existing HIT and save them to a JSON file."""
+    from dallinger.recruiters import by_name
+
     prolific_check(recruiter, sandbox)
     rec = by_name(recruiter, skip_config_validation=True)
     if path is None:
@@ -597,6 +609,8 @@ def expire(hit_id, app, sandbox, exit=True):
     specifying a Dallinger experiment ID, in which case HITs with the experiment
     ID in their ``annotation`` field will be expired.
     """
+    from dallinger.mturk import MTurkServiceException
+
     if (hit_id and app) or not (hit_id or app):
         raise click.BadParameter("Must specify --hit_id or --app, but not both.")
     if app is not None:
@@ -653,6 +667,8 @@ def expire(hit_id, app, sandbox, exit=True):
 )
 def extend_mturk_hit(hit_id, assignments, duration_hours, sandbox):
     """Add assignments, and optionally time, to an existing MTurk HIT."""
+    from dallinger.mturk import MTurkServiceException
+
     out = Output()
     config = get_config()
     config.load()
@@ -704,6 +720,8 @@ def extend_mturk_hit(hit_id, assignments, duration_hours, sandbox):
 @click.pass_context
 def destroy(ctx, app, expire_hit, sandbox):
     """Tear down an experiment server."""
+    from dallinger.heroku.tools import HerokuApp
+
     if expire_hit:
         ctx.invoke(expire, app=app, sandbox=sandbox, exit=False)
     HerokuApp(app).destroy()
@@ -714,6 +732,9 @@ def destroy(ctx, app, expire_hit, sandbox):
 @click.option("--databaseurl", default=None, help="URL of the database")
 def awaken(app, databaseurl):
     """Restore the database from a given url."""
+    from dallinger import data
+    from dallinger.heroku.tools import HerokuApp
+
     id = app
     config = get_config()
     config.load()
@@ -759,6 +780,8 @@ def awaken(app, databaseurl):
 def export(app, local, no_scrub):
     """Export the experiment data to a zip archive on your local computer, and
     by default, to Amazon S3."""
+    from dallinger import data
+
     log(header, chevrons=False)
     try:
         data.export(str(app), local=local, scrub_pii=(not no_scrub))
@@ -779,6 +802,8 @@ def load(app, verbose, replay, exp_config=None):
     """Import database state from an exported zip file and leave the server
     running until stopping the process with <control>-c.
     """
+    from dallinger.deployment import LoaderDeployment
+
     if replay:
         exp_config = exp_config or {}
         exp_config["replay"] = True
@@ -791,6 +816,8 @@ def load(app, verbose, replay, exp_config=None):
 @click.option("--app", default=None, callback=verify_id, help="Experiment id")
 def logs(app):
     """Show the logs."""
+    from dallinger.heroku.tools import HerokuApp
+
     if app is None:
         raise TypeError("Select an experiment using the --app parameter.")
 
@@ -801,6 +828,9 @@ def logs(app):
 @click.option("--app", default=None, callback=verify_id, help="Experiment id")
 def monitor(app):
     """Set up application monitoring."""
+    from dallinger.heroku.tools import HerokuApp
+    from dallinger.utils import check_call
+
     heroku_app = HerokuApp(dallinger_uid=app)
     webbrowser.open(heroku_app.dashboard_url)
     webbrowser.open("https://requester.mturk.com/mturk/manageHITs")
@@ -834,6 +864,10 @@ def bot_factory(url):
 @click.option("--debug", default=None, help="Local debug recruitment url")
 def bot(app, debug):
     """Run the experiment bot."""
+    from dallinger.deployment import setup_experiment
+    from dallinger.heroku.tools import HerokuApp
+    from dallinger.utils import generate_random_id
+
     if debug is None:
         verify_id(None, None, app)
 
@@ -854,6 +888,168 @@ def bot(app, debug):
     bot.run_experiment()
 
 
+@dallinger.command()
+@click.option("--app", default=None, help="Experiment id")
+@click.option("--debug", default=None, help="Local debug server url")
+@click.option("--bots", default=100, type=int, help="Number of bots to run")
+@click.option("--rate", default=None, type=float, help="Mean bot arrivals per second")
+@click.option(
+    "--think-time",
+    default=0.0,
+    type=float,
+    help="Mean pause in seconds between experiment phases",
+)
+@click.option(
+    "--think-distribution",
+    default="exponential",
+    type=click.Choice(["exponential", "uniform", "constant"]),
+    help="Distribution of think times",
+)
+@click.option(
+    "--max-connections",
+    default=100,
+    type=int,
+    help="Size of the shared HTTP connection pool",
+)
+@click.option(
+    "--report",
+    default=None,
+    type=click.Path(),
+    help="Write the results as JSON to this file",
+)
+def load_test(
+    app, debug, bots, rate, think_time, think_distribution, max_connections, report
+):
+    """Run many high performance bots against an experiment to measure load."""
+    # Bots need cooperative sockets to run concurrently in this process, and
+    # ssl, socket and requests must be patched before anything imports them.
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    if debug is None:
+        verify_id(None, None, app)
+
+    from dallinger.bots import HighPerformanceBotBase
+    from dallinger.deployment import setup_experiment
+    from dallinger.heroku.tools import HerokuApp
+    from dallinger.loadtest import LoadDriver
+
+    setup_experiment(log)
+    from dallinger_experiment.experiment import Bot
+
+    if not issubclass(Bot, HighPerformanceBotBase):
+        raise click.BadParameter(
+            "Load testing needs the experiment's Bot to be a HighPerformanceBotBase."
+        )
+
+    base_url = debug or HerokuApp(dallinger_uid=app).url
+    driver = LoadDriver(
+        Bot,
+        base_url,
+        bots=bots,
+        arrival_rate=rate,
+        think_time=think_time,
+        think_distribution=think_distribution,
+        max_connections=max_connections,
+    )
+    log("Running {} bots against {}...".format(bots, base_url))
+    driver.run()
+    results = driver.report()
+
+    rows = [
+        [route] + list(stats.values()) for route, stats in results["routes"].items()
+    ]
+    headers = ["route"] + list(next(iter(results["routes"].values()), {}).keys())
+    click.echo(tabulate.tabulate(rows, headers=headers, floatfmt=".3f"))
+    click.echo(
+        "{completed} bots completed, {failed} failed in {elapsed_seconds:.1f}s".format(
+            **results
+        )
+    )
+    if report:
+        with open(report, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+@dallinger.command()
+@click.option(
+    "--flow",
+    default="chain",
+    help="Participant flow to script: chain, chatroom, info, mcmcp or rogers",
+)
+@click.option("--participants", default=20, type=int, help="Number of participants")
+@click.option("--trials", default=5, type=int, help="Trials per participant")
+@click.option(
+    "--report",
+    default="benchmark.json",
+    type=click.Path(),
+    help="File to write the JSON report to",
+)
+@click.option(
+    "--baseline",
+    default=None,
+    type=click.Path(exists=True),
+    help="A previous report to compare the results with",
+)
+@require_exp_directory
+def benchmark(flow, participants, trials, report, baseline):
+    """Benchmark the experiment server with scripted participants.
+
+    This drops and recreates the tables in the local database.
+    """
+    from dallinger import db
+    from dallinger.benchmark import Benchmark, compare
+    from dallinger.deployment import setup_experiment
+
+    report = os.path.abspath(report)
+    exp_id, tmp_dir = setup_experiment(log, exp_config={"mode": "debug"})
+    cwd = os.getcwd()
+    os.chdir(tmp_dir)
+    try:
+        db.init_db(drop_all=True)
+        from dallinger.experiment_server.experiment_server import app
+
+        try:
+            runner = Benchmark(
+                app, db.engine, flow=flow, participants=participants, trials=trials
+            )
+        except ValueError as ex:
+            raise click.BadParameter(str(ex))
+        log("Running {} participants through the {} flow...".format(participants, flow))
+        runner.run()
+    finally:
+        os.chdir(cwd)
+
+    results = runner.report()
+    rows = [
+        [route] + list(stats.values()) for route, stats in results["routes"].items()
+    ]
+    headers = ["route"] + list(next(iter(results["routes"].values()), {}).keys())
+    click.echo(tabulate.tabulate(rows, headers=headers, floatfmt=".2f"))
+    click.echo(
+        "{requests} requests in {elapsed_seconds:.1f}s ({requests_per_second:.1f}/s), "
+        "{statements} SQL statements, {serialization_retries} serialization "
+        "retries".format(**results)
+    )
+    if baseline:
+        with open(baseline) as f:
+            rows = compare(json.load(f), results)
+        headers = [
+            "route",
+            "p95 before",
+            "p95 after",
+            "change",
+            "SQL before",
+            "SQL after",
+        ]
+        click.echo(tabulate.tabulate(rows, headers=headers, floatfmt=".2f"))
+
+    with open(report, "w") as f:
+        json.dump(results, f, indent=4)
+    log("Report written to {}".format(report))
+
+
 @dallinger.command()
 def verify():
     """Verify that app is compatible with Dallinger."""
@@ -872,15 +1068,22 @@ def verify():
 @dallinger.command()
 def rq_worker():
     """Start an rq worker in the context of dallinger."""
+    from rq import Connection, Worker
+
+    from dallinger import db
+    from dallinger.deployment import setup_experiment
+
     setup_experiment(log)
     with Connection(db.redis_conn):
         # right now we care about low queue for bots
         worker = Worker("low")
-        worker.work()
+        worker.work(with_scheduler=True)
 
 
 @dallinger.command()
 def apps():
+    from dallinger.heroku.tools import HerokuInfo
+
     out = Output()
     config = get_config()
     if not config.ready:
@@ -917,6 +1120,8 @@ def apps():
 @dallinger.command()
 def generate_constraints():
     """Update an experiment's constraints.txt pinned dependencies based on requirements.txt."""
+    from dallinger.utils import ensure_constraints_file_presence
+
     experiment_dir = Path(os.getcwd())
     constraints_path = experiment_dir / "constraints.txt"
     if constraints_path.exists():
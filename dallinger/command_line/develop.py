@@ -1,7 +1,6 @@
 import subprocess
 
 import click
-from rq import Queue
 from six.moves.urllib.parse import urlparse, urlunparse
 
 from dallinger.command_line.utils import (
@@ -12,9 +11,6 @@ from dallinger.command_line.utils import (
     require_exp_directory,
 )
 from dallinger.config import get_config
-from dallinger.db import redis_conn
-from dallinger.deployment import DevelopmentDeployment, handle_launch_data
-from dallinger.utils import develop_target_path, open_browser
 
 BASE_URL = "http://127.0.0.1:{}/"
 
@@ -52,6 +48,11 @@ def develop():
     help="Skip launching Flask, so that Flask can be managed externally",
 )
 def debug(port, skip_flask):
+    from rq import Queue
+
+    from dallinger.db import redis_conn
+    from dallinger.utils import develop_target_path
+
     _bootstrap()
 
     q = Queue("default", connection=redis_conn)
@@ -75,6 +76,8 @@ def bootstrap(exp_config=None):
 
 def _bootstrap(exp_config=None):
     """Creates a directory which will be used to host the development version of the experiment."""
+    from dallinger.deployment import DevelopmentDeployment
+
     bootstrapper = DevelopmentDeployment(Output(), exp_config)
     log(header, chevrons=False)
     bootstrapper.run()
@@ -86,6 +89,8 @@ def launch_app_and_open_dashboard(port):
 
 
 def _launch_app(port):
+    from dallinger.deployment import handle_launch_data
+
     url = BASE_URL.format(port) + "launch"
     handle_launch_data(url, error=log, delay=1.0)
 
@@ -107,6 +112,8 @@ def browser(route=None, port=5000):
 
 def _browser(route=None, port=5000):
     """Open one of the supported routes with appropriate path and URL parameters"""
+    from dallinger.utils import open_browser
+
     config = get_config()
     config.load()
     url_factory = valid_routes.get(route)
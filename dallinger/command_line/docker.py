@@ -12,10 +12,7 @@ from pathlib import Path
 from shlex import quote
 
 import click
-import requests
-from heroku3.core import Heroku as Heroku3Client
 
-from dallinger import heroku, registration
 from dallinger.command_line.utils import (
     Output,
     header,
@@ -24,8 +21,6 @@ from dallinger.command_line.utils import (
     verify_id,
 )
 from dallinger.config import get_config
-from dallinger.deployment import handle_launch_data
-from dallinger.heroku.tools import HerokuApp
 from dallinger.utils import GitClient, abspath_from_egg, setup_experiment
 
 HEROKU_YML = abspath_from_egg("dallinger", "dallinger/docker/heroku.yml").read_text()
@@ -202,6 +197,11 @@ REGISTRY_UNAUTHORIZED_HELP_TEXT = [
 @click.option("--config", "-c", "config_options", nargs=2, multiple=True)
 def deploy_image(image_name, mode, config_options):
     """Deploy Heroku app using a docker image and MTurk."""
+    import requests
+    from heroku3.core import Heroku as Heroku3Client
+
+    from dallinger.deployment import handle_launch_data
+
     config = get_config()
     config.load()
     dashboard_user = config.get("dashboard_user", "admin")
@@ -311,7 +311,10 @@ def _deploy_in_mode(mode, verbose, log, app=None):
 
 
 def deploy_heroku_docker(log, verbose=True, app=None, exp_config=None):
+    from dallinger import heroku, registration
+    from dallinger.deployment import handle_launch_data
     from dallinger.docker.tools import build_image
+    from dallinger.heroku.tools import HerokuApp
 
     config = get_config()
     config.load()
@@ -8,8 +8,11 @@ import secrets
 import select
 import socket
 import sys
+import threading
+import time
 import zipfile
-from contextlib import contextmanager, redirect_stdout
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
 from email.utils import parseaddr
 from functools import wraps
 from getpass import getuser
@@ -23,18 +26,13 @@ from typing import Dict
 from uuid import uuid4
 
 import click
-import requests
 from jinja2 import Template
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from yaspin import yaspin
 
+from dallinger.bulk import BulkExecutor
 from dallinger.command_line.config import get_configured_hosts, remove_host, store_host
 from dallinger.command_line.utils import Output
 from dallinger.config import get_config
-from dallinger.data import bootstrap_db_from_zip, export_db_uri
-from dallinger.db import create_db_engine
-from dallinger.deployment import handle_launch_data, setup_experiment
 from dallinger.utils import abspath_from_egg, check_output
 
 # A couple of constants to colour console output
@@ -43,6 +41,11 @@ END = "\033[0m"
 GREEN = "\033[32m"
 BLUE = "\033[34m"
 
+#: The most servers acted on at once in fleet mode.
+MAX_CONCURRENT_SERVERS = 8
+#: Seconds between keepalive packets on shared ssh connections.
+SSH_KEEPALIVE_INTERVAL = 30
+
 
 # Find an identifier for the current user to use as CREATOR of the experiment
 HOSTNAME = gethostname()
@@ -152,6 +155,7 @@ def prepare_server(host, user):
         executor.run("sudo -n adduser $(id --user --name) docker")
         print("Docker installed")
         # Log in again in case we need to be part of the `docker` group
+        close_ssh_client(host, user)
         executor = Executor(host, user)
     else:
         print("Docker daemon already installed")
@@ -201,6 +205,131 @@ server_option = click.option(
 )
 
 
+def fleet_option(f):
+    """Like ``server_option``, but ``--server`` can be repeated, or replaced
+    by ``--all-servers``, to act on several servers at once. The command is
+    passed the names of the chosen servers as ``servers``.
+    """
+
+    @click.option(
+        "--server",
+        "servers",
+        multiple=True,
+        help="Name of the remote server. Repeat to act on several servers at once",
+        type=click.Choice(tuple(CONFIGURED_HOSTS.keys())),
+    )
+    @click.option(
+        "--all-servers",
+        is_flag=True,
+        default=False,
+        help="Act on all the configured servers at once",
+    )
+    @wraps(f)
+    def wrapper(*args, servers, all_servers, **kwargs):
+        if all_servers:
+            servers = tuple(CONFIGURED_HOSTS.keys())
+        elif not servers:
+            servers = (
+                default_server
+                or click.prompt(
+                    server_prompt, type=click.Choice(tuple(CONFIGURED_HOSTS.keys()))
+                ),
+            )
+        return f(*args, servers=list(dict.fromkeys(servers)), **kwargs)
+
+    return wrapper
+
+
+class FleetOutput(io.TextIOBase):
+    """Stands in for ``sys.stdout`` while commands run on several servers,
+    collecting each thread's output separately so that it can be shown per
+    server rather than interleaved.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @classmethod
+    def capturing(cls):
+        """Whether the current thread's output is being collected."""
+        return (
+            isinstance(sys.stdout, cls)
+            and getattr(sys.stdout.local, "buffer", None) is not None
+        )
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None:
+            with self.lock:
+                return self.stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run_on_servers(servers, func, description):
+    """Call ``func(server)`` for each of the named servers, several at once.
+
+    Each server's output is shown in one block when it finishes, followed by
+    a summary of which servers succeeded and which failed. Returns a dict of
+    each server's :data:`~dallinger.bulk.BulkResult`.
+    """
+    output = FleetOutput(sys.stdout)
+
+    def run(server):
+        output.local.buffer = io.StringIO()
+        started = time.monotonic()
+        outcome = "failed"
+        try:
+            result = func(server)
+            outcome = "done"
+            return result
+        finally:
+            text = output.local.buffer.getvalue()
+            output.local.buffer = None
+            with output.lock:
+                output.stream.write(
+                    f"{BLUE}=== {server} ({outcome} in "
+                    f"{time.monotonic() - started:.1f}s) ==={END}\n{text}"
+                )
+                if text and not text.endswith("\n"):
+                    output.stream.write("\n")
+
+    print(f"{description} {len(servers)} servers: {', '.join(servers)}")
+    executor = BulkExecutor(max_workers=MAX_CONCURRENT_SERVERS)
+    sys.stdout = output
+    try:
+        results = {
+            result.args[0]: result
+            for result in executor.imap(run, [((server,), {}) for server in servers])
+        }
+    finally:
+        sys.stdout = output.stream
+
+    failed = [server for server, result in results.items() if result.error]
+    print(f"\n{description}: {len(servers) - len(failed)} of {len(servers)} succeeded")
+    for server, result in results.items():
+        if result.error:
+            reason = str(result.error) or type(result.error).__name__
+            print(f"  {RED}✗ {server}: {reason}{END}")
+        else:
+            print(f"  {GREEN}✓ {server}{END}")
+    return results
+
+
+def raise_for_failures(results):
+    """Exit with an error if ``run_on_servers`` failed on any server."""
+    failed = [server for server, result in results.items() if result.error]
+    if failed:
+        raise click.ClickException(f"Failed on {', '.join(failed)}")
+
+
 def build_and_push_image(f):
     """Decorator for click commands that depend on a pushed docker image.
 
@@ -216,6 +345,7 @@ def build_and_push_image(f):
         import docker
 
         from dallinger.command_line.docker import push
+        from dallinger.deployment import setup_experiment
         from dallinger.docker.tools import build_image
 
         config = get_config()
@@ -322,7 +452,7 @@ def set_dozzle_password_cmd(server, password):
     default=True,
 )
 @click.option("--live", "mode", flag_value="live", help="Deploy to the real MTurk")
-@server_option
+@fleet_option
 @click.option(
     "--dns-host",
     help="DNS name to use. Must resolve all its subdomains to the IP address specified as ssh host",
@@ -349,11 +479,59 @@ def set_dozzle_password_cmd(server, password):
 @validate_update
 @build_and_push_image
 def deploy(
-    image_name, mode, server, dns_host, app_name, config_options, archive_path, update
+    image_name, mode, servers, dns_host, app_name, config_options, archive_path, update
 ):  # pragma: no cover
-    """Deploy a dallinger experiment docker image to a server using ssh."""
+    """Deploy a dallinger experiment docker image to servers using ssh.
+
+    Given several servers, the experiment is deployed to all of them at once.
+    """
     config = get_config()
     config.load()
+    options = dict(
+        image_name=image_name,
+        mode=mode,
+        dns_host=dns_host,
+        app_name=app_name,
+        config_options=config_options,
+        archive_path=archive_path,
+        update=update,
+    )
+    if len(servers) == 1:
+        return deploy_to_server(server=servers[0], **options)
+
+    if dns_host:
+        raise click.UsageError(
+            "--dns-host can't be used when deploying to several servers"
+        )
+    results = run_on_servers(
+        servers,
+        lambda server: deploy_to_server(server=server, fleet=True, **options),
+        "Deploying to",
+    )
+    raise_for_failures(results)
+    return {server: result.result for server, result in results.items()}
+
+
+def deploy_to_server(
+    image_name,
+    mode,
+    server,
+    dns_host,
+    app_name,
+    config_options,
+    archive_path,
+    update,
+    fleet=False,
+):  # pragma: no cover
+    """Deploy a dallinger experiment docker image to a server using ssh.
+    With ``fleet``, other deployments of the experiment are running at the
+    same time.
+    """
+    from dallinger.data import bootstrap_db_from_zip
+    from dallinger.db import create_db_engine
+    from dallinger.deployment import handle_launch_data
+
+    config = get_config()
     server_info = CONFIGURED_HOSTS[server]
     ssh_host = server_info["host"]
     ssh_user = server_info.get("user")
@@ -603,7 +781,8 @@ def deploy(
     for line in deployment_infos:
         print(line)
 
-    deploy_log_path = Path("deploy_logs") / f"{experiment_id}.txt"
+    deploy_log_name = f"{experiment_id}-{server}" if fleet else experiment_id
+    deploy_log_path = Path("deploy_logs") / f"{deploy_log_name}.txt"
     deploy_log_path.parent.mkdir(exist_ok=True)
     with open(deploy_log_path, "w") as f:
         for line in deployment_infos:
@@ -625,41 +804,61 @@ def get_experiment_id_from_archive(archive_path):
 
 def remove_redis_volumes(app_name, executor):
     redis_volume_name = f"{app_name}_dallinger_{app_name}_redis_data"
-    stdout = io.StringIO()
-    with redirect_stdout(stdout):
-        try:
-            executor.run(f"docker volume rm '{redis_volume_name}'")
-        except ExecuteException:
-            err = stdout.getvalue()
-            if "no such volume" not in err.lower():
-                raise ExecuteException(err)
+    # Checked first, rather than capturing the error from `docker volume rm`,
+    # since stdout can't be redirected while deploying to several servers.
+    if executor.run(
+        f"docker volume ls --quiet --filter name={quote(f'^{redis_volume_name}$')}"
+    ).strip():
+        executor.run(f"docker volume rm '{redis_volume_name}'")
 
 
 @docker_ssh.command()
-@server_option
-def apps(server):
-    """List dallinger apps running on the remote server."""
+@fleet_option
+def apps(servers):
+    """List dallinger apps running on the remote servers."""
+    if len(servers) == 1:
+        apps = list_apps(servers[0])
+        for app in apps.split():
+            print(app)
+        return apps
+
+    results = run_on_servers(
+        servers, lambda server: print(list_apps(server)), "Listing apps on"
+    )
+    raise_for_failures(results)
+
+
+def list_apps(server):
     server_info = CONFIGURED_HOSTS[server]
-    ssh_host = server_info["host"]
-    ssh_user = server_info.get("user")
-    executor = Executor(ssh_host, user=ssh_user)
+    executor = Executor(server_info["host"], user=server_info.get("user"))
     # The caddy configuration files are used as source of truth
     # to get the list of installed apps
-    apps = executor.run("ls ~/dallinger/caddy.d")
-    for app in apps.split():
-        print(app)
-    return apps
+    return executor.run("ls ~/dallinger/caddy.d")
 
 
 @docker_ssh.command()
-@server_option
-def stats(server):
-    """Get resource usage stats from remote server."""
-    server_info = CONFIGURED_HOSTS[server]
-    ssh_host = server_info["host"]
-    ssh_user = server_info.get("user")
-    executor = Executor(ssh_host, user=ssh_user)
-    executor.run_and_echo("docker stats")
+@fleet_option
+def stats(servers):
+    """Get resource usage stats from remote servers.
+
+    Stats from a single server are updated until you press "q". Stats from
+    several servers are shown once.
+    """
+
+    def executor(server):
+        server_info = CONFIGURED_HOSTS[server]
+        return Executor(server_info["host"], user=server_info.get("user"))
+
+    if len(servers) == 1:
+        executor(servers[0]).run_and_echo("docker stats")
+        return
+
+    results = run_on_servers(
+        servers,
+        lambda server: print(executor(server).run("docker stats --no-stream")),
+        "Getting stats from",
+    )
+    raise_for_failures(results)
 
 
 @docker_ssh.command()
@@ -679,6 +878,8 @@ def stats(server):
 @server_option
 def export(app, local, no_scrub, server):
     """Export database to a local file."""
+    from dallinger.data import export_db_uri
+
     server_info = CONFIGURED_HOSTS[server]
     with remote_postgres(server_info, app) as db_uri:
         export_db_uri(
@@ -771,6 +972,10 @@ def get_docker_compose_yml(
 
 
 def get_retrying_http_client():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
     parameter_name = "method_whitelist"
     if hasattr(Retry.DEFAULT, "allowed_methods"):
         parameter_name = "allowed_methods"
@@ -797,17 +1002,9 @@ class Executor:
     """Execute remote commands using paramiko"""
 
     def __init__(self, host, user=None, app=None):
-        import paramiko
-
         self.app = app
-        self.client = paramiko.SSHClient()
-        # For convenience we always trust the remote host
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.client.load_system_host_keys()
         self.host = host
-        print(f"Connecting to {host}")
-        self.client.connect(host, username=user)
-        print("Connected.")
+        self.client = get_ssh_client(host, user)
 
     def run(self, cmd, raise_=True):
         """Run the given command and block until it completes.
@@ -852,15 +1049,24 @@ class Executor:
             )
             raise click.Abort
 
+    def spinner(self, text):
+        """A spinner shown while a command runs, unless output is captured
+        to be shown per server.
+        """
+        if FleetOutput.capturing():
+            print(text)
+            return nullcontext()
+        return yaspin(text=text, color="green")
+
     def reload_caddy(self):
-        with yaspin(text="Reloading Caddy config file", color="green"):
+        with self.spinner("Reloading Caddy config file"):
             self.run(
                 "docker compose -f ~/dallinger/docker-compose.yml exec -T httpserver "
                 "caddy reload --config /etc/caddy/Caddyfile"
             )
 
     def restart_dozzle(self):
-        with yaspin(text="Restarting Dozzle", color="green"):
+        with self.spinner("Restarting Dozzle"):
             self.run("docker compose -f ~/dallinger/docker-compose.yml restart dozzle")
 
     def run_and_echo(self, cmd):  # pragma: no cover
@@ -905,14 +1111,42 @@ class ExecuteException(Exception):
 
 
 def get_sftp(host, user=None):
+    return get_ssh_client(host, user).open_sftp()
+
+
+_ssh_clients = {}
+_ssh_client_locks = defaultdict(threading.Lock)
+
+
+def get_ssh_client(host, user=None):
+    """A connected paramiko SSHClient for the host, shared by all the
+    executors and sftp sessions for the same host and user, which open
+    their own channels on it.
+    """
     import paramiko
 
-    client = paramiko.SSHClient()
-    # For convenience we always trust the remote host
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    client.load_system_host_keys()
-    client.connect(host, username=user)
-    return client.open_sftp()
+    with _ssh_client_locks[(host, user)]:
+        client = _ssh_clients.get((host, user))
+        transport = client and client.get_transport()
+        if transport is None or not transport.is_active():
+            client = paramiko.SSHClient()
+            # For convenience we always trust the remote host
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.load_system_host_keys()
+            print(f"Connecting to {host}")
+            client.connect(host, username=user)
+            client.get_transport().set_keepalive(SSH_KEEPALIVE_INTERVAL)
+            print("Connected.")
+            _ssh_clients[(host, user)] = client
+        return client
+
+
+def close_ssh_client(host, user=None):
+    """Close the shared connection to the host, so the next is a new login."""
+    with _ssh_client_locks[(host, user)]:
+        client = _ssh_clients.pop((host, user), None)
+        if client is not None:
+            client.close()
 
 
 logging.getLogger("paramiko.transport").setLevel(logging.ERROR)
@@ -4,11 +4,11 @@ import re
 import sys
 import tempfile
 from functools import wraps
+from importlib import import_module
 
 import click
 
 from dallinger.config import get_config, initialize_experiment_package
-from dallinger.utils import ExperimentFileSource
 from dallinger.version import __version__
 
 header = r"""
@@ -56,6 +56,27 @@ class Output(object):
         self.blather = blather
 
 
+class LazyGroup(click.Group):
+    """A group whose ``lazy_subcommands``, a mapping of their names to
+    ``"module:attribute"`` import paths, are only imported when used.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super(LazyGroup, self).__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        commands = super(LazyGroup, self).list_commands(ctx)
+        return sorted(set(commands) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_subcommands[cmd_name].split(":")
+            command = getattr(import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+        return super(LazyGroup, self).get_command(ctx, cmd_name)
+
+
 def require_exp_directory(f):
     """Decorator to verify that a command is run inside a valid Dallinger
     experiment directory.
@@ -109,6 +130,8 @@ def verify_directory(verbose=True, max_size_mb=50):
             ok = False
 
     # Check size
+    from dallinger.utils import ExperimentFileSource
+
     max_size = max_size_mb * mb_to_bytes
     file_source = ExperimentFileSource(os.getcwd())
     size = file_source.size
@@ -138,6 +161,8 @@ def verify_experiment_module(verbose):
     if not os.path.exists("experiment.py"):
         return False
 
+    from dallinger.utils import ExperimentFileSource
+
     # Bootstrap a package in a temp directory and make it importable:
     temp_package_name = "TEMP_VERIFICATION_PACKAGE"
     tmp = tempfile.mkdtemp()
@@ -5,12 +5,12 @@ import json
 import logging
 import os
 import sys
+import time
 from collections import deque
 from contextlib import contextmanager
 from pathlib import Path
 
 import six
-from setuptools.dist import strtobool
 from six.moves import configparser
 
 logger = logging.getLogger(__file__)
@@ -59,10 +59,12 @@ default_keys = (
     ("dyno_type_web", six.text_type, []),
     ("dyno_type_worker", six.text_type, []),
     ("enable_global_experiment_registry", bool, []),
+    ("enable_metrics", bool, []),
     ("EXPERIMENT_CLASS_NAME", six.text_type, []),
     ("group_name", six.text_type, []),
     ("heroku_app_id_root", six.text_type, []),
     ("heroku_auth_token", six.text_type, [], True),
+    ("heroku_parallel_provisioning", bool, []),
     ("heroku_python_version", six.text_type, []),
     ("heroku_team", six.text_type, ["team"]),
     ("host", six.text_type, []),
@@ -95,6 +97,10 @@ default_keys = (
     ("smtp_host", six.text_type, []),
     ("smtp_username", six.text_type, []),
     ("smtp_password", six.text_type, ["dallinger_email_password"], True),
+    ("sql_profile_max_statements", int, []),
+    ("sql_profile_sample_rate", float, []),
+    ("sql_profile_slow_ms", float, []),
+    ("summary_cache_ttl", float, []),
     ("threads", six.text_type, []),
     ("title", six.text_type, []),
     ("question_max_length", int, []),
@@ -102,19 +108,130 @@ default_keys = (
     ("webdriver_type", six.text_type, []),
     ("webdriver_url", six.text_type, []),
     ("whimsical", bool, []),
+    ("worker_adaptive_pool_size", bool, []),
     ("worker_multiplier", float, []),
+    ("worker_pool_size", int, []),
+    ("worker_queue_pool_sizes", six.text_type, [], False, [is_valid_json]),
+    ("worker_queue_reservations", six.text_type, [], False, [is_valid_json]),
+    ("worker_queue_weights", six.text_type, [], False, [is_valid_json]),
     ("docker_image_base_name", six.text_type, [], ""),
     ("docker_image_name", six.text_type, [], ""),
+    ("docker_pip_cache", bool, []),
     ("docker_volumes", six.text_type, [], ""),
 )
 
 
+class ChangeableParams(object):
+    """A cache of the parameters which can be changed while an experiment is
+    running, whose values are kept in redis.
+
+    Changes are announced on :attr:`CHANNEL`, and read from the subscription
+    without waiting on redis before a cached value is used. In case an
+    announcement is missed, cached values expire after :attr:`TTL` seconds.
+    """
+
+    CHANNEL = "config:changed"
+    TTL = 5
+
+    def __init__(self):
+        self.values = {}
+        self.pubsub = None
+        self.pid = None
+
+    def get(self, key, type_):
+        """The value of ``key`` set in redis, or ``None`` if it is not set."""
+        self._invalidate()
+        cached = self.values.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self.TTL:
+            return cached[0]
+
+        from dallinger.db import redis_conn
+
+        value = redis_conn.get(key)
+        if value is not None:
+            value = bool(int(value)) if type_ is bool else type_(value.decode())
+        self.values[key] = (value, time.monotonic())
+        return value
+
+    def set(self, key, value):
+        """Store ``value`` for ``key`` in redis, and announce the change."""
+        from dallinger.db import redis_conn
+
+        if isinstance(value, bool):
+            value = int(value)
+        pipe = redis_conn.pipeline()
+        pipe.set(key, value)
+        pipe.publish(self.CHANNEL, key)
+        pipe.execute()
+        self.values.pop(key, None)
+
+    def _invalidate(self):
+        """Forget the values whose changes have been announced."""
+        from redis.exceptions import RedisError
+
+        from dallinger.db import redis_conn
+
+        try:
+            if self.pid != os.getpid():
+                # A subscription inherited from a parent process can't be used.
+                self.values.clear()
+                self.pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+                self.pubsub.subscribe(self.CHANNEL)
+                self.pid = os.getpid()
+            if self.pubsub is None:
+                return
+            message = self.pubsub.get_message(timeout=0)
+            while message is not None:
+                self.values.pop(message["data"].decode(), None)
+                message = self.pubsub.get_message(timeout=0)
+        except RedisError:
+            logger.exception("Lost the subscription to configuration changes.")
+            self.values.clear()
+            self.pubsub = None
+
+
+def _changes_layer(method):
+    def change(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.changed()
+        return result
+
+    return change
+
+
+class Layer(dict):
+    """A layer of configuration values, which calls ``changed`` whenever it
+    is edited in place, so that the values merged from it can be rebuilt.
+    """
+
+    def __init__(self, mapping, changed):
+        super(Layer, self).__init__(mapping)
+        self.changed = changed
+
+    def __reduce__(self):
+        # Copied or pickled without the configuration it belongs to.
+        return (dict, (dict(self),))
+
+    __setitem__ = _changes_layer(dict.__setitem__)
+    __delitem__ = _changes_layer(dict.__delitem__)
+    __ior__ = _changes_layer(dict.__ior__)
+    clear = _changes_layer(dict.clear)
+    pop = _changes_layer(dict.pop)
+    popitem = _changes_layer(dict.popitem)
+    setdefault = _changes_layer(dict.setdefault)
+    update = _changes_layer(dict.update)
+
+
 class Configuration(object):
     SUPPORTED_TYPES = {six.binary_type, six.text_type, int, float, bool}
     _experiment_params_loaded = False
     _module_params_loaded = False
 
     def __init__(self):
+        self._changeable = ChangeableParams()
+        #: Counts changes to the layers, so that objects built from the
+        #: configuration can tell when to build themselves again.
+        self.revision = 0
         self._reset()
 
     def set(self, key, value):
@@ -122,6 +239,7 @@ class Configuration(object):
 
     def clear(self):
         self.data = deque()
+        self._layers_changed()
         self.ready = False
 
     def _reset(self, register_defaults=False):
@@ -155,6 +273,8 @@ class Configuration(object):
                         value = source_file.read()
                 try:
                     if expected_type == bool:
+                        from setuptools.dist import strtobool
+
                         value = strtobool(value)
                     value = expected_type(value)
                 except ValueError:
@@ -174,35 +294,63 @@ class Configuration(object):
                     e.dallinger_config_value = value
                     raise e
             normalized_mapping[key] = value
-        self.data.extendleft([normalized_mapping])
+        self.data.extendleft([Layer(normalized_mapping, self._layers_changed)])
+        self._layers_changed()
 
     @contextmanager
     def override(self, *args, **kwargs):
         self.extend(*args, **kwargs)
         yield self
         self.data.popleft()
+        self._layers_changed()
 
     changeable_params = ["auto_recruit"]
 
-    def get(self, key, default=marker):
-        # For now this is limited to "auto_recruit", but in the future it can be extended
-        # to other parameters as well
-        if key == "auto_recruit":
-            from dallinger.db import redis_conn
-
-            auto_recruit = redis_conn.get("auto_recruit")
-            if auto_recruit is not None:
-                return bool(int(auto_recruit))
-        if not self.ready:
-            raise RuntimeError("Config not loaded")
-        for layer in self.data:
-            try:
-                value = layer[key]
+    def set_changeable(self, key, value):
+        """Change the value of one of the :attr:`changeable_params` for all
+        processes of a running experiment.
+        """
+        if key not in self.changeable_params:
+            raise KeyError("{} can't be changed while running".format(key))
+        if not isinstance(value, self.types[key]):
+            raise TypeError(
+                "Got {value} for {key}, expected {expected_type}".format(
+                    value=repr(value), key=key, expected_type=self.types[key]
+                )
+            )
+        self._changeable.set(key, value)
+
+    def _layers_changed(self):
+        self._flattened = None
+        self.revision += 1
+
+    def _flatten(self):
+        """Merge the layers into one mapping, the first layer with each key
+        taking precedence.
+        """
+        flattened = {}
+        for layer in reversed(self.data):
+            for key, value in layer.items():
                 if isinstance(value, six.text_type):
                     value = value.strip()
+                flattened[key] = value
+        self._flattened = flattened
+        return flattened
+
+    def get(self, key, default=marker):
+        if key in self.changeable_params:
+            value = self._changeable.get(key, self.types.get(key, bool))
+            if value is not None:
                 return value
-            except KeyError:
-                continue
+        if not self.ready:
+            raise RuntimeError("Config not loaded")
+        flattened = self._flattened
+        if flattened is None:
+            flattened = self._flatten()
+        try:
+            return flattened[key]
+        except KeyError:
+            pass
         if default is marker:
             raise KeyError(
                 f"The following config parameter was not set: {key}. Consider setting it in "
@@ -412,13 +560,21 @@ def raise_invalid_key_error(key):
     raise KeyError(error_text)
 
 
+DEPRECATED_KEYS = {
+    "lock_table_when_creating_participant": (
+        "The 'lock_table_when_creating_participant' config variable has no effect "
+        + "as the participant table is no longer locked when creating participants."
+    ),
+    "prolific_maximum_allowed_minutes": (
+        "The 'prolific_maximum_allowed_minutes' config variable has no effect "
+        + "as it is currently ignored by the Prolific API."
+    ),
+}
+
+
 def test_deprecation(key):
-    if key == "prolific_maximum_allowed_minutes":
+    if key in DEPRECATED_KEYS:
         import warnings
 
         warnings.simplefilter("always", DeprecationWarning)
-        warnings.warn(
-            "The 'prolific_maximum_allowed_minutes' config variable has no effect "
-            + "as it is currently ignored by the Prolific API.",
-            DeprecationWarning,
-        )
+        warnings.warn(DEPRECATED_KEYS[key], DeprecationWarning)
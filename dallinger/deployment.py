@@ -7,6 +7,9 @@ import os
 import re
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
 from shlex import quote
 
 import redis
@@ -94,6 +97,82 @@ def handle_launch_data(url, error, delay=DEFAULT_DELAY, attempts=MAX_ATTEMPTS):
         launch_request.raise_for_status()
 
 
+class ProvisioningGraph(object):
+    """Steps of a deployment, each started once the steps it requires have
+    finished, so that independent steps run concurrently.
+
+    Steps must be added after the steps they require, and are run in the
+    order they were added when not run concurrently.
+    """
+
+    def __init__(self, log, max_workers=8):
+        self.log = log
+        self.max_workers = max_workers
+        self.steps = OrderedDict()
+
+    def add(self, name, func, requires=()):
+        """Add a step ``name`` calling ``func`` after the steps ``requires``."""
+        if name in self.steps:
+            raise ValueError("Duplicate step: {}".format(name))
+        unknown = [required for required in requires if required not in self.steps]
+        if unknown:
+            raise ValueError(
+                "Step {} requires unknown steps: {}".format(name, ", ".join(unknown))
+            )
+        self.steps[name] = (func, set(requires))
+
+    def run(self, parallel=True):
+        """Run every step, raising the first error once running steps finish.
+        Steps which require a failed step are not started.
+        """
+        started = time.monotonic()
+        if parallel:
+            self._run_concurrently()
+        else:
+            for name in self.steps:
+                self._run_step(name)
+        self.log(
+            "Provisioned in {:.1f}s".format(time.monotonic() - started),
+            chevrons=False,
+        )
+
+    def _run_concurrently(self):
+        done = set()
+        waiting = OrderedDict(self.steps)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while waiting or running:
+                if error is None:
+                    for name, (func, requires) in list(waiting.items()):
+                        if requires <= done:
+                            del waiting[name]
+                            running[executor.submit(self._run_step, name)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    else:
+                        done.add(name)
+        if error is not None:
+            raise error
+
+    def _run_step(self, name):
+        func, _ = self.steps[name]
+        started = time.monotonic()
+        try:
+            func()
+        except Exception:
+            self.log("✗ {} failed".format(name), chevrons=False)
+            raise
+        self.log(
+            "✓ {} ({:.1f}s)".format(name, time.monotonic() - started), chevrons=False
+        )
+
+
 def deploy_sandbox_shared_setup(
     log, verbose=True, app=None, exp_config=None, prelaunch_actions=None
 ):
@@ -136,23 +215,16 @@ def deploy_sandbox_shared_setup(
     log("Initializing app on Heroku...")
     team = config.get("heroku_team", None)
     heroku_app = HerokuApp(dallinger_uid=heroku_app_id, output=out, team=team)
-    heroku_app.bootstrap()
-    heroku_app.buildpack("https://github.com/stomita/heroku-buildpack-phantomjs")
 
     # Set up add-ons and AWS environment variables.
     database_size = config.get("database_size")
     redis_size = config.get("redis_size")
-    addons = [
-        "heroku-postgresql:{}".format(quote(database_size)),
-        "heroku-redis:{}".format(quote(redis_size)),
-        "papertrail",
-    ]
+    postgres_addon = "heroku-postgresql:{}".format(quote(database_size))
+    redis_addon = "heroku-redis:{}".format(quote(redis_size))
+    addons = [postgres_addon, redis_addon, "papertrail"]
     if config.get("sentry"):
         addons.append("sentry")
 
-    for name in addons:
-        heroku_app.addon(name)
-
     heroku_config = {
         "AWS_ACCESS_KEY_ID": config["aws_access_key_id"],
         "AWS_SECRET_ACCESS_KEY": config["aws_secret_access_key"],
@@ -172,49 +244,86 @@ def deploy_sandbox_shared_setup(
     if preferred_class:
         heroku_config["EXPERIMENT_CLASS_NAME"] = preferred_class
 
-    heroku_app.set_multiple(**heroku_config)
+    def wait_for_redis():
+        log("Waiting for Redis (this can take a couple minutes)...")
+        while True:
+            try:
+                r = connect_to_redis(url=heroku_app.redis_url)
+                r.set("foo", "bar")
+            except (ValueError, redis.exceptions.ConnectionError):
+                time.sleep(2)
+            else:
+                log("✓ connected at {}".format(heroku_app.redis_url), chevrons=False)
+                return
+
+    def save_database_url():
+        # Reading the URL waits for the database to be ready.
+        config.extend({"database_url": heroku_app.db_url})
+        config.write()
+        git.add("config.txt")
+        git.commit("Save URL for database")
+
+    def save_dashboard_links():
+        heroku_addons = heroku_app.addon_parameters()
+        heroku_addons = json.dumps(heroku_addons)
+        if six.PY2:
+            heroku_addons = heroku_addons.decode("utf-8")
+        config.extend({"infrastructure_debug_details": heroku_addons})
+        config.write()
+        git.add("config.txt")
+        git.commit("Save URLs for heroku addon management")
+
+    graph = ProvisioningGraph(log)
+    graph.add("bootstrap", heroku_app.bootstrap)
+    graph.add(
+        "buildpack",
+        partial(
+            heroku_app.buildpack,
+            "https://github.com/stomita/heroku-buildpack-phantomjs",
+        ),
+        requires=["bootstrap"],
+    )
+    for name in addons:
+        graph.add(name, partial(heroku_app.addon, name), requires=["bootstrap"])
+    graph.add(
+        "config vars",
+        partial(heroku_app.set_multiple, **heroku_config),
+        requires=["bootstrap"],
+    )
+    graph.add("redis", wait_for_redis, requires=[redis_addon])
+    graph.add("database url", save_database_url, requires=[postgres_addon])
+    # Commits to the repository are made one at a time.
+    graph.add(
+        "dashboard links", save_dashboard_links, requires=addons + ["database url"]
+    )
+    graph.add(
+        "push",
+        partial(git.push, remote="heroku", branch="HEAD:master"),
+        requires=["buildpack", "config vars", "dashboard links"],
+    )
 
-    # Wait for Redis database to be ready.
-    log("Waiting for Redis (this can take a couple minutes)...", nl=False)
-    ready = False
-    while not ready:
-        try:
-            r = connect_to_redis(url=heroku_app.redis_url)
-            r.set("foo", "bar")
-            ready = True
-            log("\n✓ connected at {}".format(heroku_app.redis_url), chevrons=False)
-        except (ValueError, redis.exceptions.ConnectionError):
-            time.sleep(2)
-            log(".", chevrons=False, nl=False)
-
-    log("Saving the URL of the postgres database...")
-    config.extend({"database_url": heroku_app.db_url})
-    config.write()
-    git.add("config.txt")
-    git.commit("Save URL for database")
-
-    log("Generating dashboard links...")
-    heroku_addons = heroku_app.addon_parameters()
-    heroku_addons = json.dumps(heroku_addons)
-    if six.PY2:
-        heroku_addons = heroku_addons.decode("utf-8")
-    config.extend({"infrastructure_debug_details": heroku_addons})
-    config.write()
-    git.add("config.txt")
-    git.commit("Save URLs for heroku addon management")
-
-    # Launch the Heroku app.
-    log("Pushing code to Heroku...")
-    git.push(remote="heroku", branch="HEAD:master")
-
-    log("Scaling up the dynos...")
     default_size = config.get("dyno_type")
+    dynos = []
     for process in ["web", "worker"]:
         size = config.get("dyno_type_" + process, default_size)
         qty = config.get("num_dynos_" + process)
-        heroku_app.scale_up_dyno(process, qty, size)
+        dynos.append((process, qty, size))
     if config.get("clock_on"):
-        heroku_app.scale_up_dyno("clock", 1, size)
+        dynos.append(("clock", 1, size))
+    for process, qty, size in dynos:
+        graph.add(
+            "{} dynos".format(process),
+            partial(heroku_app.scale_up_dyno, process, qty, size),
+            requires=["push", "redis"],
+        )
+
+    parallel = config.get("heroku_parallel_provisioning", True)
+    log(
+        "Provisioning the app {}...".format(
+            "concurrently" if parallel else "one step at a time"
+        )
+    )
+    graph.run(parallel=parallel)
 
     if prelaunch_actions is not None:
         for task in prelaunch_actions:
@@ -1,9 +1,13 @@
 import os
+import shutil
+import tempfile
 import time
+from fnmatch import fnmatch
 from hashlib import sha256
 from pathlib import Path
 from shutil import which
 from subprocess import CalledProcessError, check_output
+from typing import Dict, List
 
 import click
 import docker
@@ -11,8 +15,14 @@ from jinja2 import Template
 from pip._internal.network.session import PipSession
 from pip._internal.req import parse_requirements
 
+from dallinger import bundles
+from dallinger.config import get_config
 from dallinger.docker.wheel_filename import parse_wheel_filename
-from dallinger.utils import abspath_from_egg, get_editable_dallinger_path
+from dallinger.utils import (
+    abspath_from_egg,
+    dallinger_package_path,
+    get_editable_dallinger_path,
+)
 
 docker_compose_template = Template(
     abspath_from_egg("dallinger", "dallinger/docker/docker-compose.yml.j2").read_text()
@@ -258,21 +268,115 @@ def get_experiment_image_tag(experiment_tmp_path: str) -> str:
     as long as no dependencies or build script changed.
     The experiment directory can then be mounted to have the latest changes.
     This saves the need to rebuild the image too often.
+
+    The files' hashes are taken from the bundle's manifest when they are
+    unchanged since the bundle was assembled.
     """
     files = "requirements.txt", "prepare_docker_image.sh"
     hash = sha256()
-    for filename in files:
-        filepath = Path(experiment_tmp_path) / filename
-        hash.update(filepath.read_bytes())
+    for digest in bundles.file_digests(experiment_tmp_path, files):
+        hash.update(digest.encode("ascii"))
     return hash.hexdigest()[:8]
 
 
+#: Files installed before the experiment's files are copied into the image.
+DEPENDENCY_FILES = ("requirements.txt", "prepare_docker_image.sh")
+
+#: Layers of experiment files in a generated image, from the least to the
+#: most frequently changed.
+IMAGE_LAYERS = ("dallinger", "assets", "code")
+
+
+def split_image_layers(experiment_tmp_path: str) -> Dict[str, List[str]]:
+    """Group the files of an experiment bundle into the layers of its image,
+    returning the relative paths of each layer's files.
+
+    Files identical to Dallinger's frontend files change only with Dallinger.
+    Other static files, and large files like media, change less often than
+    the experiment's code and configuration.
+    """
+    root = Path(experiment_tmp_path)
+    frontend = Path(dallinger_package_path()) / "frontend"
+    paths = []
+    for path in sorted(root.rglob("*")):
+        relative = path.relative_to(root).as_posix()
+        if path.is_dir() or relative in DEPENDENCY_FILES or relative == "Dockerfile":
+            continue
+        if fnmatch(relative, "dallinger-*.whl"):
+            continue
+        paths.append(relative)
+
+    # Only files the same size as a frontend file at the same path are hashed.
+    candidates = [
+        relative
+        for relative in paths
+        if (frontend / relative).is_file()
+        and (frontend / relative).stat().st_size == (root / relative).stat().st_size
+    ]
+    cache = bundles.BundleCache.open()
+    digest = cache.digest if cache else bundles.hash_file
+    from_dallinger = {
+        relative
+        for relative, file_digest in zip(
+            candidates, bundles.file_digests(root, candidates)
+        )
+        if digest(str(frontend / relative)) == file_digest
+    }
+
+    layers = {layer: [] for layer in IMAGE_LAYERS}
+    for relative in paths:
+        if relative in from_dallinger:
+            layers["dallinger"].append(relative)
+        elif (
+            relative.startswith("static/")
+            or (root / relative).stat().st_size >= bundles.LINK_MIN_SIZE
+        ):
+            layers["assets"].append(relative)
+        else:
+            layers["code"].append(relative)
+    if cache:
+        cache.save()
+    return layers
+
+
+def stage_build_context(experiment_tmp_path: str, context_dir: str):
+    """Link the files of an experiment bundle into a docker build context,
+    with the dependency files at its root and the rest in a directory per
+    layer under ``layers``.
+    """
+    root = Path(experiment_tmp_path)
+    context = Path(context_dir)
+    placements = [
+        (path, context / path.name)
+        for path in root.iterdir()
+        if path.name in DEPENDENCY_FILES or fnmatch(path.name, "dallinger-*.whl")
+    ]
+    for layer, paths in split_image_layers(experiment_tmp_path).items():
+        (context / "layers" / layer).mkdir(parents=True)
+        placements.extend(
+            (root / relative, context / "layers" / layer / relative)
+            for relative in paths
+        )
+    for source, target in placements:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+
 def build_image(
-    tmp_dir, base_image_name, out, needs_chrome=False, force_build=True
+    tmp_dir, base_image_name, out, needs_chrome=False, force_build=True, pip_cache=None
 ) -> str:
     """Build the docker image for the experiment and return its name.
     If force_build=False, then the image will only be rebuilt if requirements.txt or prepare_docker_image.sh
     have changed.
+
+    Unless the experiment has its own Dockerfile, the experiment's files are
+    copied into separate layers (see ``split_image_layers``), so that a
+    change to some of them only rebuilds, and pushes, their layer. With
+    pip_cache (by default the ``docker_pip_cache`` config value) pip's cache
+    is kept between builds in a BuildKit cache mount.
     """
     tag = get_experiment_image_tag(tmp_dir)
     image_name = f"{base_image_name}:{tag}"
@@ -287,12 +391,27 @@ def build_image(
     except docker.errors.ImageNotFound:
         out.blather(f"Image {image_name} not found - building\n")
 
+    if pip_cache is None:
+        pip_cache = get_config().get("docker_pip_cache", False)
+    pip_mount = "--mount=type=cache,target=/root/.cache/pip" if pip_cache else ""
+
     env = {
         **os.environ.copy(),
         "DOCKER_BUILDKIT": "1",
     }
     ssh_mount = ""
-    docker_build_invocation = [which("docker"), "build", str(tmp_dir)]
+    dockerfile_path = Path(tmp_dir) / "Dockerfile"
+    if dockerfile_path.exists():
+        out.blather(
+            "Found a custom Dockerfile in the experiment directory, will use this for deployment."
+        )
+        context_dir = None
+    else:
+        context_dir = tempfile.mkdtemp()
+        stage_build_context(tmp_dir, context_dir)
+        dockerfile_path = Path(context_dir) / "Dockerfile"
+
+    docker_build_invocation = [which("docker"), "build", context_dir or str(tmp_dir)]
     if os.environ.get("SSH_AUTH_SOCK"):
         env["SSH_AUTH_SOCK"] = os.environ.get("SSH_AUTH_SOCK")
         ssh_mount = "--mount=type=ssh"
@@ -301,16 +420,11 @@ def build_image(
             "build",
             "--ssh",
             "default",
-            str(tmp_dir),
+            context_dir or str(tmp_dir),
         ]
 
     docker_build_invocation += ["-t", image_name]
-    dockerfile_path = Path(tmp_dir) / "Dockerfile"
-    if dockerfile_path.exists():
-        out.blather(
-            "Found a custom Dockerfile in the experiment directory, will use this for deployment."
-        )
-    else:
+    if context_dir:
         dockerfile_text = rf"""# syntax=docker/dockerfile:1
         FROM {base_image_name}
         #
@@ -323,7 +437,7 @@ def build_image(
         #
         # If a dallinger wheel is present, install it.
         # This will be true if Dallinger was installed with the editable `-e` flag
-        RUN if [ -f dallinger-*.whl ]; then pip install dallinger-*.whl; fi
+        RUN {pip_mount} if [ -f dallinger-*.whl ]; then pip install dallinger-*.whl; fi
         # If a dependency needs the ssh client and git, install them
         RUN grep git+ requirements.txt && \
             apt-get update && \
@@ -340,9 +454,13 @@ def build_image(
         # If they do the grep command will exit non-0, the pip command will not run
         # but the whole `RUN` group will succeed thanks to the last `true` invocation
         RUN mkdir -p ~/.ssh && echo "Host *\n    StrictHostKeyChecking no" >> ~/.ssh/config
-        RUN {ssh_mount} grep -v ^dallinger requirements.txt > /tmp/requirements_no_dallinger.txt && \
+        RUN {ssh_mount} {pip_mount} grep -v ^dallinger requirements.txt > /tmp/requirements_no_dallinger.txt && \
             python3 -m pip install -r /tmp/requirements_no_dallinger.txt || true
-        COPY . /experiment
+        # The experiment's files, from the least to the most frequently changed.
+        # Linked layers are reused even when the layers before them change.
+        COPY --link layers/dallinger/ /experiment/
+        COPY --link layers/assets/ /experiment/
+        COPY --link layers/code/ /experiment/
         ENV PORT=5000
         CMD dallinger_heroku_web
         """
@@ -351,5 +469,8 @@ def build_image(
         check_output(docker_build_invocation, env=env)
     except CalledProcessError:
         raise BuildError
+    finally:
+        if context_dir:
+            shutil.rmtree(context_dir, ignore_errors=True)
     out.blather(f"Built image: {image_name}" + "\n")
     return image_name
@@ -12,11 +12,10 @@ import sys
 import time
 import uuid
 import warnings
-from collections import Counter, OrderedDict
+from collections import OrderedDict
 from contextlib import contextmanager
 from functools import wraps
 from importlib import import_module
-from operator import itemgetter
 from typing import List, Optional, Union
 
 import requests
@@ -823,9 +822,15 @@ class Experiment(object):
 
     def log_summary(self):
         """Log a summary of all the participants' status codes."""
-        participants = Participant.query.with_entities(Participant.status).all()
-        counts = Counter([p.status for p in participants])
-        sorted_counts = sorted(counts.items(), key=itemgetter(0))
+        counts = (
+            Participant.query.with_entities(
+                Participant.status, func.count(Participant.id)
+            )
+            .group_by(Participant.status)
+            .order_by(Participant.status)
+            .all()
+        )
+        sorted_counts = [(status, count) for status, count in counts]
         self.log("Status summary: {}".format(str(sorted_counts)))
         return sorted_counts
 
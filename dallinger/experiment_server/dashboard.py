@@ -225,6 +225,7 @@ dashboard_tabs = DashboardTabs(
         DashboardTab("Monitoring", "dashboard.monitoring"),
         DashboardTab("Lifecycle", "dashboard.lifecycle"),
         DashboardTab("Database", "dashboard.database", database_children),
+        DashboardTab("SQL Profile", "dashboard.sql_profile"),
         DashboardTab("Development", "dashboard.develop"),
     ]
 )
@@ -571,11 +572,9 @@ def mturk():
 @dashboard.route("/auto_recruit/<bool_val>", methods=["POST"])
 @login_required
 def auto_recruit(bool_val):
-    from dallinger.db import redis_conn
-
     num_val = int(bool_val)
     assert num_val in [0, 1]
-    redis_conn.set("auto_recruit", num_val)
+    get_config().set_changeable("auto_recruit", bool(num_val))
     return success_response()
 
 
@@ -793,6 +792,29 @@ def database():
     )
 
 
+@dashboard.route("/sql_profile")
+@login_required
+def sql_profile():
+    """Per-route SQL statement counts and timings from sampled requests."""
+    from dallinger import profiling
+
+    return render_template(
+        "dashboard_sql_profile.html",
+        title="SQL Profile",
+        sample_rate=get_config().get("sql_profile_sample_rate", 0),
+        routes=profiling.route_stats(),
+    )
+
+
+@dashboard.route("/sql_profile/reset", methods=["POST"])
+@login_required
+def sql_profile_reset():
+    from dallinger import profiling
+
+    profiling.reset()
+    return success_response()
+
+
 @dashboard.route("/develop", methods=["GET", "POST"])
 @login_required
 def develop():
@@ -1,7 +1,7 @@
 """ This module provides the backend Flask server that serves an experiment. """
 
 import os
-import re
+import time
 from datetime import datetime
 from json import dumps, loads
 
@@ -10,6 +10,8 @@ from flask import (
     Flask,
     Response,
     abort,
+    g,
+    has_app_context,
     redirect,
     render_template,
     request,
@@ -18,18 +20,27 @@ from flask import (
 )
 from flask_login import LoginManager, current_user, login_required
 from jinja2 import TemplateNotFound
-from psycopg2.extensions import TransactionRollbackError
 from rq import Queue
-from sqlalchemy import exc, func
-from sqlalchemy.orm.exc import MultipleResultsFound, NoResultFound
-from sqlalchemy.sql.expression import true
-
-from dallinger import db, experiment, models, recruiters
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.sql.expression import false, true
+
+from dallinger import (
+    db,
+    experiment,
+    metrics,
+    models,
+    profiling,
+    recruiters,
+    tracking,
+    waiting_room,
+)
 from dallinger.config import get_config
 from dallinger.notifications import MessengerError, admin_notifier
 from dallinger.utils import generate_random_id
 
 from . import dashboard
+from .page_cache import PageCache
 from .replay import ReplayBackend
 from .utils import (
     ExperimentError,
@@ -51,6 +62,7 @@ q = Queue("default", connection=redis_conn)
 WAITING_ROOM_CHANNEL = "quorum"
 
 app = Flask("Experiment_Server")
+pages = PageCache(app)
 
 
 @app.before_request
@@ -58,6 +70,42 @@ def _load_config():
     _config()
 
 
+@app.before_request
+def _start_sql_profile():
+    if request.url_rule is not None:
+        profiling.start("{} {}".format(request.method, request.url_rule.rule))
+
+
+@app.teardown_request
+def _finish_sql_profile(_=None):
+    profiling.finish()
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.monotonic()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None or not metrics.enabled():
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    metrics.record_request(
+        request.method, route, response.status_code, time.monotonic() - started
+    )
+    metrics.publish_process_gauges("web", _websocket_gauges())
+    return response
+
+
+def _websocket_gauges():
+    return [
+        ("dallinger_websocket_clients", {"channel": name}, len(channel.clients))
+        for name, channel in list(sockets.chat_backend.channels.items())
+    ]
+
+
 @app.before_request
 def check_for_protected_routes():
     if current_user.is_authenticated:
@@ -68,6 +116,8 @@ def check_for_protected_routes():
     except AttributeError:
         return
 
+    # A session-less instance, so requests for static files and cached
+    # pages don't touch the database before they're routed.
     protected = Experiment(None).protected_routes
     if active_rule in protected:
         raise PermissionError(
@@ -95,6 +145,20 @@ def Experiment(args):
     return klass(args)
 
 
+def request_experiment():
+    """Return the experiment instance for the current request.
+
+    The instance is created on first use and cached on ``flask.g``, so the
+    route and the helpers it calls share one instance rather than each
+    loading and configuring the experiment class.
+    """
+    if not has_app_context():
+        return Experiment(session)
+    if "experiment" not in g:
+        g.experiment = Experiment(session)
+    return g.experiment
+
+
 # Load the experiment's extra routes, if any.
 try:
     from dallinger_experiment.experiment import extra_routes
@@ -249,7 +313,7 @@ def shutdown_session(_=None):
 @app.context_processor
 def inject_experiment():
     """Inject experiment and enviroment variables into the template context."""
-    exp = Experiment(session)
+    exp = request_experiment()
     return dict(experiment=exp, env=os.environ)
 
 
@@ -372,7 +436,7 @@ def handle_error():
         ),
     }
     db.logger.debug("Reporting HIT error...")
-    messenger = admin_notifier(config)
+    messenger = admin_notifier(config, queued=True)
     try:
         messenger.send(**message)
     except MessengerError as ex:
@@ -490,7 +554,6 @@ def launch():
 
 
 def prepare_advertisement():
-    session = db.session
     config = _config()
     mode = config.get("mode")
 
@@ -510,7 +573,7 @@ def prepare_advertisement():
         return True, {"redirect": redirect(url_for("advertisement", **redirect_params))}
 
     app_id = config.get("id", "unknown")
-    exp = Experiment(session)
+    exp = request_experiment()
     entry_data = exp.normalize_entry_information(entry_information)
 
     hit_id = entry_data.get("hit_id")
@@ -601,74 +664,101 @@ def recruiter_exit():
     # Get the recruiter from the participant rather than config, to support
     # MultiRecruiter experiments
     recruiter = recruiters.by_name(participant.recruiter_id)
-    exp = Experiment(session)
+    exp = request_experiment()
 
     return recruiter.exit_response(experiment=exp, participant=participant)
 
 
-@app.route("/summary", methods=["GET"])
-def summary():
-    """Summarize the participants' status codes."""
-    exp = Experiment(session)
+SUMMARY_CACHE_KEY = "summary"
+NONFAILED_STATUSES = waiting_room.NONFAILED_STATUSES
+
+
+def _summary_state(exp):
+    """Compute the state reported by the summary route."""
     state = {
         "status": "success",
         "summary": exp.log_summary(),
         "completed": exp.is_complete(),
     }
+    counts = dict(state["summary"])
     unfilled_nets = (
-        models.Network.query.filter(models.Network.full != true())
-        .with_entities(models.Network.id, models.Network.max_size)
+        session.query(models.Network.max_size, func.count(models.Node.id))
+        .outerjoin(
+            models.Node,
+            and_(
+                models.Node.network_id == models.Network.id,
+                models.Node.failed == false(),
+            ),
+        )
+        .filter(models.Network.full != true())
+        .group_by(models.Network.id)
         .all()
     )
-    working = (
-        models.Participant.query.filter_by(status="working")
-        .with_entities(func.count(models.Participant.id))
-        .scalar()
-    )
     state["unfilled_networks"] = len(unfilled_nets)
-    nodes_remaining = 0
-    required_nodes = 0
     if state["unfilled_networks"] == 0:
-        if working == 0 and state["completed"] is None:
+        if counts.get("working", 0) == 0 and state["completed"] is None:
             state["completed"] = True
-    else:
-        for net in unfilled_nets:
-            node_count = (
-                models.Node.query.filter_by(network_id=net.id, failed=False)
-                .with_entities(func.count(models.Node.id))
-                .scalar()
-            )
-            net_size = net.max_size
-            required_nodes += net_size
-            nodes_remaining += net_size - node_count
-    state["nodes_remaining"] = nodes_remaining
-    state["required_nodes"] = required_nodes
+    state["nodes_remaining"] = sum(size - count for size, count in unfilled_nets)
+    state["required_nodes"] = sum(size for size, _ in unfilled_nets)
 
     if state["completed"] is None:
         state["completed"] = False
 
+    return state
+
+
+@app.route("/summary", methods=["GET"])
+def summary():
+    """Summarize the participants' status codes.
+
+    The summary is cached in redis for ``summary_cache_ttl`` seconds, and
+    the response carries an ETag, so pollers sending ``If-None-Match`` get
+    a 304 when nothing has changed.
+    """
+    exp = request_experiment()
+    ttl = _config().get("summary_cache_ttl", 0)
+    state = None
+    if ttl:
+        cached = redis_conn.get(SUMMARY_CACHE_KEY)
+        if cached is not None:
+            state = loads(cached)
+    if state is None:
+        state = _summary_state(exp)
+        if ttl:
+            redis_conn.set(SUMMARY_CACHE_KEY, dumps(state), px=int(ttl * 1000))
+
     # Regenerate a waiting room message when checking status
     # to counter missed messages at the end of the waiting room
-    nonfailed_count = models.Participant.query.filter(
-        (models.Participant.status == "working")
-        | (models.Participant.status == "overrecruited")
-        | (models.Participant.status == "submitted")
-        | (models.Participant.status == "approved")
-    ).count()
-    exp = Experiment(session)
-    overrecruited = exp.is_overrecruited(nonfailed_count)
     if exp.quorum:
+        counts = dict(state["summary"])
+        nonfailed_count = sum(counts.get(status, 0) for status in NONFAILED_STATUSES)
+        overrecruited = exp.is_overrecruited(nonfailed_count)
         quorum = {"q": exp.quorum, "n": nonfailed_count, "overrecruited": overrecruited}
         db.queue_message(WAITING_ROOM_CHANNEL, dumps(quorum))
 
-    return Response(dumps(state), status=200, mimetype="application/json")
+    response = Response(dumps(state), status=200, mimetype="application/json")
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route("/metrics", methods=["GET"])
+@login_required
+def prometheus_metrics():
+    """Export the metrics of all the experiment's processes for Prometheus.
+
+    Requires the dashboard credentials, which scrapers can send with HTTP
+    basic authentication.
+    """
+    if metrics.enabled():
+        metrics.publish_process_gauges("web", _websocket_gauges(), force=True)
+    return Response(metrics.render(), status=200, mimetype=metrics.CONTENT_TYPE)
 
 
 @app.route("/experiment_property/<prop>", methods=["GET"])
 @app.route("/experiment/<prop>", methods=["GET"])
 def experiment_property(prop):
     """Get a property of the experiment by name."""
-    exp = Experiment(session)
+    exp = request_experiment()
     try:
         value = exp.public_properties[prop]
     except KeyError:
@@ -680,7 +770,7 @@ def experiment_property(prop):
 def get_page(page):
     """Return the requested page."""
     try:
-        return render_template(page + ".html")
+        return pages.response(page + ".html")
     except TemplateNotFound:
         abort(404)
 
@@ -688,7 +778,7 @@ def get_page(page):
 @app.route("/<directory>/<page>", methods=["GET"])
 def get_page_from_directory(directory, page):
     """Get a page from a given directory."""
-    return render_template(directory + "/" + page + ".html")
+    return pages.response(directory + "/" + page + ".html")
 
 
 @app.route("/consent")
@@ -697,13 +787,13 @@ def consent():
     config = _config()
 
     entry_information = request.args.to_dict()
-    exp = Experiment(session)
+    exp = request_experiment()
     entry_data = exp.normalize_entry_information(entry_information)
 
     hit_id = entry_data.get("hit_id")
     assignment_id = entry_data.get("assignment_id")
     worker_id = entry_data.get("worker_id")
-    return render_template(
+    return pages.response(
         "consent.html",
         hit_id=hit_id,
         assignment_id=assignment_id,
@@ -716,6 +806,86 @@ def consent():
 """Routes for reading and writing to the database."""
 
 
+class Parameter(object):
+    """Declares a request parameter, for parsing with
+    :func:`request_parameters`.
+
+    parameter is the name of the parameter you are looking for
+    parameter_type is the type the parameter should have
+    default is the value the parameter takes if it has not been passed
+    """
+
+    def __init__(self, parameter, parameter_type=None, default=None, optional=False):
+        self.parameter = parameter
+        self.parameter_type = parameter_type
+        self.default = default
+        self.optional = optional
+
+    def parse(self):
+        """Get this parameter from the current request.
+
+        If the parameter is not found and no default is specified,
+        or if the parameter is found but is of the wrong type
+        then a Response object is returned
+        """
+        parameter = self.parameter
+        parameter_type = self.parameter_type
+
+        # get the parameter
+        try:
+            value = request.values[parameter]
+        except KeyError:
+            # if it isnt found use the default, or return an error Response
+            if self.default is not None:
+                return self.default
+            elif self.optional:
+                return None
+            else:
+                msg = "{} {} request, {} not specified".format(
+                    request.url, request.method, parameter
+                )
+                return error_response(error_type=msg)
+
+        # check the parameter type
+        if parameter_type is None:
+            # if no parameter_type is required, return the parameter as is
+            return value
+        elif parameter_type == "int":
+            # if int is required, convert to an int
+            try:
+                value = int(value)
+                return value
+            except ValueError:
+                msg = "{} {} request, non-numeric {}: {}".format(
+                    request.url, request.method, parameter, value
+                )
+                return error_response(error_type=msg)
+        elif parameter_type == "known_class":
+            # if its a known class check against the known classes
+            try:
+                value = request_experiment().known_classes[value]
+                return value
+            except KeyError:
+                msg = "{} {} request, unknown_class: {} for parameter {}".format(
+                    request.url, request.method, value, parameter
+                )
+                return error_response(error_type=msg)
+        elif parameter_type == "bool":
+            # if its a boolean, convert to a boolean
+            if value in ["True", "False"]:
+                return value == "True"
+            else:
+                msg = "{} {} request, non-boolean {}: {}".format(
+                    request.url, request.method, parameter, value
+                )
+                return error_response(error_type=msg)
+        else:
+            msg = "/{} {} request, unknown parameter type: {} for parameter {}".format(
+                request.url, request.method, parameter_type, parameter
+            )
+            return error_response(error_type=msg)
+
+
 def request_parameter(parameter, parameter_type=None, default=None, optional=False):
     """Get a parameter from a request.
 
@@ -727,61 +897,29 @@ def request_parameter(parameter, parameter_type=None, default=None, optional=Fal
     or if the parameter is found but is of the wrong type
     then a Response object is returned
     """
-    exp = Experiment(session)
+    return Parameter(parameter, parameter_type, default, optional).parse()
 
-    # get the parameter
-    try:
-        value = request.values[parameter]
-    except KeyError:
-        # if it isnt found use the default, or return an error Response
-        if default is not None:
-            return default
-        elif optional:
-            return None
-        else:
-            msg = "{} {} request, {} not specified".format(
-                request.url, request.method, parameter
-            )
-            return error_response(error_type=msg)
 
-    # check the parameter type
-    if parameter_type is None:
-        # if no parameter_type is required, return the parameter as is
-        return value
-    elif parameter_type == "int":
-        # if int is required, convert to an int
-        try:
-            value = int(value)
-            return value
-        except ValueError:
-            msg = "{} {} request, non-numeric {}: {}".format(
-                request.url, request.method, parameter, value
-            )
-            return error_response(error_type=msg)
-    elif parameter_type == "known_class":
-        # if its a known class check against the known classes
-        try:
-            value = exp.known_classes[value]
+def request_parameters(schema):
+    """Parse and validate all the parameters a route declares at once.
+
+    schema is a sequence of :class:`Parameter`. Returns a dict of values
+    keyed by parameter name, or the error Response for the first parameter
+    that is missing or invalid.
+    """
+    values = {}
+    for spec in schema:
+        value = spec.parse()
+        if isinstance(value, Response):
             return value
-        except KeyError:
-            msg = "{} {} request, unknown_class: {} for parameter {}".format(
-                request.url, request.method, value, parameter
-            )
-            return error_response(error_type=msg)
-    elif parameter_type == "bool":
-        # if its a boolean, convert to a boolean
-        if value in ["True", "False"]:
-            return value == "True"
-        else:
-            msg = "{} {} request, non-boolean {}: {}".format(
-                request.url, request.method, parameter, value
-            )
-            return error_response(error_type=msg)
-    else:
-        msg = "/{} {} request, unknown parameter type: {} for parameter {}".format(
-            request.url, request.method, parameter_type, parameter
-        )
-        return error_response(error_type=msg)
+        values[spec.parameter] = value
+    return values
+
+
+#: The optional parameters :func:`assign_properties` copies onto objects.
+PROPERTY_PARAMETERS = [Parameter("details", optional=True)] + [
+    Parameter("property{}".format(i), optional=True) for i in range(1, 6)
+]
 
 
 def assign_properties(thing):
@@ -790,19 +928,24 @@ def assign_properties(thing):
     When creating something via a post request (e.g. a node), you can pass the
     properties of the object in the request. This function gets those values
     from the request and fills in the relevant columns of the table.
+
+    The request's properties are only parsed once, however many objects they
+    are assigned to. Committing the changes is left to the caller.
     """
-    details = request_parameter(parameter="details", optional=True)
+    if "properties" not in g:
+        g.properties = request_parameters(PROPERTY_PARAMETERS)
+    properties = g.properties
+
+    details = properties["details"]
     if details:
         setattr(thing, "details", loads(details))
 
     for p in range(5):
         property_name = "property" + str(p + 1)
-        property = request_parameter(parameter=property_name, optional=True)
+        property = properties[property_name]
         if property:
             setattr(thing, property_name, property)
 
-    session.commit()
-
 
 @app.route("/participant/<worker_id>/<hit_id>/<assignment_id>/<mode>", methods=["POST"])
 @db.serialized
@@ -817,19 +960,6 @@ def create_participant(worker_id, hit_id, assignment_id, mode, entry_information
     if not config.ready:
         config.load()
 
-    if config.get("lock_table_when_creating_participant"):
-        # Historically we have locked the participant table when creating participants
-        # to avoid database inconsistency problems. However some experimenters have experienced
-        # some deadlocking problems associated with this locking, so we have made
-        # it an opt-out behavior.
-        try:
-            session.connection().execute(
-                "LOCK TABLE participant IN EXCLUSIVE MODE NOWAIT"
-            )
-        except exc.OperationalError as e:
-            e.orig = TransactionRollbackError()
-            raise e
-
     missing = [p for p in (worker_id, hit_id, assignment_id) if p == "undefined"]
     if missing:
         msg = "/participant POST: required values were 'undefined'"
@@ -838,16 +968,37 @@ def create_participant(worker_id, hit_id, assignment_id, mode, entry_information
     fingerprint_hash = request.args.get("fingerprint_hash") or request.form.get(
         "fingerprint_hash"
     )
-    fingerprint_found = False
+
+    # Find any participants with the same worker id or fingerprint, or
+    # still working on the same assignment, in one indexed query.
+    Participant = models.Participant
+    criteria = [
+        Participant.worker_id == worker_id,
+        and_(
+            Participant.assignment_id == assignment_id,
+            Participant.status == "working",
+        ),
+    ]
     if fingerprint_hash:
-        try:
-            fingerprint_found = models.Participant.query.filter_by(
-                fingerprint_hash=fingerprint_hash
-            ).one_or_none()
-        except MultipleResultsFound:
+        criteria.append(Participant.fingerprint_hash == fingerprint_hash)
+    matches = session.query(
+        Participant.id,
+        Participant.worker_id,
+        Participant.assignment_id,
+        Participant.status,
+        Participant.fingerprint_hash,
+    ).filter(or_(*criteria))
+    fingerprint_found = already_participated = False
+    duplicate_id = None
+    for match in matches:
+        if fingerprint_hash and match.fingerprint_hash == fingerprint_hash:
             fingerprint_found = True
+        if match.worker_id == worker_id:
+            already_participated = True
+        elif match.assignment_id == assignment_id and match.status == "working":
+            duplicate_id = match.id
 
-    if fingerprint_hash and fingerprint_found:
+    if fingerprint_found:
         db.logger.warning("Same browser fingerprint detected.")
 
         if mode == "live":
@@ -855,43 +1006,24 @@ def create_participant(worker_id, hit_id, assignment_id, mode, entry_information
                 error_type="/participant POST: Same participant dectected.", status=403
             )
 
-    already_participated = models.Participant.query.filter_by(
-        worker_id=worker_id
-    ).one_or_none()
-
     if already_participated:
         db.logger.warning("Worker has already participated.")
         return error_response(
             error_type="/participant POST: worker has already participated.", status=403
         )
 
-    duplicate = models.Participant.query.filter_by(
-        assignment_id=assignment_id, status="working"
-    ).one_or_none()
-
-    if duplicate:
+    if duplicate_id is not None:
         msg = """
             AWS has reused assignment_id while existing participant is
             working. Replacing older participant {}.
         """
-        app.logger.warning(msg.format(duplicate.id))
-        q.enqueue(worker_function, "AssignmentReassigned", None, duplicate.id)
-
-    # Count working or beyond participants.
-    nonfailed_count = (
-        models.Participant.query.filter(
-            (models.Participant.status == "working")
-            | (models.Participant.status == "overrecruited")
-            | (models.Participant.status == "submitted")
-            | (models.Participant.status == "approved")
-        ).count()
-        + 1
-    )
+        app.logger.warning(msg.format(duplicate_id))
+        q.enqueue(worker_function, "AssignmentReassigned", None, duplicate_id)
 
     recruiter_name = request.args.get("recruiter")
 
     # Create the new participant.
-    exp = Experiment(session)
+    exp = request_experiment()
     participant_vals = {
         "worker_id": worker_id,
         "hit_id": hit_id,
@@ -911,9 +1043,11 @@ def create_participant(worker_id, hit_id, assignment_id, mode, entry_information
         return error_response(error_type=msg, status=400)
 
     session.flush()
-    overrecruited = exp.is_overrecruited(nonfailed_count)
-    if overrecruited:
-        participant.status = "overrecruited"
+    if exp.quorum:
+        # Count working or beyond participants, including this one.
+        nonfailed_count = waiting_room.admit(worker_id)
+        if exp.is_overrecruited(nonfailed_count):
+            participant.status = "overrecruited"
 
     result = {
         "participant": {
@@ -946,7 +1080,7 @@ def post_participant():
         del entry_information["fingerprint_hash"]
     # Remove the mode from entry_information if provided
     mode = entry_information.pop("mode", config.get("mode"))
-    exp = Experiment(session)
+    exp = request_experiment()
     participant_info = exp.normalize_entry_information(entry_information)
     return create_participant(mode=mode, **participant_info)
 
@@ -971,7 +1105,7 @@ def load_participant():
     Delegates to :func:`~dallinger.experiments.Experiment.load_participant`.
     """
     entry_information = request.form.to_dict()
-    exp = Experiment(session)
+    exp = request_experiment()
     participant_info = exp.normalize_entry_information(entry_information)
 
     assignment_id = participant_info.get("assignment_id")
@@ -1001,6 +1135,13 @@ def get_network(network_id):
     return success_response(network=net.__json__())
 
 
+QUESTION_POST_PARAMETERS = [
+    Parameter("question"),
+    Parameter("response"),
+    Parameter("number", parameter_type="int"),
+]
+
+
 @app.route("/question/<participant_id>", methods=["POST"])
 def create_question(participant_id):
     """Send a POST request to the question table.
@@ -1018,12 +1159,12 @@ def create_question(participant_id):
             error_type="/question POST no participant found", status=403
         )
 
-    question = request_parameter(parameter="question")
-    response = request_parameter(parameter="response")
-    number = request_parameter(parameter="number", parameter_type="int")
-    for x in [question, response, number]:
-        if isinstance(x, Response):
-            return x
+    params = request_parameters(QUESTION_POST_PARAMETERS)
+    if isinstance(params, Response):
+        return params
+    question = params["question"]
+    response = params["response"]
+    number = params["number"]
 
     # Consult the recruiter regarding whether to accept a questionnaire
     # from the participant:
@@ -1068,7 +1209,7 @@ def node_neighbors(node_id):
     After getting the neighbours it also calls
     exp.node_get_request()
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # get the parameters
     node_type = request_parameter(
@@ -1120,7 +1261,7 @@ def create_node(participant_id):
         3. exp.add_node_to_network
         4. exp.node_post_request
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # Get the participant.
     try:
@@ -1157,7 +1298,7 @@ def node_vectors(node_id):
     You can pass direction (incoming/outgoing/all) and failed
     (True/False/all).
     """
-    exp = Experiment(session)
+    exp = request_experiment()
     # get the parameters
     direction = request_parameter(parameter="direction", default="all")
     failed = request_parameter(parameter="failed", parameter_type="bool", default=False)
@@ -1192,7 +1333,7 @@ def connect(node_id, other_node_id):
     The ids of both nodes must be speficied in the url.
     You can also pass direction (to/from/both) as an argument.
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # get the parameters
     direction = request_parameter(parameter="direction", default="to")
@@ -1237,7 +1378,7 @@ def get_info(node_id, info_id):
 
     Both the node and info id must be specified in the url.
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # check the node exists
     node = models.Node.query.get(node_id)
@@ -1281,7 +1422,7 @@ def node_infos(node_id):
     The node id must be specified in the url.
     You can also pass info_type.
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # get the parameters
     info_type = request_parameter(
@@ -1320,7 +1461,7 @@ def node_received_infos(node_id):
     You must specify the node id in the url.
     You can also pass the info type.
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # get the parameters
     info_type = request_parameter(
@@ -1379,6 +1520,58 @@ def tracking_event_post(node_id):
     return success_response(details=details)
 
 
+TRACKING_EVENTS_POST_PARAMETERS = [
+    Parameter("events"),
+    Parameter("dropped", parameter_type="int", default=0),
+]
+
+
+@app.route("/tracking_events/<int:node_id>", methods=["POST"])
+@crossdomain(origin="*")
+def tracking_events_post(node_id):
+    """Queue a batch of TrackingEvents for the specified Node.
+
+    You must pass events, a JSON list of the details of each event, and may
+    pass dropped, the number of events the browser discarded since its last
+    batch. The events are inserted by a worker, which discards those for
+    nodes that do not exist.
+    """
+    params = request_parameters(TRACKING_EVENTS_POST_PARAMETERS)
+    if isinstance(params, Response):
+        return params
+
+    try:
+        events = loads(params["events"])
+    except ValueError:
+        events = None
+    if not isinstance(events, list) or not all(isinstance(e, dict) for e in events):
+        return error_response(
+            error_type="/tracking_events POST, events must be a list of objects"
+        )
+    if len(events) > tracking.MAX_BATCH:
+        return error_response(
+            error_type="/tracking_events POST, more than {} events".format(
+                tracking.MAX_BATCH
+            ),
+            status=413,
+        )
+
+    if not tracking.append(node_id, events, dropped=params["dropped"]):
+        return error_response(
+            error_type="/tracking_events POST, too many events waiting",
+            status=503,
+            simple=True,
+        )
+    return success_response(accepted=len(events))
+
+
+INFO_POST_PARAMETERS = [
+    Parameter("contents"),
+    Parameter("info_type", parameter_type="known_class", default=models.Info),
+    Parameter("failed", parameter_type="bool", default=False),
+]
+
+
 @app.route("/info/<int:node_id>", methods=["POST"])
 @crossdomain(origin="*")
 def info_post(node_id):
@@ -1392,21 +1585,19 @@ def info_post(node_id):
     added to the known_classes of the experiment class.
     """
     # get the parameters and validate them
-    contents = request_parameter(parameter="contents")
-    info_type = request_parameter(
-        parameter="info_type", parameter_type="known_class", default=models.Info
-    )
-    failed = request_parameter(parameter="failed", parameter_type="bool", default=False)
+    params = request_parameters(INFO_POST_PARAMETERS)
+    if isinstance(params, Response):
+        return params
+    contents = params["contents"]
+    info_type = params["info_type"]
+    failed = params["failed"]
 
-    for x in [contents, info_type]:
-        if isinstance(x, Response):
-            return x
     # check the node exists
     node = models.Node.query.get(node_id)
     if node is None:
         return error_response(error_type="/info POST, node does not exist")
 
-    exp = Experiment(session)
+    exp = request_experiment()
     try:
         # execute the request
         additional_params = {}
@@ -1438,7 +1629,7 @@ def node_transmissions(node_id):
     You can also pass direction (to/from/all) or status (all/pending/received)
     as arguments.
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # get the parameters
     direction = request_parameter(parameter="direction", default="incoming")
@@ -1501,7 +1692,7 @@ def node_transmit(node_id):
          to_whom: 10}
     );
     """
-    exp = Experiment(session)
+    exp = request_experiment()
     what = request_parameter(parameter="what", optional=True)
     to_whom = request_parameter(parameter="to_whom", optional=True)
 
@@ -1573,7 +1764,7 @@ def transformation_get(node_id):
 
     You can also pass transformation_type.
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # get the parameters
     transformation_type = request_parameter(
@@ -1616,7 +1807,7 @@ def transformation_post(node_id, info_in_id, info_out_id):
     The ids of the node, info in and info out must all be in the url.
     You can also pass transformation_type.
     """
-    exp = Experiment(session)
+    exp = request_experiment()
 
     # Get the parameters.
     transformation_type = request_parameter(
@@ -1740,7 +1931,7 @@ def _worker_complete(participant_id):
     # worker completes the HIT when using a recruiter like MTurk, where
     # execution of the `worker_events.AssignmentSubmitted` command is
     # deferred until they've submitted the HIT on the MTurk platform.
-    exp = Experiment(session)
+    exp = request_experiment()
     exp.participant_task_completed(participant)
 
     # Does the recruiter want us to execute some command on worker completion?
@@ -1798,19 +1989,3 @@ def _worker_failed(participant_id):
             participant_id=participant.id,
             event_type="BotAssignmentRejected",
         )
-
-
-# Insert "mode" into pages so it's carried from page to page done server-side
-# to avoid breaking backwards compatibility with old templates.
-def insert_mode(page_html, mode):
-    """Insert mode."""
-    match_found = False
-    matches = re.finditer("workerId={{ workerid }}", page_html)
-    match = None
-    for match in matches:
-        match_found = True
-    if match_found:
-        new_html = page_html[: match.end()] + "&mode=" + mode + page_html[match.end() :]
-        return new_html
-    else:
-        raise ExperimentError("insert_mode_failed")
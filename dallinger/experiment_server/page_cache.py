@@ -0,0 +1,227 @@
+"""Rendered experiment pages, kept in the experiment server's memory.
+
+Most of an experiment's pages are the same for every participant, apart
+from a few values taken from the request, like the recruiter's query string
+in the consent form. A page is rendered once, with a placeholder standing in
+for each of those values, and each later request only substitutes the
+request's values for the placeholders.
+
+Pages are only cached when the templates they are rendered from, and the
+templates those extend, include or import, can be shown to render the same
+for every request: they may only look up the values given to
+:meth:`PageCache.response`, which must be written out unchanged, and names
+in :data:`STATIC_NAMES`. Other pages are rendered for every request, as are
+all pages when templates are reloaded when they change, as in debug mode.
+The cache is emptied when the experiment bundle the server runs in is
+assembled again.
+"""
+
+import os
+import re
+import secrets
+
+from flask import Response, render_template, request
+from jinja2 import TemplateNotFound, meta, nodes
+from jinja2.filters import FILTERS
+from jinja2.tests import TESTS
+from markupsafe import escape
+from werkzeug.http import generate_etag
+
+from dallinger.bundles import manifest_signature
+
+#: Template globals and context values which are the same for every request.
+STATIC_NAMES = frozenset(
+    ["config", "cycler", "dict", "env", "joiner", "namespace", "range", "url_for"]
+)
+#: Filters which may be applied to a substituted value.
+PASSTHROUGH_FILTERS = frozenset(["e", "escape", "safe"])
+#: Filters which give the same result for every rendering of the same values.
+STATIC_FILTERS = frozenset(FILTERS) - {"random"}
+#: Constructs whose output can be used by the template other than by writing
+#: it out, so a substituted value must not be written out inside them.
+CAPTURING_NODES = (nodes.AssignBlock, nodes.CallBlock, nodes.FilterBlock, nodes.Macro)
+#: The number of pages kept, as requests for different hosts are cached apart.
+MAX_PAGES = 256
+
+
+class _LookupTracker(meta.TrackingCodeGenerator):
+    """Records every name a template looks up in its context, including
+    those found in the environment's globals.
+    """
+
+    def enter_frame(self, frame):
+        super(_LookupTracker, self).enter_frame(frame)
+        self.undeclared_identifiers.update(
+            param
+            for action, param in frame.symbols.loads.values()
+            if action == "resolve"
+        )
+
+
+def _unfiltered(node):
+    while (
+        isinstance(node, nodes.Filter)
+        and node.name in PASSTHROUGH_FILTERS
+        and not (node.args or node.kwargs or node.dyn_args or node.dyn_kwargs)
+    ):
+        node = node.node
+    return node
+
+
+def _is_block_call(node):
+    """Whether ``node`` calls ``super()`` or ``self.<block>()``, so that its
+    value is the output of a block.
+    """
+    if not isinstance(node, nodes.Call):
+        return False
+    node = node.node
+    if isinstance(node, nodes.Getattr):
+        node = node.node
+        return isinstance(node, nodes.Name) and node.name == "self"
+    return isinstance(node, nodes.Name) and node.name == "super"
+
+
+def _only_written_out(node, names, captured=False):
+    """Whether the values of ``names`` are only written out by ``node``,
+    possibly escaped or marked safe, and not tested, transformed or captured.
+    """
+    if isinstance(node, nodes.Name):
+        return node.name not in names
+    if _is_block_call(node) and names:
+        return False
+    captured = captured or isinstance(node, CAPTURING_NODES)
+    for child in node.iter_child_nodes():
+        if isinstance(node, nodes.Output) and not captured:
+            inner = _unfiltered(child)
+            if isinstance(inner, nodes.Name) or _is_block_call(inner):
+                continue
+        if not _only_written_out(child, names, captured):
+            return False
+    return True
+
+
+class Page(object):
+    """A rendered page, and where to put the values substituted into it."""
+
+    def __init__(self, body, placeholder):
+        self.body = body
+        self.placeholder = placeholder
+        self.etag = None
+        if placeholder is None:
+            self.etag = generate_etag(body.encode("utf8"))
+
+    def render(self, values):
+        if self.placeholder is None:
+            return self.body
+
+        def substitute(match):
+            value = values[match.group(2)]
+            return str(value) if match.group(1) == "<" else str(escape(value))
+
+        return self.placeholder.sub(substitute, self.body)
+
+
+class PageCache(object):
+    """Responses with the pages rendered from the templates of ``app``."""
+
+    def __init__(self, app):
+        self.app = app
+        self.pages = {}
+        self.verdicts = {}
+        self.version = None
+        # Only digits, which no filter that could slip past the checks of
+        # the templates would change.
+        self.marker = "{:016d}".format(secrets.randbelow(10**16))
+
+    def enabled(self):
+        return not self.app.jinja_env.auto_reload
+
+    def response(self, template_name, **values):
+        """Return a response with the page rendered from ``template_name``
+        with ``values``, which are the only values it may depend on for
+        it to be cached.
+        """
+        if not self.enabled():
+            return render_template(template_name, **values)
+
+        version = manifest_signature(os.getcwd())
+        if version != self.version:
+            self.pages.clear()
+            self.verdicts.clear()
+            self.version = version
+
+        key = (template_name, request.url_root, frozenset(values))
+        page = self.pages.get(key)
+        if page is None:
+            page = self._render(template_name, frozenset(values))
+            if len(self.pages) < MAX_PAGES:
+                self.pages[key] = page
+        if page is False:
+            return render_template(template_name, **values)
+
+        response = Response(page.render(values), mimetype="text/html")
+        response.cache_control.no_cache = True
+        if page.etag is None:
+            response.add_etag()
+        else:
+            response.set_etag(page.etag)
+        return response.make_conditional(request)
+
+    def _render(self, template_name, names):
+        """The :class:`Page` for ``template_name``, or ``False`` if it
+        can't be cached.
+        """
+        if not self._is_static(template_name, names):
+            return False
+        placeholders = {
+            name: "<{}:{}>".format(self.marker, name) for name in sorted(names)
+        }
+        body = render_template(template_name, **placeholders)
+        placeholder = None
+        if names:
+            placeholder = re.compile(
+                r"(<|&lt;){}:({})(?:>|&gt;)".format(
+                    self.marker, "|".join(re.escape(name) for name in sorted(names))
+                )
+            )
+            # Every placeholder must have come out whole, in one form or the
+            # other, to be replaced.
+            if len(placeholder.findall(body)) != body.count(self.marker):
+                return False
+        return Page(body, placeholder)
+
+    def _is_static(self, template_name, names, including=()):
+        key = (template_name, names)
+        if key in including:
+            return False
+        if key not in self.verdicts:
+            self.verdicts[key] = self._check(template_name, names, including + (key,))
+        return self.verdicts[key]
+
+    def _check(self, template_name, names, including):
+        env = self.app.jinja_env
+        source = env.loader.get_source(env, template_name)[0]
+        ast = env.parse(source, template_name)
+
+        tracker = _LookupTracker(env)
+        tracker.visit(ast)
+        if not tracker.undeclared_identifiers <= STATIC_NAMES | names:
+            return False
+        if not _only_written_out(ast, names):
+            return False
+        for node in ast.find_all((nodes.Filter, nodes.Test)):
+            allowed = STATIC_FILTERS if isinstance(node, nodes.Filter) else TESTS
+            if node.name not in allowed:
+                return False
+
+        for referenced in meta.find_referenced_templates(ast):
+            if referenced is None:
+                return False
+            try:
+                if not self._is_static(referenced, names, including):
+                    return False
+            except TemplateNotFound:
+                # Included with "ignore missing", or an error to be raised
+                # when the page is rendered.
+                return False
+        return True
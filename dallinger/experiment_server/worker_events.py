@@ -5,7 +5,7 @@ from operator import attrgetter
 from rq import Queue, get_current_job
 from sqlalchemy.exc import DataError, InternalError
 
-from dallinger import db, information, models
+from dallinger import db, information, models, profiling
 from dallinger.config import get_config
 
 logger = logging.getLogger(__name__)
@@ -45,6 +45,7 @@ LOG_EVENT_TYPES = frozenset(
 )
 
 
+@profiling.profiled
 @db.scoped_session_decorator
 def worker_function(
     event_type,
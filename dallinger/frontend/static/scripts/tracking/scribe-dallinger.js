@@ -7,36 +7,145 @@ var ScribeDallingerTracker = function(config) {
   if (!(this instanceof ScribeDallingerTracker)) return new ScribeDallingerTracker(config);
 
   this.config = config;
+  this.buffer = [];
+  this.dropped = 0;
+  this.sending = false;
+  this.flushTimeout = null;
+  this.retryInterval = this.flushInterval;
   this.init();
 };
 
+// Events are posted in batches of up to batchSize, within flushInterval ms
+// of being tracked. While the server refuses them, retries back off up to
+// maxRetryInterval, and beyond maxBuffered events the oldest are dropped.
+ScribeDallingerTracker.prototype.batchSize = 50;
+ScribeDallingerTracker.prototype.flushInterval = 2000;
+ScribeDallingerTracker.prototype.maxRetryInterval = 60000;
+ScribeDallingerTracker.prototype.maxBuffered = 1000;
+
 ScribeDallingerTracker.prototype.tracker = function(info) {
   var config = this.config;
   var path = info.path;
   var value = this.stripPII(info.value || {});
-  var data = new FormData();
 
   // Only track events
   if (path.indexOf('/events/') < 0) {
     return;
   }
   if (config.base_url) {
-    data.append('info_type', 'TrackingEvent');
-    data.append('details', JSON.stringify(value));
-
-    var xhr = new XMLHttpRequest();
-    if (info.success) xhr.addEventListener("load", info.success);
-    if (info.failure) {
-      xhr.addEventListener("error", info.failure);
-      xhr.addEventListener("abort", info.failure);
+    this.buffer.push({details: value, success: info.success, failure: info.failure});
+    this.trimBuffer();
+    if (this.buffer.length >= this.batchSize) {
+      this.flush();
+    } else {
+      this.scheduleFlush(this.flushInterval);
     }
-    xhr.open('POST', config.base_url.replace(/\/$/, "") + '/info/' + dlgr.node_id, true);
-    xhr.send(data);
   } else if (info.failure) {
     setTimeout(info.failure, 0);
   }
 };
 
+ScribeDallingerTracker.prototype.trimBuffer = function() {
+  var excess = this.buffer.length - this.maxBuffered;
+  if (excess > 0) {
+    this.dropped += excess;
+    this.settle(this.buffer.splice(0, excess), 'failure');
+  }
+};
+
+ScribeDallingerTracker.prototype.settle = function(events, outcome) {
+  events.forEach(function (event) {
+    if (event[outcome]) setTimeout(event[outcome], 0);
+  });
+};
+
+ScribeDallingerTracker.prototype.scheduleFlush = function(delay) {
+  var self = this;
+  if (this.flushTimeout === null) {
+    this.flushTimeout = setTimeout(function () {
+      self.flushTimeout = null;
+      self.flush();
+    }, delay);
+  }
+};
+
+ScribeDallingerTracker.prototype.batchUrl = function() {
+  return this.config.base_url.replace(/\/$/, "") + '/tracking_events/' + dlgr.node_id;
+};
+
+ScribeDallingerTracker.prototype.takeBatch = function() {
+  var events = this.buffer.splice(0, this.batchSize);
+  var data = new FormData();
+  data.append('events', JSON.stringify(events.map(function (event) {
+    return event.details;
+  })));
+  data.append('dropped', this.dropped);
+  return {events: events, dropped: this.dropped, data: data};
+};
+
+ScribeDallingerTracker.prototype.flush = function() {
+  var self = this;
+  var batch, xhr;
+
+  if (this.flushTimeout !== null) {
+    clearTimeout(this.flushTimeout);
+    this.flushTimeout = null;
+  }
+  if (this.sending || !this.buffer.length) {
+    return;
+  }
+  // Events are recorded against the participant's node, so hold on to them
+  // until there is one.
+  if (dlgr.node_id === undefined) {
+    this.scheduleFlush(this.flushInterval);
+    return;
+  }
+
+  batch = this.takeBatch();
+  this.dropped = 0;
+  this.sending = true;
+
+  var retry = function () {
+    self.buffer = batch.events.concat(self.buffer);
+    self.dropped += batch.dropped;
+    self.trimBuffer();
+    self.retryInterval = Math.min(self.retryInterval * 2, self.maxRetryInterval);
+    self.scheduleFlush(self.retryInterval);
+  };
+
+  xhr = new XMLHttpRequest();
+  xhr.addEventListener("load", function () {
+    self.sending = false;
+    if (xhr.status === 503) {
+      retry();
+      return;
+    }
+    self.settle(batch.events, xhr.status < 300 ? 'success' : 'failure');
+    self.retryInterval = self.flushInterval;
+    if (self.buffer.length >= self.batchSize) {
+      self.flush();
+    } else if (self.buffer.length) {
+      self.scheduleFlush(self.flushInterval);
+    }
+  });
+  xhr.addEventListener("error", function () {
+    self.sending = false;
+    retry();
+  });
+  xhr.open('POST', this.batchUrl(), true);
+  xhr.send(batch.data);
+};
+
+ScribeDallingerTracker.prototype.flushOnUnload = function() {
+  if (!navigator.sendBeacon || dlgr.node_id === undefined) {
+    return;
+  }
+  while (this.buffer.length) {
+    navigator.sendBeacon(this.batchUrl(), this.takeBatch().data);
+    this.dropped = 0;
+  }
+};
+
 ScribeDallingerTracker.prototype.stripPII = function(value) {
   // Remove possible PII
   delete value.fingerprint;
@@ -137,6 +246,9 @@ ScribeDallingerTracker.prototype.init = function() {
   if (config.trackContents) {
     setTimeout(trackContents, 100);
   }
+  if (window.addEventListener) {
+    window.addEventListener('pagehide', this.flushOnUnload.bind(this));
+  }
 };
 
 module.exports.ScribeDallingerTracker = ScribeDallingerTracker;
@@ -1,16 +1,20 @@
 """A clock process."""
 
+import logging
+import time
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
 from apscheduler.schedulers.blocking import BlockingScheduler
 
 import dallinger
-from dallinger import db, recruiters
+from dallinger import db, metrics, recruiters
 from dallinger.experiment import EXPERIMENT_TASK_REGISTRATIONS
 from dallinger.models import Participant
 from dallinger.utils import ParticipationTime
 
+logger = logging.getLogger(__name__)
 scheduler = BlockingScheduler()
 
 
@@ -33,15 +37,52 @@ def run_check(participants, config, reference_time):
         recruiter.notify_duration_exceeded(participants, reference_time)
 
 
+def overdue_participants(config, reference_time):
+    """Query the working participants who, as of ``reference_time``, have
+    been active for longer than the experiment duration plus the grace
+    period, ordered by recruiter.
+
+    The cutoff is computed here rather than with the database's ``now()``
+    because ``creation_time`` is written from the application's clock.
+    """
+    allowed = timedelta(
+        hours=config.get("duration"),
+        seconds=ParticipationTime.grace_period_seconds,
+    )
+    return Participant.query.filter(
+        Participant.status == "working",
+        Participant.creation_time < reference_time - allowed,
+    ).order_by(Participant.recruiter_id, Participant.id)
+
+
 @scheduler.scheduled_job("interval", minutes=0.5)
 def check_db_for_missing_notifications():
     """Check the database for missing notifications."""
+    start = time.monotonic()
     config = dallinger.config.get_config()
-    participants = Participant.query.filter_by(status="working").all()
     reference_time = datetime.now()
+    participants = overdue_participants(config, reference_time).all()
 
     run_check(participants, config, reference_time)
     db.session.commit()
+    logger.info(
+        "Checked for missing notifications in {:.3f}s; {} overdue participants".format(
+            time.monotonic() - start, len(participants)
+        )
+    )
+
+
+def record_job_run(event):
+    """Count a scheduled job's run, and publish the clock process's gauges."""
+    if not metrics.enabled():
+        return
+    job = scheduler.get_job(event.job_id)
+    metrics.inc(
+        "dallinger_clock_job_runs_total",
+        job=job.name if job is not None else event.job_id,
+        outcome="error" if event.exception else "success",
+    )
+    metrics.publish_process_gauges("clock")
 
 
 def launch():
@@ -63,4 +104,5 @@ def launch():
                 **dict(args["kwargs"]),
             )
 
+    scheduler.add_listener(record_job_run, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
     scheduler.start()
@@ -11,19 +11,27 @@ from gevent.hub import LoopExit
 
 monkey.patch_all()
 
+import json
 import logging
+import random
 import signal
+import time
+from collections import Counter
 
 import gevent
+import gevent.event
 import gevent.pool
 from rq import Worker
 from rq.exceptions import DequeueTimeout
 from rq.job import JobStatus
 from rq.logutils import setup_loghandlers
 from rq.timeouts import BaseDeathPenalty, JobTimeoutException
+from rq.utils import utcnow
 from rq.version import VERSION
 from rq.worker import StopRequested, WorkerStatus, blue, green
 
+from dallinger import db, metrics
+
 
 class GeventDeathPenalty(BaseDeathPenalty):
     def setup_death_penalty(self):
@@ -37,18 +45,130 @@ class GeventDeathPenalty(BaseDeathPenalty):
         self.gevent_timeout.cancel()
 
 
+def db_connections_available():
+    """Whether this process's database connection pool has a connection to
+    spare.
+    """
+    pool = db.engine.pool
+    try:
+        capacity = pool.size() + pool._max_overflow
+    except AttributeError:
+        return True
+    return pool._max_overflow < 0 or pool.checkedout() < capacity
+
+
+class QueueLimit(object):
+    """The most jobs from one queue a worker runs at once.
+
+    With ``adaptive`` set, the limit starts at ``initial`` and is adjusted
+    every ``window`` completed jobs: it grows by a tenth while it is being
+    reached, the smoothed job latency stays within ``DEGRADED`` times its
+    best level and database connections are available, and shrinks by a
+    quarter when latency degrades or the database connection pool runs out.
+    """
+
+    DEGRADED = 2.0
+    SMOOTHING = 0.2
+    # How quickly the best latency drifts up to follow a slower workload.
+    BASELINE_DRIFT = 1.05
+
+    def __init__(self, maximum, initial=None, adaptive=False, window=20):
+        self.maximum = maximum
+        self.adaptive = adaptive
+        self.limit = min(initial or maximum, maximum) if adaptive else maximum
+        self.window = window
+        self.latency = None
+        self.best_latency = None
+        self.completed = 0
+        self.saturated = False
+        self.db_exhausted = False
+
+    def record(self, seconds, db_available=True):
+        """Record a completed job's latency."""
+        if not self.adaptive:
+            return
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.SMOOTHING * (seconds - self.latency)
+        self.db_exhausted = self.db_exhausted or not db_available
+        self.completed += 1
+        if self.completed % self.window == 0:
+            self.adjust()
+
+    def adjust(self):
+        if self.best_latency is None:
+            self.best_latency = self.latency
+        else:
+            self.best_latency = min(
+                self.latency, self.best_latency * self.BASELINE_DRIFT
+            )
+        if self.db_exhausted or self.latency > self.DEGRADED * self.best_latency:
+            self.limit = max(1, self.limit * 3 // 4)
+        elif self.saturated:
+            self.limit = min(self.maximum, self.limit + max(1, self.limit // 10))
+        self.saturated = self.db_exhausted = False
+
+
 class GeventWorker(Worker):
     death_penalty_class = GeventDeathPenalty
     DEFAULT_POOL_SIZE = 20
+    #: Pool slots kept free for each queue's jobs, so that bulk work on the
+    #: other queues cannot hold up latency-sensitive websocket messages.
+    DEFAULT_RESERVATIONS = {"high": 2}
+    #: The least time between heartbeats from the work loop.
+    HEARTBEAT_INTERVAL = 10
+    #: How long to block dequeueing while some queues are at their limit,
+    #: before checking whether they have capacity again.
+    CAPACITY_RECHECK = 1
 
     def __init__(self, *args, **kwargs):
-        pool_size = self.DEFAULT_POOL_SIZE
-        if "pool_size" in kwargs:
-            pool_size = kwargs.pop("pool_size")
+        """Besides rq's arguments, takes the ``pool_size`` (the most jobs run
+        at once), ``queue_pool_sizes`` (a mapping of queue names to the most
+        jobs run at once from each queue), whether to ``adapt_pool_size`` of
+        each queue to the job latency, ``queue_reservations`` (a mapping of
+        queue names to the pool slots kept free for their jobs) and
+        ``queue_weights`` (a mapping of queue names to their share of
+        dequeues, instead of strict priority order).
+        """
+        pool_size = kwargs.pop("pool_size", None) or self.DEFAULT_POOL_SIZE
+        queue_pool_sizes = kwargs.pop("queue_pool_sizes", None) or {}
+        adaptive = kwargs.pop("adapt_pool_size", False)
+        reservations = kwargs.pop("queue_reservations", None)
+        self.queue_weights = kwargs.pop("queue_weights", None) or {}
         self.gevent_pool = gevent.pool.Pool(pool_size)
         self.children = []
         self.gevent_worker = None
+        self.active = Counter()
+        self.capacity_freed = gevent.event.Event()
+        self.last_heartbeat = None
         super(GeventWorker, self).__init__(*args, **kwargs)
+        self.queue_limits = {}
+        for queue in self.queues:
+            maximum = min(queue_pool_sizes.get(queue.name, pool_size), pool_size)
+            self.queue_limits[queue.name] = QueueLimit(
+                maximum,
+                initial=min(self.DEFAULT_POOL_SIZE, maximum),
+                adaptive=adaptive,
+            )
+        configured = reservations is not None
+        if not configured:
+            # Shrunk to leave room for other jobs in small pools.
+            reservations = {
+                name: min(slots, pool_size - 1)
+                for name, slots in self.DEFAULT_RESERVATIONS.items()
+            }
+        self.reservations = {
+            name: slots
+            for name, slots in reservations.items()
+            if name in self.queue_limits and slots > 0
+        }
+        if configured and sum(self.reservations.values()) >= pool_size:
+            raise ValueError(
+                "Queue reservations {} leave no room in a pool of {}".format(
+                    self.reservations, pool_size
+                )
+            )
 
     def register_birth(self):
         super(GeventWorker, self).register_birth()
@@ -57,7 +177,57 @@ class GeventWorker(Worker):
     def heartbeat(self, timeout=0, pipeline=None):
         connection = pipeline if pipeline is not None else self.connection
         super(GeventWorker, self).heartbeat(timeout)
+        self.last_heartbeat = time.monotonic()
         connection.hset(self.key, "curr_pool_len", len(self.gevent_pool))
+        connection.hset(
+            self.key,
+            "queue_limits",
+            json.dumps({name: q.limit for name, q in self.queue_limits.items()}),
+        )
+        if metrics.enabled():
+            metrics.publish_process_gauges("worker")
+
+    def maybe_heartbeat(self):
+        """Heartbeat, unless the last was under ``HEARTBEAT_INTERVAL`` ago."""
+        if (
+            self.last_heartbeat is None
+            or time.monotonic() - self.last_heartbeat >= self.HEARTBEAT_INTERVAL
+        ):
+            self.heartbeat()
+
+    def available_queues(self):
+        """The queues with capacity for another job, in the order to dequeue
+        from them: by priority, or sampled by ``queue_weights``.
+
+        A queue has capacity if it is below its limit, and taking a slot
+        would leave enough free for the other queues' unmet reservations.
+        """
+        free = self.gevent_pool.free_count()
+        unmet = {
+            name: max(0, slots - self.active[name])
+            for name, slots in self.reservations.items()
+        }
+        unmet_total = sum(unmet.values())
+        available = []
+        for queue in self.queues:
+            if free <= unmet_total - unmet.get(queue.name, 0):
+                continue
+            limit = self.queue_limits[queue.name]
+            if self.active[queue.name] < limit.limit:
+                available.append(queue)
+            else:
+                limit.saturated = True
+        if self.queue_weights:
+            available.sort(key=self._weighted_sort_key, reverse=True)
+        return available
+
+    def _weighted_sort_key(self, queue):
+        # Sorting on u ** (1 / weight) samples an ordering in which each
+        # queue comes first in proportion to its weight.
+        weight = self.queue_weights.get(queue.name, 1)
+        if weight <= 0:
+            return 0
+        return random.random() ** (1.0 / weight)
 
     def _install_signal_handlers(self):
         def request_force_stop():
@@ -77,6 +247,7 @@ class GeventWorker(Worker):
                 )
 
                 self._stop_requested = True
+                self.capacity_freed.set()
                 self.gevent_pool.join()
                 if self.gevent_worker is not None:
                     self.gevent_worker.kill(StopRequested)
@@ -87,12 +258,13 @@ class GeventWorker(Worker):
     def set_current_job_id(self, job_id, pipeline=None):
         pass
 
-    def _work(self, burst=False, logging_level=logging.INFO):
+    def _work(self, burst=False, logging_level=logging.INFO, with_scheduler=False):
         """Starts the work loop.
 
         Pops and performs all jobs on the current list of queues.  When all
         queues are empty, block and wait for new jobs to arrive on any of the
-        queues, unless `burst` mode is enabled.
+        queues, unless `burst` mode is enabled. With `with_scheduler`, jobs
+        scheduled with `enqueue_in` or `enqueue_at` are enqueued when due.
 
         The return value indicates whether any jobs were processed.
         """
@@ -107,6 +279,8 @@ class GeventWorker(Worker):
             )
         )
         self.set_state(WorkerStatus.STARTED)
+        if with_scheduler:
+            self._start_scheduler(burst, logging_level)
 
         try:
             while True:
@@ -114,7 +288,8 @@ class GeventWorker(Worker):
                     self.check_for_suspension(burst)
 
                     if self.should_run_maintenance_tasks:
-                        self.clean_registries()
+                        # Also restarts the scheduler if it has stopped.
+                        self.run_maintenance_tasks()
 
                     if self._stop_requested:
                         self.log.info("Stopping on request.")
@@ -149,29 +324,51 @@ class GeventWorker(Worker):
 
         finally:
             if not self.is_horse:
+                if self.scheduler:
+                    self.stop_scheduler()
                 self.register_death()
         return self.did_perform_work
 
-    def work(self, burst=False, logging_level=logging.INFO):
+    def work(self, burst=False, logging_level=logging.INFO, with_scheduler=False):
         """
         Spawning a greenlet to be able to kill it when it's blocked dequeueing job
         :param burst: if it's burst worker don't need to spawn a greenlet
+        :param with_scheduler: whether to enqueue scheduled jobs when due
         """
         # If the is a burst worker it's not needed to spawn greenlet
         if burst:
-            return self._work(burst, logging_level=logging_level)
+            return self._work(
+                burst, logging_level=logging_level, with_scheduler=with_scheduler
+            )
 
-        self.gevent_worker = gevent.spawn(self._work, burst)
+        self.gevent_worker = gevent.spawn(
+            self._work, burst, with_scheduler=with_scheduler
+        )
         self.gevent_worker.join()
         return self.gevent_worker.value
 
     def execute_job(self, job, queue):
+        started = time.monotonic()
+        self.active[queue.name] += 1
+        if metrics.enabled() and job.enqueued_at is not None:
+            waited = (utcnow() - job.enqueued_at).total_seconds()
+            metrics.record_job_wait(queue.name, max(0, waited))
+
         def job_done(child):
             self.children.remove(child)
+            self.active[queue.name] -= 1
             self.did_perform_work = True
-            self.heartbeat()
-            if job.get_status() == JobStatus.FINISHED:
+            elapsed = time.monotonic() - started
+            self.queue_limits[queue.name].record(elapsed, db_connections_available())
+            self.capacity_freed.set()
+            self.maybe_heartbeat()
+            status = job.get_status()
+            if status == JobStatus.FINISHED:
                 queue.enqueue_dependents(job)
+            if metrics.enabled():
+                metrics.record_job(
+                    queue.name, getattr(status, "value", str(status)), elapsed
+                )
 
         child_greenlet = self.gevent_pool.spawn(self.perform_job, job, queue)
         child_greenlet.link(job_done)
@@ -186,23 +383,30 @@ class GeventWorker(Worker):
             if self._stop_requested:
                 raise StopRequested()
 
-            self.heartbeat()
+            self.maybe_heartbeat()
 
-            if self.gevent_pool.full():
+            # Clear before checking, so a job finishing in between still
+            # wakes us.
+            self.capacity_freed.clear()
+            queues = self.available_queues()
+            if not queues:
                 self.set_state(WorkerStatus.BUSY)
-                self.log.warning(
-                    "RQ GEVENT worker greenlet pool empty current size %s",
-                    self.gevent_pool.size,
+                self.log.debug(
+                    "RQ GEVENT worker at capacity with %s jobs running",
+                    len(self.gevent_pool),
                 )
+                # Wake up now and then to heartbeat, at the top of the loop,
+                # while long jobs fill the pool.
+                self.capacity_freed.wait(timeout=self.HEARTBEAT_INTERVAL)
+                continue
 
-            while self.gevent_pool.full():
-                gevent.sleep(0.1)
-                if self._stop_requested:
-                    raise StopRequested()
+            dequeue_timeout = timeout
+            if len(queues) < len(self.queues) and timeout is not None:
+                dequeue_timeout = min(timeout, self.CAPACITY_RECHECK)
 
             try:
                 result = self.queue_class.dequeue_any(
-                    self.queues, timeout, connection=self.connection
+                    queues, dequeue_timeout, connection=self.connection
                 )
                 self.set_state(WorkerStatus.IDLE)
                 if result is not None:
@@ -215,7 +419,7 @@ class GeventWorker(Worker):
             except DequeueTimeout:
                 pass
 
-        self.heartbeat()
+        self.maybe_heartbeat()
         return result
 
 
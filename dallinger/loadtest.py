@@ -0,0 +1,227 @@
+"""Generate load against an experiment server with many concurrent bots.
+
+A :class:`LoadDriver` runs :class:`~dallinger.bots.HighPerformanceBotBase`
+bots as greenlets in a single process. The bots share one pooled HTTP
+session, arrive at random at a configurable rate, pause for a sampled think
+time between the phases of the experiment, and every request they make is
+timed, so that the run ends with per-route latency percentiles and error
+rates. Run it with ``dallinger load-test``.
+
+Real concurrency needs gevent's monkey patching, which the command applies
+before starting the bots.
+"""
+
+import logging
+import random
+import re
+import time
+from collections import OrderedDict, defaultdict
+
+import gevent
+import gevent.pool
+from requests import Session
+from requests.exceptions import RequestException
+from six.moves import urllib
+
+from dallinger.bots import DEFAULT_MAX_CONNECTIONS, pooled_session
+from dallinger.utils import generate_random_id, latency_percentiles
+
+logger = logging.getLogger(__file__)
+
+THINK_TIME_DISTRIBUTIONS = ("exponential", "uniform", "constant")
+
+_ID_SEGMENT = re.compile(r"^\d+$")
+
+
+def route_for(method, url):
+    """Name the route ``url`` was requested from, e.g. ``POST /info``.
+
+    Only the first segment of the path is kept, since the rest of the path
+    is made up of participant, node and worker ids.
+    """
+    path = urllib.parse.urlparse(url).path
+    segments = [s for s in path.split("/") if s]
+    name = segments[0] if segments else ""
+    if _ID_SEGMENT.match(name):
+        name = "<id>"
+    return "{} /{}".format(method.upper(), name)
+
+
+def think_time_sampler(mean, distribution="exponential"):
+    """Return a function sampling think times, in seconds, with the given
+    mean from one of :data:`THINK_TIME_DISTRIBUTIONS`.
+    """
+    if not mean:
+        return None
+    if distribution == "exponential":
+        return lambda: random.expovariate(1.0 / mean)
+    if distribution == "uniform":
+        return lambda: random.uniform(0, 2 * mean)
+    if distribution == "constant":
+        return lambda: mean
+    raise ValueError("Unknown think time distribution: {}".format(distribution))
+
+
+class LoadStats(object):
+    """Request latencies and errors, by route."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.monotonic()
+        self.finished = None
+
+    def record(self, route, seconds, error=False):
+        self.latencies[route].append(seconds)
+        if error:
+            self.errors[route] += 1
+
+    def stop(self):
+        self.finished = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self):
+        """Return an ordered mapping of route to its request count, error
+        rate, throughput and latency percentiles (in milliseconds).
+        """
+        elapsed = self.elapsed
+        summary = OrderedDict()
+        for route in sorted(self.latencies):
+            latencies = sorted(self.latencies[route])
+            count = len(latencies)
+            row = OrderedDict()
+            row["requests"] = count
+            row["errors"] = self.errors[route]
+            row["error_rate"] = self.errors[route] / float(count)
+            row["rps"] = count / elapsed if elapsed else None
+            row.update(latency_percentiles(latencies))
+            row["max_ms"] = latencies[-1] * 1000
+            summary[route] = row
+        return summary
+
+
+class TimedSession(Session):
+    """A requests session recording the latency and outcome of each request
+    in a :class:`LoadStats`.
+
+    Responses with an error status, and requests that fail outright, count
+    as errors.
+    """
+
+    stats = None
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            response = super(TimedSession, self).request(method, url, *args, **kwargs)
+        except RequestException:
+            self._record(method, url, start, error=True)
+            raise
+        self._record(method, url, start, error=response.status_code >= 400)
+        return response
+
+    def _record(self, method, url, start, error):
+        if self.stats is not None:
+            self.stats.record(route_for(method, url), time.monotonic() - start, error)
+
+
+class LoadDriver(object):
+    """Run many bots concurrently against one experiment server.
+
+    :param bot_class: a :class:`~dallinger.bots.HighPerformanceBotBase`
+        subclass
+    :param base_url: the experiment server's URL
+    :param bots: the total number of bots to run
+    :param arrival_rate: the mean number of bots arriving per second; arrivals
+        are a Poisson process. ``None`` starts all the bots at once.
+    :param think_time: the mean pause, in seconds, between experiment phases
+    :param think_distribution: one of :data:`THINK_TIME_DISTRIBUTIONS`
+    :param max_connections: the size of the shared HTTP connection pool
+    :param max_active: the most bots running at once, or ``None`` for no limit
+    :param retry_delay: the minimum delay before a bot retries a failed request
+    :param listen_for_quorum: whether bots subscribe to the quorum channel,
+        which needs access to the experiment's redis
+    """
+
+    def __init__(
+        self,
+        bot_class,
+        base_url,
+        bots=100,
+        arrival_rate=None,
+        think_time=0,
+        think_distribution="exponential",
+        max_connections=DEFAULT_MAX_CONNECTIONS,
+        max_active=None,
+        retry_delay=1.0,
+        listen_for_quorum=False,
+    ):
+        self.bot_class = bot_class
+        self.base_url = base_url.rstrip("/")
+        self.bots = bots
+        self.arrival_rate = arrival_rate
+        self.think_time = think_time_sampler(think_time, think_distribution)
+        self.max_active = max_active
+        self.retry_delay = retry_delay
+        self.listen_for_quorum = listen_for_quorum
+        self.session = pooled_session(max_connections, session_class=TimedSession)
+        self.stats = self.session.stats = LoadStats()
+        self.completed = 0
+        self.failed = 0
+
+    def bot_url(self):
+        """A fresh ad URL for one bot, like those the
+        :class:`~dallinger.recruiters.BotRecruiter` generates.
+        """
+        ad_parameters = (
+            "recruiter=bots&assignmentId={}&hitId={}&workerId={}&mode=sandbox"
+        )
+        ad_parameters = ad_parameters.format(
+            generate_random_id(), generate_random_id(), generate_random_id()
+        )
+        return "{}/ad?{}".format(self.base_url, ad_parameters)
+
+    def make_bot(self):
+        bot = self.bot_class(self.bot_url())
+        bot.http = self.session
+        bot.think_time = self.think_time
+        bot.min_retry_delay = self.retry_delay
+        bot.listen_for_quorum = self.listen_for_quorum
+        return bot
+
+    def run_bot(self):
+        bot = self.make_bot()
+        try:
+            bot.run_experiment()
+        except Exception:
+            self.failed += 1
+            logger.exception("Bot {} failed.".format(bot.unique_id))
+        else:
+            self.completed += 1
+
+    def run(self):
+        """Run all the bots to completion, and return the :class:`LoadStats`."""
+        pool = gevent.pool.Pool(self.max_active)
+        self.stats = self.session.stats = LoadStats()
+        for i in range(self.bots):
+            if i and self.arrival_rate:
+                gevent.sleep(random.expovariate(self.arrival_rate))
+            pool.spawn(self.run_bot)
+        pool.join()
+        self.stats.stop()
+        return self.stats
+
+    def report(self):
+        """Return the results of the run as a JSON-serializable dict."""
+        return OrderedDict(
+            [
+                ("bots", self.bots),
+                ("completed", self.completed),
+                ("failed", self.failed),
+                ("elapsed_seconds", self.stats.elapsed),
+                ("routes", self.stats.summary()),
+            ]
+        )
@@ -0,0 +1,324 @@
+"""Operational metrics for the web, worker and clock processes, exported in
+the Prometheus text format from the experiment server's ``/metrics`` route.
+
+Counters and histograms are accumulated in a redis hash, so every process
+adds to the same totals. Gauges describing a single process, such as its
+database connection pool, are published by that process to a redis hash
+which expires unless it is refreshed. Gauges describing the whole
+experiment, such as queue depths and participant counts, are computed when
+the metrics are rendered.
+"""
+
+import json
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy import func
+
+from dallinger import db
+from dallinger.config import get_config
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+COUNTERS_KEY = "metrics:counters"
+PROCESSES_KEY = "metrics:processes"
+PROCESS_KEY = "metrics:process:{}"
+
+#: Seconds between a process's gauge updates, and before they expire.
+PUBLISH_INTERVAL = 15
+PROCESS_TTL = 60
+
+#: The rq queues, as listened to by the worker process.
+QUEUES = ("high", "default", "low")
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+#: The exported metrics, by name: their type, description and, for
+#: histograms, bucket upper bounds.
+METRICS = OrderedDict(
+    [
+        (
+            "dallinger_request_duration_seconds",
+            ("histogram", "Experiment server request latency.", REQUEST_BUCKETS),
+        ),
+        (
+            "dallinger_job_duration_seconds",
+            ("histogram", "Worker job duration, by queue.", JOB_BUCKETS),
+        ),
+        (
+            "dallinger_job_wait_seconds",
+            (
+                "histogram",
+                "Time jobs spent queued before a worker started them.",
+                JOB_BUCKETS,
+            ),
+        ),
+        (
+            "dallinger_prolific_request_duration_seconds",
+            (
+                "histogram",
+                "Prolific API request latency, by endpoint and status.",
+                REQUEST_BUCKETS,
+            ),
+        ),
+        (
+            "dallinger_clock_job_runs_total",
+            ("counter", "Clock process job runs, by outcome.", None),
+        ),
+        ("dallinger_queue_jobs", ("gauge", "Jobs waiting in each queue.", None)),
+        (
+            "dallinger_queue_oldest_job_age_seconds",
+            ("gauge", "Age of the oldest job waiting in each queue.", None),
+        ),
+        (
+            "dallinger_worker_pool_size",
+            ("gauge", "Greenlet pool size of each worker.", None),
+        ),
+        (
+            "dallinger_worker_pool_active",
+            ("gauge", "Greenlets running jobs in each worker.", None),
+        ),
+        (
+            "dallinger_websocket_clients",
+            ("gauge", "Websocket clients subscribed to each channel.", None),
+        ),
+        (
+            "dallinger_db_pool_size",
+            ("gauge", "Database connection pool size of each process.", None),
+        ),
+        (
+            "dallinger_db_pool_checked_out",
+            ("gauge", "Database connections in use by each process.", None),
+        ),
+        ("dallinger_participants", ("gauge", "Participants by status.", None)),
+        (
+            "dallinger_tracking_events_total",
+            ("counter", "Browser tracking events, by outcome.", None),
+        ),
+        (
+            "dallinger_tracking_events_pending",
+            ("gauge", "Tracking events waiting to be inserted.", None),
+        ),
+    ]
+)
+
+_last_published = {}
+
+
+def enabled():
+    """Whether processes record metrics, per the ``enable_metrics`` setting."""
+    config = get_config()
+    if not config.ready:
+        config.load()
+    return config.get("enable_metrics", False)
+
+
+def process_name(kind):
+    """Identify this process, e.g. ``web:hostname:1234``."""
+    return "{}:{}:{}".format(kind, socket.gethostname(), os.getpid())
+
+
+def _field(name, suffix, labels):
+    return json.dumps([name, suffix, sorted(labels.items())])
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def inc(name, amount=1, **labels):
+    """Add ``amount`` to a counter."""
+    db.redis_conn.hincrby(COUNTERS_KEY, _field(name, "", labels), amount)
+
+
+def observe(name, value, **labels):
+    """Record ``value`` in a histogram.
+
+    Only the bucket ``value`` falls in is incremented; the cumulative bucket
+    counts Prometheus expects are summed when the metrics are rendered.
+    """
+    buckets = METRICS[name][2]
+    le = next((b for b in buckets if value <= b), float("inf"))
+    pipe = db.redis_conn.pipeline(transaction=False)
+    bucket_labels = dict(labels, le=_format_value(le))
+    pipe.hincrby(COUNTERS_KEY, _field(name, "bucket", bucket_labels), 1)
+    pipe.hincrbyfloat(COUNTERS_KEY, _field(name, "sum", labels), value)
+    pipe.hincrby(COUNTERS_KEY, _field(name, "count", labels), 1)
+    pipe.execute()
+
+
+def record_request(method, route, status, seconds):
+    observe(
+        "dallinger_request_duration_seconds",
+        seconds,
+        method=method,
+        route=route,
+        status=str(status),
+    )
+
+
+def record_job(queue, status, seconds):
+    observe("dallinger_job_duration_seconds", seconds, queue=queue, status=status)
+
+
+def record_job_wait(queue, seconds):
+    observe("dallinger_job_wait_seconds", seconds, queue=queue)
+
+
+def db_pool_gauges():
+    """Gauges for this process's database connection pool."""
+    pool = db.engine.pool
+    gauges = []
+    if hasattr(pool, "checkedout"):
+        gauges.append(("dallinger_db_pool_size", {}, pool.size()))
+        gauges.append(("dallinger_db_pool_checked_out", {}, pool.checkedout()))
+    return gauges
+
+
+def publish_process_gauges(kind, gauges=(), force=False):
+    """Publish this process's gauges, along with those of its database
+    connection pool, at most every :data:`PUBLISH_INTERVAL` seconds unless
+    ``force`` is set.
+
+    ``gauges`` are ``(name, labels, value)`` tuples; each is labelled with
+    the process publishing it.
+    """
+    now = time.monotonic()
+    last = _last_published.get(kind)
+    if not force and last is not None and now - last < PUBLISH_INTERVAL:
+        return
+    _last_published[kind] = now
+
+    process = process_name(kind)
+    key = PROCESS_KEY.format(process)
+    fields = {
+        _field(name, "", dict(labels, process=process)): value
+        for name, labels, value in db_pool_gauges() + list(gauges)
+    }
+    pipe = db.redis_conn.pipeline()
+    pipe.delete(key)
+    if fields:
+        pipe.hset(key, mapping=fields)
+    pipe.expire(key, PROCESS_TTL)
+    pipe.sadd(PROCESSES_KEY, key)
+    pipe.execute()
+
+
+def experiment_gauges():
+    """Gauges for the experiment as a whole: queue depths and ages, worker
+    pools and participant counts.
+    """
+    from rq import Queue, Worker
+    from rq.utils import utcnow
+
+    from dallinger import tracking
+    from dallinger.models import Participant
+
+    gauges = []
+    for name in QUEUES:
+        queue = Queue(name, connection=db.redis_conn)
+        gauges.append(("dallinger_queue_jobs", {"queue": name}, queue.count))
+        age = 0
+        for job_id in queue.get_job_ids(0, 1):
+            job = queue.fetch_job(job_id)
+            if job is not None and job.enqueued_at is not None:
+                age = max(0, (utcnow() - job.enqueued_at).total_seconds())
+        gauges.append(("dallinger_queue_oldest_job_age_seconds", {"queue": name}, age))
+
+    for worker in Worker.all(connection=db.redis_conn):
+        size, active = db.redis_conn.hmget(worker.key, "pool_size", "curr_pool_len")
+        labels = {"worker": worker.name}
+        if size is not None:
+            gauges.append(("dallinger_worker_pool_size", labels, int(size)))
+        if active is not None:
+            gauges.append(("dallinger_worker_pool_active", labels, int(active)))
+
+    gauges.append(("dallinger_tracking_events_pending", {}, tracking.pending()))
+
+    statuses = db.session.query(Participant.status, func.count(Participant.id))
+    for status, count in statuses.group_by(Participant.status):
+        gauges.append(("dallinger_participants", {"status": status}, count))
+    return gauges
+
+
+def _stored_samples():
+    """Read the counters, histograms and live processes' gauges from redis,
+    as ``(name, suffix, labels, value)`` tuples.
+    """
+    samples = []
+    for field, value in db.redis_conn.hgetall(COUNTERS_KEY).items():
+        samples.append(tuple(json.loads(field)) + (float(value),))
+
+    keys = sorted(k.decode("utf8") for k in db.redis_conn.smembers(PROCESSES_KEY))
+    pipe = db.redis_conn.pipeline()
+    for key in keys:
+        pipe.hgetall(key)
+    for key, fields in zip(keys, pipe.execute()):
+        if not fields:
+            # The process stopped publishing, and its gauges expired.
+            db.redis_conn.srem(PROCESSES_KEY, key)
+            continue
+        for field, value in fields.items():
+            samples.append(tuple(json.loads(field)) + (float(value),))
+    return samples
+
+
+def _histogram_samples(name, buckets, samples):
+    by_labels = defaultdict(dict)
+    for suffix, labels, value in samples:
+        labels = dict(labels)
+        le = labels.pop("le", None)
+        by_labels[tuple(sorted(labels.items()))][le or suffix] = value
+    bounds = [_format_value(b) for b in buckets] + ["+Inf"]
+    for labels, values in sorted(by_labels.items()):
+        cumulative = 0
+        for le in bounds:
+            cumulative += values.get(le, 0)
+            yield name + "_bucket", labels + (("le", le),), cumulative
+        yield name + "_sum", labels, values.get("sum", 0)
+        yield name + "_count", labels, values.get("count", 0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample_line(name, labels, value):
+    if labels:
+        name = "{}{{{}}}".format(
+            name, ",".join('{}="{}"'.format(k, _escape(v)) for k, v in labels)
+        )
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "{} {}".format(name, _format_value(value))
+
+
+def render():
+    """Render all the metrics in the Prometheus text exposition format."""
+    by_name = defaultdict(list)
+    for name, suffix, labels, value in _stored_samples():
+        by_name[name].append((suffix, labels, value))
+    for name, labels, value in experiment_gauges():
+        by_name[name].append(("", sorted(labels.items()), value))
+
+    lines = []
+    for name, (metric_type, description, buckets) in METRICS.items():
+        lines.append("# HELP {} {}".format(name, description))
+        lines.append("# TYPE {} {}".format(name, metric_type))
+        if metric_type == "histogram":
+            samples = _histogram_samples(name, buckets, by_name[name])
+        else:
+            samples = (
+                (name, tuple(tuple(label) for label in labels), value)
+                for _, labels, value in sorted(by_name[name], key=repr)
+            )
+        lines.extend(_sample_line(*sample) for sample in samples)
+    return "\n".join(lines) + "\n"
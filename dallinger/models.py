@@ -10,14 +10,17 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     and_,
+    cast,
     func,
     or_,
 )
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import column_property, relationship, validates
 from sqlalchemy.sql.expression import false, select
 
@@ -31,6 +34,142 @@ def timenow():
     return datetime.now()
 
 
+class typed_property(hybrid_property):
+    """A typed attribute stored in the ``details`` JSON column.
+
+    The ``property1`` ... ``property5`` columns store text, so numbers kept
+    there have to be converted on every access and cannot be sorted or
+    indexed by the database. A ``typed_property`` instead stores the value as
+    a native JSON scalar under ``details`` and exposes a SQL expression cast
+    to the matching column type, so it can be used in queries:
+
+    >>> class Agent(Node):
+    >>>     fitness = typed_property(float, index=True)
+    >>>
+    >>> Agent.query.order_by(Agent.fitness.desc()).first()
+
+    ``type_`` is one of ``int``, ``float``, ``bool``, ``str`` or ``"json"``
+    (any JSON serializable value, compared as JSONB). ``path`` is the key, or
+    tuple of nested keys, within ``details``; it defaults to the attribute
+    name. Unset values read as ``default``.
+
+    ``column`` names a text column, such as ``property1``, which the value is
+    also written to as text, as attributes kept in text columns were before.
+    Rows and exported data which only have the value in that column still
+    read, sort and filter as before.
+
+    With ``index=True`` a functional index on the cast expression is added to
+    the model's table, which requires the property to be declared on a
+    subclass of an already mapped model (e.g. a ``Node`` or ``Network``
+    subclass).
+    """
+
+    sql_types = {int: Integer, float: Float, bool: Boolean, str: Text}
+
+    def __init__(self, type_, path=None, default=None, index=False, column=None):
+        if type_ != "json" and type_ not in self.sql_types:
+            raise TypeError("{} is not a valid typed_property type.".format(type_))
+        if index and type_ == "json":
+            raise ValueError("JSON typed properties cannot be indexed.")
+        if column and type_ == "json":
+            raise ValueError("JSON typed properties cannot be kept in a column.")
+        self.type_ = type_
+        self.path = path
+        self.default = default
+        self.index = index
+        self.column = column
+        super(typed_property, self).__init__(
+            self._get, fset=self._set, expr=self._expression
+        )
+        self.__doc__ = "A {} stored in ``details``.".format(
+            getattr(type_, "__name__", type_)
+        )
+
+    def __set_name__(self, owner, name):
+        # hybrid_property locates itself on the owner by name when building
+        # its SQL expression.
+        self.__name__ = name
+        if self.path is None:
+            self.path = name
+        if self.index:
+            self._add_index(owner, name)
+
+    @property
+    def _keys(self):
+        if isinstance(self.path, (tuple, list)):
+            return tuple(self.path)
+        return (self.path,)
+
+    def _coerce(self, value):
+        if value is None or self.type_ == "json":
+            return value
+        if self.type_ is bool and isinstance(value, str):
+            from setuptools.dist import strtobool
+
+            return bool(strtobool(value))
+        return self.type_(value)
+
+    def _get(self, obj):
+        value = obj.details or {}
+        for key in self._keys:
+            if not isinstance(value, dict) or key not in value:
+                value = None
+                break
+            value = value[key]
+        if value is None and self.column is not None:
+            value = getattr(obj, self.column)
+            if value == "None":
+                value = None
+        if value is None:
+            return self.default
+        return self._coerce(value)
+
+    def _set(self, obj, value):
+        # Assign a new dict so that SQLAlchemy detects the change to the
+        # (non-mutable) JSONB column.
+        details = dict(obj.details or {})
+        parent = details
+        for key in self._keys[:-1]:
+            parent[key] = dict(parent.get(key) or {})
+            parent = parent[key]
+        value = self._coerce(value)
+        parent[self._keys[-1]] = value
+        obj.details = details
+        if self.column is not None:
+            setattr(obj, self.column, None if value is None else str(value))
+
+    def _sql_expression(self, details, column=None):
+        keys = self._keys
+        element = details[keys[0] if len(keys) == 1 else keys]
+        if self.type_ == "json":
+            return element
+        sql_type = self.sql_types[self.type_]
+        expression = element.astext.cast(sql_type)
+        if column is None:
+            return expression
+        # Values stored with repr() before they were kept in details.
+        return func.coalesce(expression, cast(func.nullif(column, "None"), sql_type))
+
+    def _expression(self, cls):
+        column = getattr(cls, self.column) if self.column else None
+        return self._sql_expression(cls.details, column)
+
+    def _add_index(self, owner, name):
+        table = getattr(owner, "__table__", None)
+        if table is None:
+            raise ValueError(
+                "Cannot index typed_property {} of {}: it must be declared on a "
+                "subclass of a mapped model.".format(name, owner.__name__)
+            )
+        index_name = "ix_{}_details_{}".format(table.name, "_".join(self._keys))
+        if index_name in {index.name for index in table.indexes}:
+            return
+        # Binding the expression to the table's column attaches the index to
+        # the table, so it is created along with it.
+        column = table.c[self.column] if self.column else None
+        Index(index_name, self._sql_expression(table.c.details, column))
+
+
 class SharedMixin(object):
     """Create shared columns."""
 
@@ -200,13 +339,13 @@ class Participant(Base, SharedMixin):
     __mapper_args__ = {"polymorphic_on": type, "polymorphic_identity": "participant"}
 
     #: A String, the fingerprint hash of the participant.
-    fingerprint_hash = Column(String(50), nullable=True)
+    fingerprint_hash = Column(String(50), nullable=True, index=True)
 
     #: A String, the nickname of the recruiter used by this participant.
     recruiter_id = Column(String(50), nullable=True)
 
     #: A String, the worker id of the participant.
-    worker_id = Column(String(50), nullable=False)
+    worker_id = Column(String(50), nullable=False, index=True)
 
     #: A String, the assignment id of the participant.
     assignment_id = Column(String(50), nullable=False, index=True)
@@ -524,6 +663,16 @@ class Network(Base, SharedMixin):
             else:
                 return type.query.filter_by(failed=failed, network_id=self.id).all()
 
+    def _live_nodes(self, type=None):
+        """Query for the non-failed nodes of ``type`` in the network.
+
+        Unlike :meth:`nodes`, this returns the query itself so that network
+        subclasses can count, order and limit in the database.
+        """
+        if type is None:
+            type = Node
+        return type.query.filter_by(network_id=self.id, failed=False)
+
     def size(self, type=None, failed=False):
         """How many nodes in a network.
 
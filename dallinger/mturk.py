@@ -3,13 +3,23 @@ import logging
 import time
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 from cached_property import cached_property
 
+from dallinger.bulk import DEFAULT_MAX_WORKERS, BulkExecutor, paginate
+
 logger = logging.getLogger(__file__)
 PERCENTAGE_APPROVED_REQUIREMENT_ID = "000000000000000000L0"
 LOCALE_REQUIREMENT_ID = "00000000000000000071"
 MAX_SUPPORTED_BATCH_SIZE = 100
+# Fragments of the error messages MTurk and AWS return when throttling:
+THROTTLING_ERROR_MARKERS = (
+    "throttl",
+    "rate exceeded",
+    "serviceunavailable",
+    "too many requests",
+)
 
 
 class MTurkServiceException(Exception):
@@ -124,21 +134,8 @@ class SNSService(object):
             return None
 
     def _all_topics(self):
-        done = False
-        next_token = None
-        while not done:
-            if next_token is not None:
-                response = self._sns.list_topics(NextToken=next_token)
-            else:
-                response = self._sns.list_topics()
-
-            if response:
-                for t in response["Topics"]:
-                    yield t["TopicArn"]
-            if "NextToken" in response:
-                next_token = response["NextToken"]
-            else:
-                done = True
+        for topic in paginate(self._sns.list_topics, "Topics"):
+            yield topic["TopicArn"]
 
 
 class MTurkQuestions(object):
@@ -238,12 +235,16 @@ class MTurkService(object):
         region_name,
         sandbox=True,
         max_wait_secs=0,
+        max_concurrency=DEFAULT_MAX_WORKERS,
+        max_requests_per_second=20,
     ):
         self.aws_key = aws_access_key_id
         self.aws_secret = aws_secret_access_key
         self.region_name = region_name
         self.is_sandbox = sandbox
         self.max_wait_secs = max_wait_secs
+        self.max_concurrency = max_concurrency
+        self.max_requests_per_second = max_requests_per_second
 
     @cached_property
     def mturk(self):
@@ -252,8 +253,24 @@ class MTurkService(object):
             aws_secret_access_key=self.aws_secret,
             region_name=self.region_name,
         )
+        # boto3 clients are thread-safe, but need a connection per thread
+        # for bulk operations to run concurrently:
         return session.client(
-            "mturk", endpoint_url=self.host, region_name=self.region_name
+            "mturk",
+            endpoint_url=self.host,
+            region_name=self.region_name,
+            config=Config(max_pool_connections=self.max_concurrency),
+        )
+
+    @cached_property
+    def executor(self):
+        """Runs bulk operations concurrently, within MTurk's rate limits."""
+        # Create the shared client now, rather than in racing worker threads:
+        self.mturk
+        return BulkExecutor(
+            max_workers=self.max_concurrency,
+            rate=self.max_requests_per_second,
+            is_retryable=self._is_throttling_error,
         )
 
     @cached_property
@@ -451,29 +468,39 @@ class MTurkService(object):
 
     def get_workers_with_qualification(self, qualification_id):
         """Get workers with the given qualification."""
-        done = False
-        next_token = None
-        while not done:
-            if next_token is not None:
-                response = self.mturk.list_workers_with_qualification_type(
-                    QualificationTypeId=qualification_id,
-                    MaxResults=MAX_SUPPORTED_BATCH_SIZE,
-                    Status="Granted",
-                    NextToken=next_token,
-                )
-            else:
-                response = self.mturk.list_workers_with_qualification_type(
-                    QualificationTypeId=qualification_id,
-                    MaxResults=MAX_SUPPORTED_BATCH_SIZE,
-                    Status="Granted",
-                )
-            if response:
-                for r in response["Qualifications"]:
-                    yield {"id": r["WorkerId"], "score": r["IntegerValue"]}
-            if "NextToken" in response:
-                next_token = response["NextToken"]
-            else:
-                done = True
+        for r in paginate(
+            self.mturk.list_workers_with_qualification_type,
+            "Qualifications",
+            QualificationTypeId=qualification_id,
+            MaxResults=MAX_SUPPORTED_BATCH_SIZE,
+            Status="Granted",
+        ):
+            yield {"id": r["WorkerId"], "score": r["IntegerValue"]}
+
+    def assign_qualifications(self, qualification_id, worker_ids, score, notify=False):
+        """Score many workers for a specific qualification, concurrently.
+
+        Returns a :data:`~dallinger.bulk.BulkResult` per worker, in the order
+        of ``worker_ids``, with the worker ID as ``args[1]``.
+        """
+        return self.executor.map(
+            self.assign_qualification,
+            [
+                ((qualification_id, worker_id, score), {"notify": notify})
+                for worker_id in worker_ids
+            ],
+        )
+
+    def revoke_qualifications(self, qualification_id, worker_ids, reason=""):
+        """Revoke a qualification from many workers, concurrently.
+
+        Returns a :data:`~dallinger.bulk.BulkResult` per worker, in the order
+        of ``worker_ids``, with the worker ID as ``args[1]``.
+        """
+        return self.executor.map(
+            self.revoke_qualification,
+            [((qualification_id, worker_id, reason), {}) for worker_id in worker_ids],
+        )
 
     def create_hit(
         self,
@@ -591,23 +618,12 @@ class MTurkService(object):
         return self._translate_hit(self.mturk.get_hit(HITId=hit_id)["HIT"])
 
     def get_hits(self, hit_filter=lambda x: True):
-        done = False
-        next_token = None
-        while not done:
-            if next_token is not None:
-                response = self.mturk.list_hits(
-                    MaxResults=MAX_SUPPORTED_BATCH_SIZE, NextToken=next_token
-                )
-            else:
-                response = self.mturk.list_hits(MaxResults=MAX_SUPPORTED_BATCH_SIZE)
-            for hit in response["HITs"]:
-                translated = self._translate_hit(hit)
-                if hit_filter(translated):
-                    yield translated
-            if "NextToken" in response:
-                next_token = response["NextToken"]
-            else:
-                done = True
+        for hit in paginate(
+            self.mturk.list_hits, "HITs", MaxResults=MAX_SUPPORTED_BATCH_SIZE
+        ):
+            translated = self._translate_hit(hit)
+            if hit_filter(translated):
+                yield translated
 
     def grant_bonus(self, assignment_id, amount, reason):
         """Grant a bonus to the MTurk Worker.
@@ -637,6 +653,26 @@ class MTurkService(object):
             )
             raise MTurkServiceException(error)
 
+    def grant_bonuses(self, bonuses):
+        """Grant many bonuses concurrently.
+
+        ``bonuses`` is an iterable of ``(assignment_id, amount, reason)``
+        tuples. Returns a :data:`~dallinger.bulk.BulkResult` for each, in
+        the same order.
+        """
+        return self.executor.map(self.grant_bonus, [(bonus, {}) for bonus in bonuses])
+
+    def get_assignments(self, assignment_ids):
+        """Get many assignments concurrently.
+
+        Returns a :data:`~dallinger.bulk.BulkResult` per assignment ID, in the
+        same order, whose ``result`` is as returned by :meth:`get_assignment`.
+        """
+        return self.executor.map(
+            self.get_assignment,
+            [((assignment_id,), {}) for assignment_id in assignment_ids],
+        )
+
     def get_assignment(self, assignment_id):
         """Get an assignment by ID and reformat the response."""
         try:
@@ -666,6 +702,17 @@ class MTurkService(object):
                 )
             )
 
+    def approve_assignments(self, assignment_ids):
+        """Approve many assignments concurrently.
+
+        Returns a :data:`~dallinger.bulk.BulkResult` per assignment ID, in the
+        same order.
+        """
+        return self.executor.map(
+            self.approve_assignment,
+            [((assignment_id,), {}) for assignment_id in assignment_ids],
+        )
+
     def _create_notification_subscription(
         self, experiment_id, notification_url, hit_type_id
     ):
@@ -770,5 +817,14 @@ class MTurkService(object):
             "status": qtype["QualificationTypeStatus"],
         }
 
+    def _is_throttling_error(self, ex):
+        """Was this call rejected for exceeding MTurk's request rate?
+
+        Our methods wrap boto3's ``ClientError`` in ``MTurkServiceException``,
+        so we inspect the message rather than the error code.
+        """
+        message = str(ex).lower()
+        return any(marker in message for marker in THROTTLING_ERROR_MARKERS)
+
     def _is_ok(self, response):
         return response == {} or list(response.keys()) == ["ResponseMetadata"]
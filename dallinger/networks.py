@@ -3,7 +3,11 @@
 import random
 from operator import attrgetter
 
-from .models import Network
+from sqlalchemy import func
+from sqlalchemy.sql.expression import false
+
+from .db import session
+from .models import Network, Node, typed_property
 from .nodes import Agent, Source
 
 
@@ -21,11 +25,16 @@ class DelayedChain(Network):
 
     def add_node(self, node):
         """Add an agent, connecting it to the previous node."""
-        other_nodes = [n for n in self.nodes() if n.id != node.id]
-        if len(self.nodes()) > 11:
-            parents = [max(other_nodes, key=attrgetter("creation_time"))]
+        if self._live_nodes().count() > 11:
+            parents = (
+                self._live_nodes()
+                .filter(Node.id != node.id)
+                .order_by(Node.creation_time.desc(), Node.id.desc())
+                .limit(1)
+                .all()
+            )
         else:
-            parents = [n for n in other_nodes if isinstance(n, Source)]
+            parents = self._live_nodes(Source).filter(Source.id != node.id).all()
 
         for parent in parents:
             parent.connect(whom=node)
@@ -139,34 +148,28 @@ class DiscreteGenerational(Network):
 
     __mapper_args__ = {"polymorphic_identity": "discrete-generational"}
 
+    #: The length of the network: the number of generations.
+    generations = typed_property(int, column="property1")
+
+    #: The width of the network: the size of a single generation.
+    generation_size = typed_property(int, column="property2")
+
+    #: Whether a source seeds the first generation.
+    initial_source = typed_property(bool, default=False, column="property3")
+
     def __init__(self, generations, generation_size, initial_source):
         """Endow the network with some persistent properties."""
-        self.property1 = repr(generations)
-        self.property2 = repr(generation_size)
-        self.property3 = repr(initial_source)
+        self.generations = generations
+        self.generation_size = generation_size
+        self.initial_source = initial_source
         if self.initial_source:
             self.max_size = generations * generation_size + 1
         else:
             self.max_size = generations * generation_size
 
-    @property
-    def generations(self):
-        """The length of the network: the number of generations."""
-        return int(self.property1)
-
-    @property
-    def generation_size(self):
-        """The width of the network: the size of a single generation."""
-        return int(self.property2)
-
-    @property
-    def initial_source(self):
-        """The source that seeds the first generation."""
-        return self.property3.lower() != "false"
-
     def add_node(self, node):
         """Link to the agent from a parent based on the parent's fitness"""
-        num_agents = len(self.nodes(type=Agent))
+        num_agents = self._live_nodes(Agent).count()
         curr_generation = int((num_agents - 1) / float(self.generation_size))
         node.generation = curr_generation
 
@@ -182,21 +185,50 @@ class DiscreteGenerational(Network):
             parent.transmit(to_whom=node)
 
     def _select_oldest_source(self):
-        return min(self.nodes(type=Source), key=attrgetter("creation_time"))
+        return (
+            self._live_nodes(Source)
+            .order_by(Source.creation_time, Source.id)
+            .limit(1)
+            .one_or_none()
+        )
 
     def _select_fit_node_from_generation(self, node_type, generation):
-        prev_agents = node_type.query.filter_by(
-            failed=False, network_id=self.id, generation=(generation)
-        ).all()
-        prev_fits = [p.fitness for p in prev_agents]
-        prev_probs = [(f / (1.0 * sum(prev_fits))) for f in prev_fits]
+        """Sample a node from ``generation`` with probability proportional to
+        its fitness.
+
+        The running and total fitness of the generation are computed with
+        window functions, so a single query returns the first node whose
+        running fitness exceeds a random fraction of the total.
+        """
+        running_fitness = func.sum(node_type.fitness).over(order_by=node_type.id)
+        total_fitness = func.sum(node_type.fitness).over()
+        generation_fitness = (
+            session.query(
+                node_type.id.label("id"),
+                running_fitness.label("running_fitness"),
+                total_fitness.label("total_fitness"),
+            )
+            .filter(
+                node_type.failed == false(),
+                node_type.network_id == self.id,
+                node_type.generation == generation,
+            )
+            .subquery()
+        )
 
         rnd = random.random()
-        temp = 0.0
-        for i, probability in enumerate(prev_probs):
-            temp += probability
-            if temp > rnd:
-                return prev_agents[i]
+        return (
+            node_type.query.join(
+                generation_fitness, node_type.id == generation_fitness.c.id
+            )
+            .filter(
+                generation_fitness.c.running_fitness
+                > rnd * generation_fitness.c.total_fitness
+            )
+            .order_by(generation_fitness.c.running_fitness, node_type.id)
+            .limit(1)
+            .one_or_none()
+        )
 
 
 class ScaleFree(Network):
@@ -211,20 +243,16 @@ class ScaleFree(Network):
 
     __mapper_args__ = {"polymorphic_identity": "scale-free"}
 
-    def __init__(self, m0, m):
-        """Store m0 in property1 and m in property2."""
-        self.property1 = repr(m0)
-        self.property2 = repr(m)
+    #: Number of nodes in the fully-connected core.
+    m0 = typed_property(int, column="property1")
 
-    @property
-    def m0(self):
-        """Number of nodes in the fully-connected core."""
-        return int(self.property1)
+    #: Number of connections that a newcomer makes.
+    m = typed_property(int, column="property2")
 
-    @property
-    def m(self):
-        """Number of connections that a newcomer makes."""
-        return int(self.property2)
+    def __init__(self, m0, m):
+        """Store m0 and m."""
+        self.m0 = m0
+        self.m = m
 
     def add_node(self, node):
         """Add newcomers one by one, using linear preferential attachment."""
@@ -268,14 +296,12 @@ class SequentialMicrosociety(Network):
 
     __mapper_args__ = {"polymorphic_identity": "microsociety"}
 
-    def __init__(self, n):
-        """Store n in property1."""
-        self.property1 = repr(n)
+    #: Number of nodes active at once.
+    n = typed_property(int, column="property1")
 
-    @property
-    def n(self):
-        """Number of nodes active at once."""
-        return int(self.property1)
+    def __init__(self, n):
+        """Store n."""
+        self.n = n
 
     def add_node(self, node):
         """Add a node, connecting it to all the active nodes."""
@@ -300,10 +326,8 @@ class SplitSampleNetwork(Network):
 
     __mapper_args__ = {"polymorphic_identity": "particle_network"}
 
-    def __init__(self):
-        self.property1 = random.random() < 0.5
+    #: Is this network part of the exploratory data subset?
+    exploratory = typed_property(bool, default=False, column="property1")
 
-    @property
-    def exploratory(self):
-        """Is this network part of the exploratory data subset?"""
-        return bool(self.property1)
+    def __init__(self):
+        self.exploratory = random.random() < 0.5
@@ -3,12 +3,8 @@
 import random
 from operator import attrgetter
 
-from sqlalchemy import Float
-from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.sql.expression import cast
-
 from dallinger.information import State
-from dallinger.models import Info, Node
+from dallinger.models import Info, Node, typed_property
 
 
 class Agent(Node):
@@ -16,23 +12,9 @@ class Agent(Node):
 
     __mapper_args__ = {"polymorphic_identity": "agent"}
 
-    @hybrid_property
-    def fitness(self):
-        """Endow agents with a numerical fitness."""
-        try:
-            return float(self.property1)
-        except TypeError:
-            return None
-
-    @fitness.setter
-    def fitness(self, fitness):
-        """Assign fitness to property1."""
-        self.property1 = repr(fitness)
-
-    @fitness.expression
-    def fitness(self):
-        """Retrieve fitness via property1."""
-        return cast(self.property1, Float)
+    #: a numerical fitness, stored in ``details`` and indexed so that agents
+    #: can be sorted and selected by fitness in the database.
+    fitness = typed_property(float, index=True, column="property1")
 
 
 class ReplicatorAgent(Agent):
@@ -1,36 +1,103 @@
+import json
 import logging
 import smtplib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
 from email.mime.text import MIMEText
 
 import six
-from cached_property import cached_property
 
 logger = logging.getLogger(__file__)
 CONFIG_PLACEHOLDER = "???"
 
+PENDING_KEY = "notifications:pending"
+DIGEST_SCHEDULED_KEY = "notifications:digest_scheduled"
+#: Seconds over which queued messages are collected into digests.
+DIGEST_WINDOW = 60
+#: Seconds after which a digest job is timed out, or assumed lost and
+#: another scheduled.
+DIGEST_TIMEOUT = 300
+
 
 class InvalidEmailConfig(ValueError):
     """The configuration contained missing or invalid email-related values."""
 
 
+class SMTPConnectionPool(object):
+    """Open, logged in SMTP connections, kept for reuse by later messages.
+
+    Connections left idle for more than :attr:`IDLE_TIMEOUT` seconds are
+    closed rather than reused, as the server has likely dropped them.
+    """
+
+    IDLE_TIMEOUT = 60
+
+    def __init__(self):
+        self.idle = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def acquire(self, key):
+        """An idle connection for ``key``, or ``None`` if there are none."""
+        expired = []
+        server = None
+        with self.lock:
+            idle = self.idle[key]
+            while idle:
+                candidate, released = idle.pop()
+                if time.monotonic() - released < self.IDLE_TIMEOUT:
+                    server = candidate
+                    break
+                expired.append(candidate)
+        for candidate in expired:
+            close_server(candidate)
+        return server
+
+    def release(self, key, server):
+        with self.lock:
+            self.idle[key].append((server, time.monotonic()))
+
+    def close(self):
+        """Close all the idle connections."""
+        with self.lock:
+            servers = [server for idle in self.idle.values() for server, _ in idle]
+            self.idle.clear()
+        for server in servers:
+            close_server(server)
+
+
+_connections = SMTPConnectionPool()
+
+
+def close_server(server):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+def close_connections():
+    """Close the pooled SMTP connections, e.g. before the process exits."""
+    _connections.close()
+
+
 class SMTPMailer(object):
-    def __init__(self, host, username, password):
+    """Send email through an SMTP server, reusing a pooled connection to it
+    when there is one, and reconnecting if the server has dropped it.
+    """
+
+    def __init__(self, host, username, password, starttls=True):
         self.host = host
         self.username = username
         self.password = password
+        self.starttls = starttls
         self._sent = []
 
-    @cached_property
-    def server(self):
-        return get_email_server(self.host)
-
     def send(self, subject, sender, recipients, body):
         msg = self._make_email(subject, sender, recipients, body)
         try:
-            self.server.starttls()
-            self.server.login(self.username, self.password)
-            self.server.sendmail(sender, recipients, msg.as_string())
-            self.server.quit()
+            self._deliver(sender, recipients, msg)
         except smtplib.SMTPException as ex:
             six.raise_from(MessengerError("SMTP error sending HIT error email."), ex)
         except Exception as ex:
@@ -38,6 +105,40 @@ class SMTPMailer(object):
 
         self._sent.append(msg)
 
+    def _connect(self):
+        server = get_email_server(self.host)
+        try:
+            if self.starttls:
+                server.starttls()
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _deliver(self, sender, recipients, msg):
+        key = (self.host, self.username)
+        server = _connections.acquire(key)
+        reused = server is not None
+        if not reused:
+            server = self._connect()
+        try:
+            server.sendmail(sender, recipients, msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            server.close()
+            if not reused:
+                raise
+            server = self._connect()
+            try:
+                server.sendmail(sender, recipients, msg.as_string())
+            except Exception:
+                server.close()
+                raise
+        except Exception:
+            close_server(server)
+            raise
+        _connections.release(key, server)
+
     def _make_email(self, subject, sender, recipients, body):
         msg = MIMEText(body)
         msg["Subject"] = subject
@@ -47,6 +148,114 @@ class SMTPMailer(object):
         return msg
 
 
+class QueuedMailer(object):
+    """Queue messages to be sent by a worker, rather than waiting on the
+    SMTP server.
+
+    Messages queued within :data:`DIGEST_WINDOW` seconds of each other are
+    sent as one digest per subject, so that a burst of errors sends a
+    handful of emails rather than hundreds.
+    """
+
+    def __init__(self):
+        self._sent = []
+
+    def send(self, subject, sender, recipients, body):
+        from dallinger.db import redis_conn
+
+        message = {
+            "subject": subject,
+            "sender": sender,
+            "recipients": list(recipients),
+            "body": body,
+        }
+        redis_conn.rpush(PENDING_KEY, json.dumps(message))
+        self._sent.append(message)
+        schedule_digest()
+
+
+def schedule_digest():
+    """Enqueue a job to send the queued messages, unless one is scheduled."""
+    from rq import Queue
+
+    from dallinger.db import redis_conn
+
+    if redis_conn.set(
+        DIGEST_SCHEDULED_KEY, 1, nx=True, ex=DIGEST_WINDOW + DIGEST_TIMEOUT
+    ):
+        Queue("low", connection=redis_conn).enqueue(
+            send_queued, job_timeout=DIGEST_TIMEOUT
+        )
+
+
+def digest(messages):
+    """Combine messages with the same subject, sender and recipients into
+    one, listing each distinct body once along with how often it was sent.
+    """
+    groups = OrderedDict()
+    for message in messages:
+        key = (message["subject"], message["sender"], tuple(message["recipients"]))
+        bodies = groups.setdefault(key, OrderedDict())
+        bodies[message["body"]] = bodies.get(message["body"], 0) + 1
+
+    combined = []
+    for (subject, sender, recipients), bodies in groups.items():
+        total = sum(bodies.values())
+        if total == 1:
+            body = next(iter(bodies))
+        else:
+            subject = "{} ({} notifications)".format(subject, total)
+            body = "\n\n----------\n\n".join(
+                text if count == 1 else "Sent {} times:\n\n{}".format(count, text)
+                for text, count in bodies.items()
+            )
+        combined.append(
+            {
+                "subject": subject,
+                "sender": sender,
+                "recipients": list(recipients),
+                "body": body,
+            }
+        )
+    return combined
+
+
+def send_queued():
+    """Send the queued messages as digests. If there were any, schedule
+    another job in :data:`DIGEST_WINDOW` seconds to send those that follow,
+    so that a burst of messages is sent as one digest per window.
+    """
+    from rq import Queue
+
+    from dallinger.config import get_config
+    from dallinger.db import redis_conn
+
+    pipe = redis_conn.pipeline()
+    pipe.lrange(PENDING_KEY, 0, -1)
+    pipe.delete(PENDING_KEY)
+    pending = pipe.execute()[0]
+    if not pending:
+        redis_conn.delete(DIGEST_SCHEDULED_KEY)
+        # A message queued since the last check found a digest scheduled.
+        if redis_conn.llen(PENDING_KEY):
+            schedule_digest()
+        return
+
+    config = get_config()
+    if not config.ready:
+        config.load()
+    mailer = get_mailer(config)
+    for message in digest(json.loads(m) for m in pending):
+        try:
+            mailer.send(**message)
+        except MessengerError as ex:
+            logger.exception(ex)
+    redis_conn.expire(DIGEST_SCHEDULED_KEY, DIGEST_WINDOW + DIGEST_TIMEOUT)
+    Queue("low", connection=redis_conn).enqueue_in(
+        timedelta(seconds=DIGEST_WINDOW), send_queued, job_timeout=DIGEST_TIMEOUT
+    )
+
+
 class LoggingMailer(object):
     def __init__(self):
         self._sent = []
@@ -148,12 +357,13 @@ class NotifiesAdmin(object):
         self.mailer.send(subject, self.fromaddr, [self.toaddr], body)
 
 
-def admin_notifier(config):
+def admin_notifier(config, queued=False):
     """Return an appropriate NotifiesAdmin implementation.
 
     If we're in debug mode, or email settings aren't set, return a debug
     version which logs the message instead of attempting to send a real
-    email.
+    email. If ``queued``, messages are left for a worker to send, so as not
+    to hold up the caller.
     """
     settings = EmailConfig(config)
     if config.get("mode") == "debug":
@@ -162,6 +372,8 @@ def admin_notifier(config):
     if problems:
         logger.info(problems + " Will log errors instead of emailing them.")
         return NotifiesAdmin(settings, LoggingMailer())
+    if queued:
+        return NotifiesAdmin(settings, QueuedMailer())
     return NotifiesAdmin(
         settings,
         SMTPMailer(settings.smtp_host, settings.smtp_username, settings.smtp_password),
@@ -0,0 +1,250 @@
+"""Sampled profiling of the SQL issued by each request or job.
+
+When ``sql_profile_sample_rate`` is set, that fraction of the experiment
+server's requests and worker jobs is profiled: SQLAlchemy engine events count
+the statements each one issues and the time spent running them. Profiles
+exceeding ``sql_profile_slow_ms`` of database time or
+``sql_profile_max_statements`` statements are logged with their most
+expensive statements, and every profile is added to per-route totals kept in
+redis, which the dashboard's SQL Profile tab displays.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from sqlalchemy import event
+
+from dallinger import db
+from dallinger.config import get_config
+
+logger = logging.getLogger(__name__)
+
+NAMES_KEY = "sql_profile:names"
+STATS_KEY = "sql_profile:stats:{}"
+STATEMENTS_KEY = "sql_profile:statements:{}"
+
+DEFAULT_SLOW_MS = 500.0
+DEFAULT_MAX_STATEMENTS = 100
+LOGGED_STATEMENTS = 5
+
+_local = threading.local()
+_installed_on = set()
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMETERS = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Reduce a SQL statement to its shape, replacing parameters and literal
+    values with ``?``, so that statements differing only in their values are
+    grouped together.
+    """
+    statement = _STRINGS.sub("?", statement)
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _NUMBERS.sub("?", statement)
+    statement = _LISTS.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryProfile(object):
+    """The statements issued while handling one request or job."""
+
+    def __init__(self, name):
+        self.name = name
+        self.statements = 0
+        self.db_time = 0.0
+        self.started = time.monotonic()
+        self.finished = None
+        # statement text -> [count, seconds]
+        self._by_statement = defaultdict(lambda: [0, 0.0])
+
+    def record(self, statement, seconds):
+        self.statements += 1
+        self.db_time += seconds
+        totals = self._by_statement[statement]
+        totals[0] += 1
+        totals[1] += seconds
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def by_fingerprint(self):
+        """Return ``(fingerprint, count, seconds)`` tuples, the most
+        expensive first.
+        """
+        totals = defaultdict(lambda: [0, 0.0])
+        for statement, (count, seconds) in self._by_statement.items():
+            total = totals[fingerprint(statement)]
+            total[0] += count
+            total[1] += seconds
+        return sorted(
+            ((fp, count, seconds) for fp, (count, seconds) in totals.items()),
+            key=lambda item: item[2],
+            reverse=True,
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if getattr(_local, "profile", None) is not None:
+        conn.info.setdefault("sql_profile_start", []).append(time.monotonic())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    profile = getattr(_local, "profile", None)
+    starts = conn.info.get("sql_profile_start")
+    if profile is None or not starts:
+        return
+    profile.record(statement, time.monotonic() - starts.pop())
+
+
+def _install(engine):
+    if engine in _installed_on:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _installed_on.add(engine)
+
+
+def current():
+    """Return the profile being recorded in this thread, if any."""
+    return getattr(_local, "profile", None)
+
+
+def start(name, engine=None):
+    """Start profiling a request or job called ``name``, if it is sampled.
+
+    Returns the new profile, or ``None`` if it was not sampled or a profile
+    is already being recorded (in which case its statements count towards
+    that one).
+    """
+    rate = get_config().get("sql_profile_sample_rate", 0)
+    if not rate or current() is not None or random.random() >= rate:
+        return None
+    _install(engine or db.engine)
+    _local.profile = QueryProfile(name)
+    return _local.profile
+
+
+def finish():
+    """Stop profiling, then log the profile if it was slow, and add it to
+    the totals in redis.
+    """
+    profile = current()
+    if profile is None:
+        return None
+    _local.profile = None
+    profile.finished = time.monotonic()
+    try:
+        _report(profile)
+    except Exception:
+        logger.exception("Could not record the SQL profile of {}".format(profile.name))
+    return profile
+
+
+def profiled(func):
+    """Profile each call of a job function, naming the profile after the
+    function and its first argument (e.g. ``worker_function:TrackingEvent``).
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        name = func.__name__
+        if args:
+            name = "{}:{}".format(name, args[0])
+        profile = start(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                finish()
+
+    return wrapper
+
+
+def _report(profile):
+    config = get_config()
+    slow_ms = config.get("sql_profile_slow_ms", DEFAULT_SLOW_MS)
+    max_statements = config.get("sql_profile_max_statements", DEFAULT_MAX_STATEMENTS)
+    db_ms = profile.db_time * 1000
+    statements = profile.by_fingerprint()
+    slow = db_ms >= slow_ms or profile.statements >= max_statements
+
+    if slow:
+        logger.warning(
+            "{}: {} SQL statements taking {:.1f}ms of {:.1f}ms. Most expensive:\n{}".format(
+                profile.name,
+                profile.statements,
+                db_ms,
+                profile.elapsed * 1000,
+                "\n".join(
+                    "  {}x {:.1f}ms {}".format(count, seconds * 1000, fp)
+                    for fp, count, seconds in statements[:LOGGED_STATEMENTS]
+                ),
+            )
+        )
+
+    stats_key = STATS_KEY.format(profile.name)
+    statements_key = STATEMENTS_KEY.format(profile.name)
+    pipe = db.redis_conn.pipeline()
+    pipe.sadd(NAMES_KEY, profile.name)
+    pipe.hincrby(stats_key, "count", 1)
+    pipe.hincrby(stats_key, "statements", profile.statements)
+    pipe.hincrbyfloat(stats_key, "db_ms", db_ms)
+    pipe.hincrbyfloat(stats_key, "total_ms", profile.elapsed * 1000)
+    if slow:
+        pipe.hincrby(stats_key, "slow", 1)
+    for fp, count, seconds in statements:
+        pipe.zincrby(statements_key, seconds * 1000, fp)
+    pipe.execute()
+
+
+def route_stats(top=3):
+    """Return the profiling totals for each profiled route or job, the most
+    statements per request first, with their ``top`` most expensive
+    statements.
+    """
+    names = sorted(n.decode("utf8") for n in db.redis_conn.smembers(NAMES_KEY))
+    pipe = db.redis_conn.pipeline()
+    for name in names:
+        pipe.hgetall(STATS_KEY.format(name))
+        pipe.zrevrange(STATEMENTS_KEY.format(name), 0, top - 1, withscores=True)
+    results = pipe.execute()
+
+    stats = []
+    for i, name in enumerate(names):
+        totals, top_statements = results[2 * i], results[2 * i + 1]
+        count = int(totals.get(b"count", 0))
+        if not count:
+            continue
+        stats.append(
+            {
+                "name": name,
+                "count": count,
+                "slow": int(totals.get(b"slow", 0)),
+                "mean_statements": int(totals[b"statements"]) / count,
+                "mean_db_ms": float(totals[b"db_ms"]) / count,
+                "mean_total_ms": float(totals[b"total_ms"]) / count,
+                "top_statements": [
+                    (fp.decode("utf8"), ms) for fp, ms in top_statements
+                ],
+            }
+        )
+    return sorted(stats, key=lambda s: s["mean_statements"], reverse=True)
+
+
+def reset():
+    """Discard the profiling totals collected so far."""
+    names = [n.decode("utf8") for n in db.redis_conn.smembers(NAMES_KEY)]
+    keys = [NAMES_KEY]
+    for name in names:
+        keys.extend([STATS_KEY.format(name), STATEMENTS_KEY.format(name)])
+    db.redis_conn.delete(*keys)
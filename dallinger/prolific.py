@@ -1,13 +1,24 @@
 import json
 import logging
-from typing import List, Optional
+import random
+import re
+import time
+from typing import Iterable, List, Optional, Tuple
 
 import requests
 import tenacity
+from cached_property import cached_property
 from dateutil import parser
+from requests.adapters import HTTPAdapter
+
+from dallinger.bulk import DEFAULT_MAX_WORKERS, BulkExecutor
 
 logger = logging.getLogger(__file__)
 
+#: Methods which are safe to retry after a server error, as repeating them
+#: has no further effect.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
 
 class ProlificServiceException(Exception):
     """Some error from Prolific"""
@@ -15,27 +26,82 @@ class ProlificServiceException(Exception):
     pass
 
 
+class SessionNotSubmittedException(ProlificServiceException):
+    """A participant session can't be approved, as it hasn't been submitted"""
+
+    pass
+
+
 class ProlificService:
     """
     Wrapper for Prolific REST API
 
+    Requests share a pool of keep-alive connections. Requests rejected for
+    exceeding Prolific's rate limit are retried with exponential backoff, as
+    are idempotent requests which fail with a server or connection error.
+
     params:
         api_token: Prolific API token
         api_version: Prolific API version
         referer_header: Referer header to help Prolific identify our requests when troubleshooting
+        api_host: Prolific API host, which may be replaced for testing
+        max_concurrency: the number of requests in flight at once in bulk operations
+        max_requests_per_second: the request rate limit for bulk operations
+        max_attempts: the number of attempts at each request before giving up
+        backoff: the base delay in seconds between attempts, doubled each time
+        timeout: seconds to wait for Prolific to respond to each request
     """
 
-    def __init__(self, api_token: str, api_version: str, referer_header: str):
+    BONUS_BATCH_SIZE = 100
+
+    def __init__(
+        self,
+        api_token: str,
+        api_version: str,
+        referer_header: str,
+        api_host: str = "https://api.prolific.co",
+        max_concurrency: int = DEFAULT_MAX_WORKERS,
+        max_requests_per_second: float = 10,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 30,
+    ):
         self.api_token = api_token
         # For error logging:
         self.api_token_fragment = f"{api_token[:3]}...{api_token[-3:]}"
         self.api_version = api_version
         self.referer_header = referer_header
+        self.api_host = api_host
+        self.max_concurrency = max_concurrency
+        self.max_requests_per_second = max_requests_per_second
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
 
     @property
     def api_root(self):
         """The root URL for API calls."""
-        return f"https://api.prolific.co/api/{self.api_version}"
+        return f"{self.api_host}/api/{self.api_version}"
+
+    @cached_property
+    def session(self):
+        """An HTTP session keeping enough connections alive for bulk
+        operations to run concurrently.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.max_concurrency)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @cached_property
+    def executor(self):
+        """Runs bulk operations concurrently, within Prolific's rate limits."""
+        # Create the shared session now, rather than in racing worker threads:
+        self.session
+        return BulkExecutor(
+            max_workers=self.max_concurrency, rate=self.max_requests_per_second
+        )
 
     def add_participants_to_study(self, study_id: int, number_to_add: int) -> dict:
         """Add additional slots to a running Study."""
@@ -50,6 +116,7 @@ class ProlificService:
         )
 
     @tenacity.retry(
+        retry=tenacity.retry_if_exception_type(SessionNotSubmittedException),
         wait=tenacity.wait_exponential(multiplier=1, min=2, max=8),
         stop=tenacity.stop_after_attempt(5),
         reraise=True,
@@ -60,12 +127,13 @@ class ProlificService:
         We do some retrying here, because our first attempt to approve will
         happen more or less simultaneously with the worker submitting
         the study on Prolific. If we get there first, there will be an error
-        because the submission hasn't happened yet.
+        because the submission hasn't happened yet. Failed requests are only
+        retried by :meth:`_req`, and not again here.
         """
         status = self.get_participant_session(session_id)["status"]
         if status != "AWAITING REVIEW":
             # This will trigger a retry from the decorator
-            raise ProlificServiceException("Prolific session not yet submitted.")
+            raise SessionNotSubmittedException("Prolific session not yet submitted.")
 
         return self._req(
             method="POST",
@@ -73,6 +141,17 @@ class ProlificService:
             json={"action": "APPROVE"},
         )
 
+    def approve_participant_sessions(self, session_ids: Iterable[str]) -> list:
+        """Approve many sessions concurrently.
+
+        Returns a :data:`~dallinger.bulk.BulkResult` per session ID, in the
+        same order.
+        """
+        return self.executor.map(
+            self.approve_participant_session,
+            [((session_id,), {}) for session_id in session_ids],
+        )
+
     def get_participant_session(self, session_id: str) -> dict:
         """Retrieve details of a participant Session
 
@@ -215,10 +294,33 @@ class ProlificService:
         this were not the case, it's possible that payment would fail, but I have
         not verified this. - `Jesse Snyder <https://github.com/jessesnyder/>__` Feb 1 2022
         """
-        amount_str = "{:.2f}".format(amount)
+        return self._pay_bonuses(study_id, [(worker_id, amount)])
+
+    def pay_session_bonuses(
+        self, study_id: str, bonuses: Iterable[Tuple[str, float]]
+    ) -> list:
+        """Pay many workers bonuses, as bulk payments of up to
+        :attr:`BONUS_BATCH_SIZE` workers each, made concurrently.
+
+        ``bonuses`` is an iterable of ``(worker_id, amount)`` pairs. Returns a
+        :data:`~dallinger.bulk.BulkResult` per bulk payment, whose ``args``
+        include the pairs it paid.
+        """
+        bonuses = list(bonuses)
+        batches = [
+            bonuses[i : i + self.BONUS_BATCH_SIZE]
+            for i in range(0, len(bonuses), self.BONUS_BATCH_SIZE)
+        ]
+        return self.executor.map(
+            self._pay_bonuses, [((study_id, batch), {}) for batch in batches]
+        )
+
+    def _pay_bonuses(self, study_id: str, bonuses: List[Tuple[str, float]]):
         payload = {
             "study_id": study_id,
-            "csv_bonuses": f"{worker_id},{amount_str}",
+            "csv_bonuses": "\n".join(
+                "{},{:.2f}".format(worker_id, amount) for worker_id, amount in bonuses
+            ),
         }
 
         # Step 1: configure payment
@@ -243,8 +345,8 @@ class ProlificService:
         * Adds auth header
         * Adds Referer header to help Prolific identify our requests
           when troubleshooting
-        * Logs all requests (we might want to stop doing this when we're
-          out of our "beta" period with Prolific)
+        * Logs all requests at debug level
+        * Retries requests which were rate limited or, if idempotent, failed
         * Parses response and does error handling
         """
         headers = {
@@ -257,8 +359,8 @@ class ProlificService:
             "method": method,
             "args": kw,
         }
-        logger.warning(f"Prolific API request: {json.dumps(summary)}")
-        response = requests.request(method, url, headers=headers, **kw)
+        logger.debug(f"Prolific API request: {json.dumps(summary)}")
+        response = self._send(method, url, endpoint, headers=headers, **kw)
 
         if method == "DELETE" and response.ok:
             return {"status_code": response.status_code}
@@ -281,3 +383,59 @@ class ProlificService:
             raise ProlificServiceException(json.dumps(error))
 
         return parsed
+
+    def _send(self, method: str, url: str, endpoint: str, **kw):
+        """Make a request, retrying it with exponential backoff and jitter if
+        it should be, until it succeeds or runs out of attempts.
+        """
+        attempt = 1
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kw)
+            except requests.exceptions.RequestException as ex:
+                self._record_timing(method, endpoint, "error", started)
+                if attempt >= self.max_attempts or method not in IDEMPOTENT_METHODS:
+                    raise ProlificServiceException(
+                        f"Prolific API request failed: {method} {url}: {ex}"
+                    )
+                reason = str(ex)
+                delay = None
+            else:
+                self._record_timing(method, endpoint, response.status_code, started)
+                if attempt >= self.max_attempts or not self._should_retry(
+                    method, response
+                ):
+                    return response
+                reason = f"status {response.status_code}"
+                delay = response.headers.get("Retry-After")
+
+            if delay is not None and delay.isdigit():
+                delay = float(delay)
+            else:
+                delay = self.backoff * 2 ** (attempt - 1)
+                delay += random.uniform(0, delay)
+            logger.warning(
+                f"Retrying Prolific API request {method} {url} in {delay:.1f}s "
+                f"after attempt {attempt} failed: {reason}"
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def _should_retry(self, method: str, response) -> bool:
+        if response.status_code == 429:
+            return True
+        return response.status_code >= 500 and method in IDEMPOTENT_METHODS
+
+    def _record_timing(self, method: str, endpoint: str, status, started: float):
+        from dallinger import metrics
+
+        if metrics.enabled():
+            metrics.observe(
+                "dallinger_prolific_request_duration_seconds",
+                time.monotonic() - started,
+                method=method,
+                # IDs would give each study and submission its own series:
+                endpoint=re.sub(r"/[^/]*\d[^/]*", "/{id}", endpoint),
+                status=str(status),
+            )
@@ -1,8 +1,10 @@
 import os
 import re
 import shutil
+import socketserver
 import sys
 import tempfile
+import threading
 import time
 
 import mock
@@ -159,7 +161,6 @@ def stub_config():
         "id": "TEST_EXPERIMENT_UID",  # This is a significant value; change with caution.
         "keywords": "kw1, kw2, kw3",
         "lifetime": 1,
-        "lock_table_when_creating_participant": True,
         "logfile": "-",
         "loglevel": 0,
         "mode": "debug",
@@ -666,3 +667,79 @@ def redis_conn():
 
     for key in _redis.keys():
         _redis.delete(key)
+
+
+class DebuggingSMTPServer(socketserver.ThreadingTCPServer):
+    """A local stand-in for an SMTP server, which accepts any login and
+    records the messages it is sent in ``messages`` as ``(sender,
+    recipients, data)`` tuples, and the number of ``connections`` made.
+    It does not support STARTTLS.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        socketserver.ThreadingTCPServer.__init__(
+            self, ("localhost", 0), DebuggingSMTPHandler
+        )
+        self.messages = []
+        self.connections = 0
+
+    @property
+    def host(self):
+        return "{}:{}".format(*self.server_address)
+
+
+class DebuggingSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("utf8") + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        sender, recipients = None, []
+        self.reply("220 localhost debugging SMTP server")
+        for line in self.rfile:
+            command = line.decode("utf8").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip("<> "), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip("<> "))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in self.rfile:
+                    if data_line.rstrip(b"\r\n") == b".":
+                        break
+                    data.append(data_line.decode("utf8"))
+                self.server.messages.append((sender, recipients, "".join(data)))
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server():
+    """A running :class:`DebuggingSMTPServer`."""
+    from dallinger import notifications
+
+    server = DebuggingSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    notifications.close_connections()
+    server.shutdown()
+    server.server_close()
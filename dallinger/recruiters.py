@@ -49,6 +49,11 @@ def _get_queue(name="default"):
 NEW_RECRUIT_LOG_PREFIX = "New participant requested:"
 CLOSE_RECRUITMENT_LOG_PREFIX = "Close recruitment."
 
+# Recruiter classes by name and nickname, rebuilt when a subclass is
+# defined, and the recruiter instances shared within a process.
+_registry = {}
+_instances = {}
+
 
 class Recruiter(object):
     """The base recruiter."""
@@ -62,6 +67,11 @@ class Recruiter(object):
         """
         logger.info("Initializing {}...".format(self.__class__.__name__))
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # The new class may claim a name or nickname already registered
+        _registry.clear()
+
     def __call__(self):
         """For backward compatibility with experiments invoking recruiter()
         as a method rather than a property.
@@ -319,7 +329,7 @@ class ProlificRecruiter(Recruiter):
         self.ad_url = f"{base_url}/ad?recruiter={self.nickname}"
         self.study_domain = os.getenv("HOST")
         self.prolificservice = _prolific_service_from_config()
-        self.notifies_admin = admin_notifier(self.config)
+        self.notifies_admin = admin_notifier(self.config, queued=True)
         self.mailer = get_mailer(self.config)
         self.store = kwargs.get("store") or RedisStore()
 
@@ -927,8 +937,11 @@ def mturk_recruiter_notify():
 
 class RedisStore(object):
     """A wrapper around redis, to handle value decoding on retrieval,
-    and easy cleanup of all managed keys via a prefix applied to all
-    stored key/value pairs.
+    and easy cleanup of all managed keys.
+
+    Values are stored as fields of a single redis hash named for the class,
+    so ``clear()`` is a single ``UNLINK`` no matter how many other keys
+    (rq jobs, pubsub state, etc.) share the redis instance.
     """
 
     def __init__(self):
@@ -936,24 +949,18 @@ class RedisStore(object):
         self._prefix = self.__class__.__name__
 
     def set(self, key, value):
-        """Add a prefix to the key, then store the key/value pair in redis."""
-        self._redis.set(self._prefixed(key), value)
+        """Store the key/value pair in our redis hash."""
+        self._redis.hset(self._prefix, key, value)
 
     def get(self, key):
         """Retrieve the value from redis and decode it."""
-        raw = self._redis.get(self._prefixed(key))
+        raw = self._redis.hget(self._prefix, key)
         if raw is not None:
             return raw.decode("utf-8")
 
     def clear(self):
-        """Remove any key that starts with our prefix."""
-        for key in self._redis.keys():
-            key_decoded = key.decode("utf-8")
-            if key_decoded.startswith(self._prefix):
-                self._redis.delete(key)
-
-    def _prefixed(self, key):
-        return "{}:{}".format(self._prefix, key)
+        """Remove all keys we manage, without touching any others."""
+        self._redis.unlink(self._prefix)
 
 
 def _run_mturk_qualification_assignment(worker_id, qualifications):
@@ -983,7 +990,7 @@ class MTurkRecruiter(Recruiter):
             region_name=self.config.get("aws_region"),
             sandbox=self.config.get("mode") != "live",
         )
-        self.notifies_admin = admin_notifier(self.config)
+        self.notifies_admin = admin_notifier(self.config, queued=True)
         self.mailer = get_mailer(self.config)
         self.store = kwargs.get("store") or RedisStore()
         skip_config_validation = kwargs.get("skip_config_validation", False)
@@ -1161,9 +1168,9 @@ class MTurkRecruiter(Recruiter):
         status on MTurk and act based on this.
         """
         unsubmitted = []
-        for participant in participants:
+        statuses = self._mturk_statuses_for(participants)
+        for participant, status in zip(participants, statuses):
             summary = ParticipationTime(participant, reference_time, self.config)
-            status = self._mturk_status_for(participant)
 
             if status == "Approved":
                 participant.status = "approved"
@@ -1301,13 +1308,20 @@ class MTurkRecruiter(Recruiter):
             participant_id = None
             q.enqueue(worker_function, event_type, assignment_id, participant_id)
 
-    def _mturk_status_for(self, participant):
-        try:
-            assignment = self.mturkservice.get_assignment(participant.assignment_id)
-            status = assignment["status"]
-        except Exception:
-            status = None
-        return status
+    def _mturk_statuses_for(self, participants):
+        """Look up the MTurk assignment status of many participants
+        concurrently, returning None for any that can't be determined.
+        """
+        results = self.mturkservice.get_assignments(
+            [p.assignment_id for p in participants]
+        )
+        statuses = []
+        for result in results:
+            try:
+                statuses.append(result.result["status"])
+            except Exception:
+                statuses.append(None)
+        return statuses
 
     def _disable_autorecruit(self):
         heroku_app = heroku_tools.HerokuApp(self.config.get("heroku_app_id_root"))
@@ -1429,11 +1443,12 @@ class RedisTally(object):
         redis_conn.set(self._key, 0)
 
     def increment(self, count):
-        redis_conn.incr(self._key, count)
+        """Atomically add ``count`` and return the new total."""
+        return redis_conn.incrby(self._key, count)
 
     @property
     def current(self):
-        return int(redis_conn.get(self._key))
+        return int(redis_conn.get(self._key) or 0)
 
 
 class MTurkLargeRecruiter(MTurkRecruiter):
@@ -1460,8 +1475,11 @@ class MTurkLargeRecruiter(MTurkRecruiter):
             logger.info("auto_recruit is False: recruitment suppressed")
             return
 
-        needed = max(0, n - self.remaining_pool)
-        self.counter.increment(n)
+        # Incrementing first and deriving the previous total from the result
+        # keeps concurrent recruit() calls from both claiming the same
+        # remaining slots in the pool.
+        previous = self.counter.increment(n) - n
+        needed = max(0, n - max(0, self.pool_size - previous))
         if needed:
             return super(MTurkLargeRecruiter, self).recruit(needed)
 
@@ -1704,23 +1722,51 @@ def _descendent_classes(cls):
             yield cls
 
 
+def _recruiter_registry():
+    """Map the names and nicknames of all recruiter classes to the classes.
+
+    Where two classes share an identifier, the subclass wins.
+    """
+    if not _registry:
+        registry = {}
+        for cls in _descendent_classes(Recruiter):
+            ids = [cls.nickname, cls.__name__]
+            for id_ in ids:
+                previous_registered_cls = registry.get(id_, None)
+                if previous_registered_cls:
+                    should_overwrite = issubclass(cls, previous_registered_cls)
+                else:
+                    should_overwrite = True
+                if should_overwrite:
+                    registry[id_] = cls
+        _registry.update(registry)
+    return _registry
+
+
 def by_name(name, **kwargs):
     """Attempt to return a recruiter class by name.
 
     Actual class names and known nicknames are both supported.
-    """
-    by_name = {}
-    for cls in _descendent_classes(Recruiter):
-        ids = [cls.nickname, cls.__name__]
-        for id_ in ids:
-            previous_registered_cls = by_name.get(id_, None)
-            if previous_registered_cls:
-                should_overwrite = issubclass(cls, previous_registered_cls)
-            else:
-                should_overwrite = True
-            if should_overwrite:
-                by_name[id_] = cls
 
-    klass = by_name.get(name)
-    if klass is not None:
+    Called without keyword arguments, this returns an instance shared by
+    all callers in the current process for as long as the active
+    configuration and its values stay the same, so the recruiter's API
+    clients and connections are reused rather than rebuilt for every
+    lookup.
+    """
+    klass = _recruiter_registry().get(name)
+    if klass is None:
+        return None
+    if kwargs:
         return klass(**kwargs)
+
+    # Recruiters copy configuration values, like the mode and credentials,
+    # when they are created.
+    config = get_config()
+    key = (os.getpid(), config, config.revision)
+    cached = _instances.get(klass)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    recruiter = klass()
+    _instances[klass] = (key, recruiter)
+    return recruiter
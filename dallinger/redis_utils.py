@@ -1,8 +1,6 @@
 import os
 from urllib.parse import urlparse
 
-import redis
-
 
 def connect_to_redis(url=None):
     """Return a connection to Redis.
@@ -13,6 +11,8 @@ def connect_to_redis(url=None):
     Since we are generally running on Heroku, and configuring SSL certificates
     is challenging, we disable cert requirements on secure connections.
     """
+    import redis
+
     redis_url = url or os.getenv("REDIS_URL", "redis://localhost:6379")
     connection_args = {"url": redis_url}
     if urlparse(redis_url).scheme == "rediss":
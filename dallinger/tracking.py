@@ -0,0 +1,158 @@
+"""Batched ingestion of browser tracking events.
+
+Browsers buffer the events they track and post them in batches to the
+experiment server, which appends them to a redis stream without touching the
+database. A job on the ``low`` queue drains the stream, inserting the events
+as :class:`~dallinger.information.TrackingEvent` infos with multi-row
+INSERTs. While more than :data:`MAX_PENDING` events are waiting, batches are
+refused, and browsers keep their events and retry later, dropping the oldest
+once their own buffer is full.
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+
+from rq import Queue
+from sqlalchemy import insert
+from sqlalchemy.sql.expression import false
+
+from dallinger import db, metrics
+from dallinger.models import timenow
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "tracking_events"
+DRAIN_SCHEDULED_KEY = "tracking_events:drain_scheduled"
+
+#: The most events waiting to be inserted before batches are refused.
+MAX_PENDING = 100000
+#: The most events a browser may post at once.
+MAX_BATCH = 500
+#: The events inserted per transaction.
+INSERT_BATCH = 1000
+#: Seconds a drain job spends inserting events before it hands the rest on
+#: to a new job.
+DRAIN_SECONDS = 60
+#: Seconds after which a drain job is timed out, or assumed lost and another
+#: scheduled.
+DRAIN_TIMEOUT = 300
+
+
+def count(outcome, events):
+    """Count ``events`` with an ``outcome`` of ``accepted``, ``rejected``
+    (refused while too many were waiting), ``dropped`` (discarded by the
+    browser), ``invalid`` (for a missing or failed node) or ``inserted``.
+    """
+    if events and metrics.enabled():
+        metrics.inc("dallinger_tracking_events_total", events, outcome=outcome)
+
+
+def pending():
+    """The number of events waiting to be inserted."""
+    return db.redis_conn.xlen(STREAM_KEY)
+
+
+def append(node_id, events, dropped=0):
+    """Queue ``events``, a list of each event's details, for insertion as
+    infos of the node ``node_id``.
+
+    Returns ``False``, queueing nothing, if too many events are waiting.
+    """
+    count("dropped", dropped)
+    if pending() + len(events) > MAX_PENDING:
+        logger.warning(
+            "Refusing %s tracking events with %s waiting", len(events), MAX_PENDING
+        )
+        count("rejected", len(events))
+        return False
+
+    received = timenow().isoformat()
+    pipe = db.redis_conn.pipeline(transaction=False)
+    for details in events:
+        pipe.xadd(
+            STREAM_KEY,
+            {"node_id": node_id, "details": json.dumps(details), "time": received},
+        )
+    pipe.execute()
+    count("accepted", len(events))
+    schedule_drain()
+    return True
+
+
+def schedule_drain():
+    """Enqueue a job to drain the stream, unless one is already scheduled."""
+    if db.redis_conn.set(DRAIN_SCHEDULED_KEY, 1, nx=True, ex=DRAIN_TIMEOUT):
+        Queue("low", connection=db.redis_conn).enqueue(drain, job_timeout=DRAIN_TIMEOUT)
+
+
+@db.scoped_session_decorator
+def drain():
+    """Insert waiting events for up to :data:`DRAIN_SECONDS`, then schedule
+    another job for any left, so that a steady flow of events never keeps
+    one job running until it is timed out.
+    """
+    deadline = time.monotonic() + DRAIN_SECONDS
+    while insert_batch(INSERT_BATCH):
+        db.redis_conn.expire(DRAIN_SCHEDULED_KEY, DRAIN_TIMEOUT)
+        if time.monotonic() >= deadline:
+            break
+    db.redis_conn.delete(DRAIN_SCHEDULED_KEY)
+    # Events left, or appended since the last batch, found this job
+    # scheduled.
+    if pending():
+        schedule_drain()
+
+
+def insert_batch(size=INSERT_BATCH):
+    """Insert up to ``size`` of the oldest waiting events, and remove them
+    from the stream, returning how many were removed.
+
+    Events for nodes which are missing or have failed are discarded.
+    """
+    from dallinger.information import TrackingEvent
+    from dallinger.models import Info, Node
+
+    entries = db.redis_conn.xrange(STREAM_KEY, count=size)
+    if not entries:
+        return 0
+
+    events = [
+        (
+            int(fields[b"node_id"]),
+            json.loads(fields[b"details"]),
+            datetime.fromisoformat(fields[b"time"].decode("utf8")),
+        )
+        for _, fields in entries
+    ]
+    networks = dict(
+        db.session.query(Node.id, Node.network_id).filter(
+            Node.id.in_({node_id for node_id, _, _ in events}),
+            Node.failed == false(),
+        )
+    )
+    rows = [
+        {
+            "type": TrackingEvent.__mapper__.polymorphic_identity,
+            "origin_id": node_id,
+            "network_id": networks[node_id],
+            "details": details,
+            "creation_time": received,
+        }
+        for node_id, details, received in events
+        if node_id in networks
+    ]
+    try:
+        if rows:
+            db.session.execute(insert(Info.__table__), rows)
+        db.session.commit()
+    finally:
+        # Removed along with the commit, even if the job is timed out as it
+        # commits, so that no batch is inserted twice. A batch that can't be
+        # inserted is dropped rather than holding up the rest.
+        db.redis_conn.xdel(STREAM_KEY, *[entry_id for entry_id, _ in entries])
+
+    count("inserted", len(rows))
+    count("invalid", len(entries) - len(rows))
+    return len(entries)
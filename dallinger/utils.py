@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 import functools
 import io
 import locale
+import math
 import os
 import random
 import re
@@ -12,6 +13,7 @@ import subprocess
 import sys
 import tempfile
 import webbrowser
+from collections import OrderedDict
 from hashlib import md5
 from importlib.metadata import files as files_metadata
 from importlib.util import find_spec
@@ -19,22 +21,11 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 from unicodedata import normalize
 
-import requests
-from faker import Faker
-from flask import request
-
-from dallinger import db
+from dallinger import bundles
 from dallinger.compat import is_command
 from dallinger.config import get_config
 from dallinger.version import __version__
 
-try:
-    from pip._vendor import pkg_resources
-except ImportError:
-    pkg_resources = None
-
-fake = Faker()
-
 
 def get_base_url():
     """Returns the base url for the experiment.
@@ -42,6 +33,8 @@ def get_base_url():
     experiment config.
     If the URL is on Heroku makes sure the protocol is https.
     """
+    from flask import request
+
     try:
         return f"{request.scheme}://{request.host}"
     except RuntimeError:
@@ -82,6 +75,27 @@ def generate_random_id(size=6, chars=string.ascii_uppercase + string.digits):
     return "".join(random.choice(chars) for x in range(size))
 
 
+def percentile(values, p):
+    """Return the ``p``-th percentile of sorted ``values`` (nearest rank)."""
+    if not values:
+        return None
+    rank = int(math.ceil(p / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+#: The latency percentiles reported by benchmarks and load tests.
+PERCENTILES = (50, 95, 99)
+
+
+def latency_percentiles(latencies):
+    """Return an ordered mapping of ``p<N>_ms`` to each of the
+    :data:`PERCENTILES` of sorted ``latencies`` in seconds, in milliseconds.
+    """
+    return OrderedDict(
+        ("p{}_ms".format(p), percentile(latencies, p) * 1000) for p in PERCENTILES
+    )
+
+
 def ensure_directory(path):
     """Create a matching path if it does not already exist"""
     if not os.path.exists(path):
@@ -374,8 +388,17 @@ def get_editable_dallinger_path():
     return None
 
 
+def dashboard_password():
+    """A new random password for the dashboard."""
+    from faker import Faker
+
+    return Faker().password(length=20, special_chars=False)
+
+
 def check_local_db_connection(log):
     """Verify that the local Postgres server is running."""
+    from dallinger import db
+
     try:
         log("Checking your local Postgres database connection...")
         db.check_connection()
@@ -392,6 +415,10 @@ def check_experiment_dependencies(requirements_file):
     """
     if os.environ.get("SKIP_DEPENDENCY_CHECK"):
         return
+    try:
+        from pip._vendor import pkg_resources
+    except ImportError:
+        pkg_resources = None
     try:
         with open(requirements_file, "r") as f:
             dependencies = [
@@ -460,7 +487,7 @@ def bootstrap_development_session(exp_config, experiment_path, log):
         }
     )
     if not config.get("dashboard_password", None):
-        config.set("dashboard_password", fake.password(length=20, special_chars=False))
+        config.set("dashboard_password", dashboard_password())
 
     source_path = Path(dallinger_package_path()) / "dev_server"
     destination_path = develop_target_path(config)
@@ -526,7 +553,7 @@ def setup_experiment(
     )
 
     if not config.get("dashboard_password", None):
-        config.set("dashboard_password", fake.password(length=20, special_chars=False))
+        config.set("dashboard_password", dashboard_password())
 
     temp_dir = assemble_experiment_temp_dir(log, config, for_remote=not local_checks)
     log("Deployment temp directory: {}".format(temp_dir), chevrons=False)
@@ -576,6 +603,8 @@ def ensure_constraints_file_presence(directory: str):
     try:
         os.chdir(directory)
         url = f"https://raw.githubusercontent.com/Dallinger/Dallinger/v{__version__}/dev-requirements.txt"
+        import requests
+
         try:
             response = requests.get(url)
         except requests.exceptions.ConnectionError:
@@ -640,15 +669,24 @@ def assemble_experiment_temp_dir(log, config, for_remote=False):
       if needed by the time we reach this code)
     - A dallinger zip (only if dallinger is installed in editable mode)
     - A prepare_docker_image.sh.sh script (possibly empty)
+    - A manifest of the hashes of these files (see dallinger.bundles)
+
+    Large files are hard-linked from the bundle cache rather than copied,
+    and the dallinger package is only rebuilt when its source has changed,
+    unless the environment variable DALLINGER_NO_BUNDLE_CACHE is set.
 
     Assumes the experiment root directory is the current working directory.
 
     Returns the absolute path of the new directory.
     """
     exp_id = config.get("id")
+    cache = bundles.BundleCache.open(log)
     dst = os.path.join(tempfile.mkdtemp(), exp_id)
     collate_experiment_files(
-        config, experiment_path=os.getcwd(), destination=dst, copy_func=copy_file
+        config,
+        experiment_path=os.getcwd(),
+        destination=dst,
+        copy_func=cache.place if cache else copy_file,
     )
 
     # Write out the loaded configuration
@@ -681,14 +719,24 @@ def assemble_experiment_temp_dir(log, config, for_remote=False):
                 "    export DALLINGER_NO_EGG_BUILD=1\n"
                 "or you can install dallinger without the editable (-e) flag."
             )
-            egg_name = build_and_place(dallinger_path, dst)
+            if cache:
+                egg_name = cache.build_and_place(
+                    dallinger_path, dst, build=build_and_place
+                )
+            else:
+                egg_name = build_and_place(dallinger_path, dst)
             # Replace the line about dallinger in requirements.txt so that
-            # it refers to the just generated package
+            # it refers to the just generated package. The file is replaced
+            # rather than rewritten, since it may be linked from the cache.
             constraints_text = requirements_path.read_text()
             new_constraints_text = re.sub(
                 "dallinger==.*", f"file:{egg_name}", constraints_text
             )
+            requirements_path.unlink()
             requirements_path.write_text(new_constraints_text)
+    if cache:
+        cache.write_manifest(dst)
+        cache.save()
     return dst
 
 
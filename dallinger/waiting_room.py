@@ -0,0 +1,87 @@
+"""Waiting room quorum admission, tracked in redis.
+
+Each participant signing up is admitted by adding their worker id to a redis
+sorted set of the non-failed participants, which gives every sign-up an
+atomic count of the participants so far without locking or counting the
+participant table. The set is reconciled with the database every
+:data:`RECONCILE_INTERVAL` seconds, to catch participants whose status has
+since changed (e.g. to returned or failed) and sign-ups which were never
+committed.
+"""
+
+import time
+
+from sqlalchemy import select
+
+from dallinger import db
+
+NONFAILED_KEY = "waiting_room:nonfailed"
+RECONCILED_KEY = "waiting_room:reconciled"
+RECONCILE_INTERVAL = 10
+
+#: The statuses of participants counting towards the quorum.
+NONFAILED_STATUSES = ("working", "overrecruited", "submitted", "approved")
+
+
+def admit(worker_id):
+    """Count ``worker_id`` towards the quorum, returning the number of
+    non-failed participants including them.
+
+    Admitting the same worker again, as when a serialized transaction is
+    retried, does not count them twice.
+    """
+    reconcile_if_due()
+    pipe = db.redis_conn.pipeline()
+    pipe.zadd(NONFAILED_KEY, {worker_id: time.time()}, nx=True)
+    pipe.zcard(NONFAILED_KEY)
+    return pipe.execute()[1]
+
+
+def reconcile_if_due():
+    """Reconcile, unless another process has within the last
+    :data:`RECONCILE_INTERVAL` seconds.
+    """
+    if db.redis_conn.set(RECONCILED_KEY, 1, nx=True, ex=RECONCILE_INTERVAL):
+        reconcile()
+
+
+def reconcile():
+    """Bring the set of non-failed participants in line with the database.
+
+    The participants are read outside of any serialized transaction, so as
+    not to conflict with sign-ups. Members missing from the database are
+    only removed once they were admitted more than
+    :data:`RECONCILE_INTERVAL` seconds ago, so sign-ups which are yet to
+    commit are left in place.
+    """
+    from dallinger.models import Participant
+
+    started = time.time()
+    with db.engine.connect() as connection:
+        rows = connection.execute(select(Participant.worker_id, Participant.status))
+        statuses = {}
+        for worker_id, status in rows:
+            if statuses.get(worker_id) not in NONFAILED_STATUSES:
+                statuses[worker_id] = status
+
+    nonfailed = {w for w, s in statuses.items() if s in NONFAILED_STATUSES}
+    failed = set(statuses) - nonfailed
+    stale = [
+        member
+        for member in db.redis_conn.zrangebyscore(
+            NONFAILED_KEY, "-inf", started - RECONCILE_INTERVAL
+        )
+        if member.decode("utf8") not in statuses
+    ]
+
+    pipe = db.redis_conn.pipeline()
+    if nonfailed:
+        pipe.zadd(NONFAILED_KEY, {w: started for w in nonfailed}, nx=True)
+    if failed or stale:
+        pipe.zrem(NONFAILED_KEY, *(list(failed) + stale))
+    pipe.execute()
+
+
+def reset():
+    """Forget all admissions, as when the database is reset."""
+    db.redis_conn.delete(NONFAILED_KEY, RECONCILED_KEY)
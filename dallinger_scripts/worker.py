@@ -12,6 +12,7 @@ def main():
     # (which has the side effect of applying gevent monkey patches)
     # in the worker process. This way other processes can import the
     # redis connection without that side effect.
+    import json
     import logging
     import os
 
@@ -20,10 +21,13 @@ def main():
     from rq import Connection, Queue
     from six.moves.urllib.parse import urlparse
 
-    from dallinger.config import initialize_experiment_package
+    from dallinger.config import get_config, initialize_experiment_package
     from dallinger.heroku.rq_gevent_worker import GeventWorker as Worker
 
     initialize_experiment_package(os.getcwd())
+    config = get_config()
+    if not config.ready:
+        config.load()
 
     log_level = os.environ.get("loglevel", "WARN")
     logging.basicConfig(
@@ -46,12 +50,24 @@ def main():
     redis_conn = StrictRedis(connection_pool=redis_pool)
 
     with Connection(redis_conn):
-        worker = Worker(list(map(Queue, listen)), log_job_description=False)
+        worker = Worker(
+            list(map(Queue, listen)),
+            log_job_description=False,
+            pool_size=config.get("worker_pool_size", None),
+            queue_pool_sizes=json.loads(config.get("worker_queue_pool_sizes", "{}")),
+            adapt_pool_size=config.get("worker_adaptive_pool_size", False),
+            queue_reservations=json.loads(
+                config.get("worker_queue_reservations", "null")
+            ),
+            queue_weights=json.loads(config.get("worker_queue_weights", "{}")),
+        )
         worker.log_result_lifespan = False
         # Default to log.warn because rq logs extremely verbosely at the info
         # level
         worker.log.info = worker.log.debug
-        worker.work(logging_level=log_level)
+        # Scheduled jobs, like the digests of admin notifications, are
+        # enqueued by the worker holding the scheduler's lock.
+        worker.work(logging_level=log_level, with_scheduler=True)
 
 
 if __name__ == "__main__":  # pragma: nocover
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import text
+
+
+@pytest.mark.usefixtures("experiment_dir", "db_session")
+@pytest.mark.slow
+class TestBenchmark(object):
+    @pytest.fixture
+    def benchmark(self, webapp):
+        from dallinger import db
+        from dallinger.benchmark import Benchmark
+
+        return Benchmark(webapp.application, db.engine, participants=2, trials=2)
+
+    def test_reports_latency_and_statements_per_route(self, benchmark):
+        benchmark.run()
+        report = benchmark.report()
+
+        assert report["flow"] == "chain"
+        assert report["participants"] == 2
+        assert report["statements"] > 0
+        assert report["serialization_retries"] == 0
+        signups = report["routes"][
+            "POST /participant/<worker_id>/<hit_id>/<assignment_id>/<mode>"
+        ]
+        assert signups["requests"] == 2
+        assert signups["errors"] == 0
+        assert signups["mean_statements"] > 0
+        assert signups["p50_ms"] <= signups["p99_ms"]
+        assert report["routes"]["POST /question/<participant_id>"]["requests"] == 2
+
+    def test_info_flow_measures_info_posts(self, webapp):
+        from dallinger import db
+        from dallinger.benchmark import Benchmark
+
+        benchmark = Benchmark(
+            webapp.application, db.engine, flow="info", participants=2, trials=3
+        )
+        benchmark.run()
+        report = benchmark.report()
+
+        infos = report["routes"]["POST /info/<int:node_id>"]
+        assert infos["requests"] == 6
+        assert infos["errors"] == 0
+        assert report["requests_per_second"] > 0
+
+    def test_stops_listening_for_statements_after_run(self, benchmark, db_session):
+        benchmark.run()
+        statements = benchmark.statements
+        db_session.execute(text("SELECT 1"))
+        assert benchmark.statements == statements
+
+
+class TestBenchmarkHelpers(object):
+    def test_rejects_unknown_flow(self):
+        from dallinger.benchmark import Benchmark
+
+        with pytest.raises(ValueError) as ex:
+            Benchmark(None, None, flow="bogus")
+        assert ex.match("choose from chain, chatroom, mcmcp, rogers, info")
+
+    def test_compare_reports(self):
+        from dallinger.benchmark import compare
+
+        baseline = {
+            "routes": {
+                "GET /a": {"p95_ms": 10.0, "mean_statements": 4.0},
+                "GET /gone": {"p95_ms": 5.0, "mean_statements": 1.0},
+            }
+        }
+        current = {
+            "routes": {
+                "GET /a": {"p95_ms": 15.0, "mean_statements": 2.0},
+                "GET /new": {"p95_ms": 1.0, "mean_statements": 1.0},
+            }
+        }
+        assert compare(baseline, current) == [
+            ["GET /a", 10.0, 15.0, 0.5, 4.0, 2.0],
+            ["GET /gone", 5.0, None, None, 1.0, None],
+            ["GET /new", None, 1.0, None, None, 1.0],
+        ]
@@ -114,14 +114,17 @@ class TestHighPerformanceBot(object):
         return bot
 
     @pytest.fixture
-    def req_post(self):
-        with mock.patch("requests.post") as patch_post:
-            yield patch_post
+    def http(self, bot):
+        bot.http = mock.Mock()
+        return bot.http
 
     @pytest.fixture
-    def req_get(self):
-        with mock.patch("requests.get") as patch_get:
-            yield patch_get
+    def req_post(self, http):
+        return http.post
+
+    @pytest.fixture
+    def req_get(self, http):
+        return http.get
 
     @pytest.fixture
     def fake_uuid(self):
@@ -179,3 +182,28 @@ class TestHighPerformanceBot(object):
         )
         # returns the response object
         assert response.dummy == 1
+
+    def test_bots_share_a_pooled_session(self, bot):
+        from dallinger.bots import HighPerformanceBotBase
+
+        other = HighPerformanceBotBase("https://dallinger.io/ad?worker_id=worker2")
+        assert bot.http is other.http
+
+    def test_sign_up_can_skip_quorum_channel(self, bot, req_post):
+        req_post.return_value.json.return_value = {
+            "status": "OK",
+            "participant": {"id": 4},
+        }
+        bot.listen_for_quorum = False
+
+        bot.sign_up()
+        bot.subscribe_to_quorum_channel.assert_not_called()
+
+    def test_think_time_pauses_between_phases(self, bot):
+        bot.think_time = mock.Mock(return_value=0.5)
+        for phase in ("sign_up", "participate", "sign_off", "complete_experiment"):
+            setattr(bot, phase, mock.Mock())
+
+        with mock.patch("gevent.sleep") as sleep:
+            bot.run_experiment()
+        assert sleep.call_args_list == [mock.call(0.5), mock.call(0.5)]
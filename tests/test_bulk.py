@@ -0,0 +1,113 @@
+import threading
+import time
+
+import mock
+import pytest
+
+
+class TestTokenBucket(object):
+    @pytest.fixture
+    def bucket(self):
+        from dallinger.bulk import TokenBucket
+
+        return TokenBucket(rate=50, capacity=5)
+
+    def test_initial_burst_does_not_wait(self, bucket):
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.05
+
+    def test_waits_for_tokens_once_burst_is_spent(self, bucket):
+        for _ in range(5):
+            bucket.acquire()
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        # 5 tokens at 50/second take about 0.1 seconds to accumulate
+        assert time.monotonic() - start >= 0.08
+
+
+class TestBulkExecutor(object):
+    @pytest.fixture
+    def executor(self):
+        from dallinger.bulk import BulkExecutor
+
+        return BulkExecutor(
+            max_workers=4, is_retryable=lambda ex: "throttled" in str(ex), backoff=0
+        )
+
+    def test_results_are_in_call_order(self, executor):
+        def slow_double(x):
+            time.sleep(0.01 * (5 - x))
+            return x * 2
+
+        results = executor.map(slow_double, [((x,), {}) for x in range(5)])
+
+        assert [r.result for r in results] == [0, 2, 4, 6, 8]
+        assert [r.args for r in results] == [(x,) for x in range(5)]
+
+    def test_calls_run_concurrently(self, executor):
+        barrier = threading.Barrier(4, timeout=2)
+
+        results = executor.map(barrier.wait, [((), {})] * 4)
+
+        assert all(r.error is None for r in results)
+
+    def test_errors_are_captured_per_call(self, executor):
+        def fail_on_odd(x):
+            if x % 2:
+                raise ValueError(x)
+            return x
+
+        results = executor.map(fail_on_odd, [((x,), {}) for x in range(4)])
+
+        assert [r.result for r in results] == [0, None, 2, None]
+        assert isinstance(results[1].error, ValueError)
+
+    def test_retries_retryable_errors(self, executor):
+        func = mock.Mock(side_effect=[Exception("throttled"), "ok"])
+
+        assert executor.call(func) == "ok"
+        assert func.call_count == 2
+
+    def test_does_not_retry_other_errors(self, executor):
+        func = mock.Mock(side_effect=[Exception("Boom!"), "ok"])
+
+        with pytest.raises(Exception):
+            executor.call(func)
+        assert func.call_count == 1
+
+    def test_gives_up_after_max_attempts(self, executor):
+        func = mock.Mock(side_effect=Exception("throttled"))
+
+        with pytest.raises(Exception):
+            executor.call(func)
+        assert func.call_count == executor.max_attempts
+
+
+class TestPaginate(object):
+    def test_follows_next_tokens(self):
+        from dallinger.bulk import paginate
+
+        method = mock.Mock(
+            side_effect=[
+                {"Items": [1, 2], "NextToken": "token"},
+                {"Items": [3]},
+            ]
+        )
+
+        assert list(paginate(method, "Items", Size=2)) == [1, 2, 3]
+        assert method.call_args_list == [
+            mock.call(Size=2),
+            mock.call(Size=2, NextToken="token"),
+        ]
+
+    def test_is_lazy(self):
+        from dallinger.bulk import paginate
+
+        method = mock.Mock(return_value={"Items": [1], "NextToken": "token"})
+
+        items = paginate(method, "Items")
+        assert next(items) == 1
+        assert method.call_count == 1
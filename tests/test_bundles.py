@@ -0,0 +1,132 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def bundles(tempdir, monkeypatch):
+    from dallinger import bundles
+
+    monkeypatch.setenv("DALLINGER_BUNDLE_CACHE", os.path.join(tempdir, "cache"))
+    monkeypatch.delenv("DALLINGER_NO_BUNDLE_CACHE", raising=False)
+    return bundles
+
+
+@pytest.fixture
+def cache(bundles):
+    return bundles.BundleCache.open()
+
+
+@pytest.fixture
+def files(tempdir):
+    root = Path(tempdir) / "files"
+    root.mkdir()
+    return root
+
+
+def write_old(path, content):
+    """Write a file modified long enough ago for its hash to be remembered."""
+    path.write_bytes(content)
+    past = time.time() - 60
+    os.utime(path, (past, past))
+    return path
+
+
+class TestBundleCache(object):
+    def test_disabled_by_environment(self, bundles, monkeypatch):
+        monkeypatch.setenv("DALLINGER_NO_BUNDLE_CACHE", "1")
+        assert bundles.BundleCache.open() is None
+
+    def test_large_files_are_linked_from_the_cache(self, bundles, cache, files):
+        src = write_old(files / "video.mp4", b"x" * bundles.LINK_MIN_SIZE)
+
+        cache.place(str(src), str(files / "first.mp4"))
+        cache.place(str(src), str(files / "second.mp4"))
+
+        first, second = (files / "first.mp4").stat(), (files / "second.mp4").stat()
+        assert first.st_ino == second.st_ino
+        assert first.st_nlink == 3
+        assert (files / "second.mp4").read_bytes() == src.read_bytes()
+
+    def test_small_files_are_copied(self, cache, files):
+        src = write_old(files / "experiment.py", b"import dallinger")
+
+        cache.place(str(src), str(files / "copy.py"))
+
+        assert (files / "copy.py").stat().st_nlink == 1
+        assert (files / "copy.py").read_bytes() == b"import dallinger"
+
+    def test_unchanged_files_are_not_hashed_again(self, bundles, cache, files):
+        src = write_old(files / "a.txt", b"first")
+        digest = cache.digest(str(src))
+        cache.save()
+
+        reopened = bundles.BundleCache.open()
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(bundles, "hash_file", pytest.fail)
+            assert reopened.digest(str(src)) == digest
+
+        write_old(files / "a.txt", b"changed")
+        assert reopened.digest(str(src)) != digest
+
+    def test_distribution_rebuilt_only_when_source_changes(self, cache, files):
+        source = files / "source"
+        (source / "pkg").mkdir(parents=True)
+        write_old(source / "pkg" / "__init__.py", b"")
+        builds = []
+
+        def build(src, destination):
+            builds.append(src)
+            name = "pkg-{}.whl".format(len(builds))
+            (Path(destination) / name).write_text("wheel")
+            return name
+
+        def place(run):
+            (files / run).mkdir()
+            return cache.build_and_place(str(source), str(files / run), build)
+
+        assert place("first") == "pkg-1.whl"
+        assert place("second") == "pkg-1.whl"
+        # Built distributions are left out of the source's hash.
+        (source / "dist").mkdir()
+        write_old(source / "dist" / "pkg-1.whl", b"wheel")
+        assert place("third") == "pkg-1.whl"
+        assert len(builds) == 1
+
+        write_old(source / "pkg" / "__init__.py", b"VERSION = 2")
+        assert place("fourth") == "pkg-2.whl"
+        assert (files / "fourth" / "pkg-2.whl").exists()
+
+
+class TestManifest(object):
+    def test_file_digests_use_manifest_for_unchanged_files(self, bundles, cache, files):
+        bundle = files / "bundle"
+        bundle.mkdir()
+        (bundle / "requirements.txt").write_text("dallinger")
+        manifest = cache.write_manifest(str(bundle))
+
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(bundles, "hash_file", pytest.fail)
+            assert bundles.file_digests(str(bundle), ["requirements.txt"]) == [
+                manifest["requirements.txt"][3]
+            ]
+
+        (bundle / "requirements.txt").write_text("dallinger==99")
+        assert bundles.file_digests(str(bundle), ["requirements.txt"]) == [
+            bundles.hash_file(str(bundle / "requirements.txt"))
+        ]
+
+    def test_file_digests_without_manifest(self, bundles, files):
+        (files / "requirements.txt").write_text("dallinger")
+
+        assert bundles.file_digests(str(files), ["requirements.txt"]) == [
+            bundles.hash_file(str(files / "requirements.txt"))
+        ]
+
+    def test_manifest_signature(self, bundles, cache, files):
+        assert bundles.manifest_signature(str(files)) is None
+
+        cache.write_manifest(str(files))
+        assert bundles.manifest_signature(str(files)) is not None
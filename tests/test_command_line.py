@@ -3,6 +3,7 @@
 import os
 import re
 import subprocess
+import sys
 from time import sleep
 from uuid import UUID
 
@@ -21,6 +22,23 @@ def found_in(name, path):
     return os.path.exists(os.path.join(path, name))
 
 
+def imported_packages(code):
+    """The top-level packages imported when running ``code`` in a new
+    interpreter, as reported by ``python -X importtime``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        line.rsplit("|", 1)[-1].strip().split(".")[0]
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
 @pytest.fixture
 def sleepless():
     # Use this fixture to ignore sleep() calls, for speed.
@@ -39,14 +57,14 @@ def heroku():
     from dallinger.heroku.tools import HerokuApp
 
     instance = mock.Mock(spec=HerokuApp)
-    with mock.patch("dallinger.command_line.HerokuApp") as mock_app_class:
+    with mock.patch("dallinger.heroku.tools.HerokuApp") as mock_app_class:
         mock_app_class.return_value = instance
         yield instance
 
 
 @pytest.fixture
 def data():
-    with mock.patch("dallinger.command_line.data") as mock_data:
+    with mock.patch("dallinger.data") as mock_data:
         mock_data.backup.return_value = "fake backup url"
         mock_bucket = mock.Mock()
         mock_key = mock.Mock()
@@ -58,7 +76,7 @@ def data():
 
 @pytest.fixture
 def mturk(fake_parsed_hit):
-    with mock.patch("dallinger.command_line.MTurkService") as mock_mturk:
+    with mock.patch("dallinger.mturk.MTurkService") as mock_mturk:
         mock_instance = mock.Mock()
         mock_instance.get_hits.return_value = [fake_parsed_hit]
         mock_mturk.return_value = mock_instance
@@ -93,7 +111,7 @@ class TestVerify(object):
 
     def test_too_big_returns_false(self, v_directory):
         with mock.patch(
-            "dallinger.command_line.utils.ExperimentFileSource.size",
+            "dallinger.utils.ExperimentFileSource.size",
             new_callable=mock.PropertyMock,
         ) as size:
             size.return_value = 6000000  # 6 MB, so over the limit
@@ -101,7 +119,7 @@ class TestVerify(object):
 
     def test_under_limit_returns_true(self, v_directory):
         with mock.patch(
-            "dallinger.command_line.utils.ExperimentFileSource.size",
+            "dallinger.utils.ExperimentFileSource.size",
             new_callable=mock.PropertyMock,
         ) as size:
             size.return_value = 4000000  # 4 MB, so under the limit
@@ -158,7 +176,7 @@ class TestReportAfterIdleDecorator(object):
         def will_time_out():
             sleep(2)
 
-        with mock.patch("dallinger.command_line.admin_notifier") as getter:
+        with mock.patch("dallinger.notifications.admin_notifier") as getter:
             mock_messenger = mock.Mock()
             getter.return_value = mock_messenger
             will_time_out()
@@ -179,6 +197,33 @@ class TestOutput(object):
         output.blather("blah blah blah")
 
 
+class TestStartupImports(object):
+    heavy = {
+        "boto3",
+        "docker",
+        "faker",
+        "flask",
+        "paramiko",
+        "psycopg2",
+        "redis",
+        "rq",
+        "sqlalchemy",
+    }
+
+    def test_help_imports_no_heavy_dependencies(self):
+        imported = imported_packages(
+            "from dallinger.command_line import dallinger; "
+            "dallinger(['--help'], standalone_mode=False)"
+        )
+        assert "dallinger" in imported
+        assert imported.isdisjoint(self.heavy)
+
+    def test_importing_db_does_not_connect(self):
+        imported = imported_packages("import dallinger.db")
+        assert "sqlalchemy" in imported
+        assert imported.isdisjoint({"psycopg2", "redis"})
+
+
 class TestHeader(object):
     def test_header_contains_version_number(self):
         # Make sure header contains the version number.
@@ -224,7 +269,7 @@ class TestDebugCommand(object):
 
     @pytest.fixture
     def deployment(self):
-        with mock.patch("dallinger.command_line.DebugDeployment") as mock_dbgr:
+        with mock.patch("dallinger.deployment.DebugDeployment") as mock_dbgr:
             yield mock_dbgr
 
     def test_fails_if_run_outside_experiment_dir(self, debug, deployment):
@@ -271,7 +316,7 @@ class TestSandboxAndDeploy(object):
     @pytest.fixture
     def dsss(self):
         with mock.patch(
-            "dallinger.command_line.deploy_sandbox_shared_setup"
+            "dallinger.deployment.deploy_sandbox_shared_setup"
         ) as mock_dsss:
             yield mock_dsss
 
@@ -348,7 +393,7 @@ class TestLoad(object):
 
     @pytest.fixture
     def deployment(self):
-        with mock.patch("dallinger.command_line.LoaderDeployment") as dep:
+        with mock.patch("dallinger.deployment.LoaderDeployment") as dep:
             yield dep
 
     def test_load_with_app_id(self, load, deployment):
@@ -376,9 +421,9 @@ class TestSummary(object):
             "summary": [["approved", 1], ["submitted", 1]],
             "unfilled_networks": 0,
         }
-        with mock.patch("dallinger.command_line.requests") as req:
-            req.get.return_value = response
-            yield req
+        with mock.patch("requests.get") as get:
+            get.return_value = response
+            yield get
 
     def test_summary(self, summary, patched_summary_route):
         with mock.patch("dallinger.heroku.tools.HerokuApp.url"):
@@ -423,6 +468,37 @@ class TestBot(object):
         assert mock_bot.run_experiment.called
 
 
+def fake_bulk_results(func, calls):
+    """Mimic an MTurkService bulk method by making each call serially."""
+    from dallinger.bulk import BulkResult
+
+    results = []
+    for args, kwargs in calls:
+        try:
+            results.append(BulkResult(args, kwargs, func(*args, **kwargs), None))
+        except Exception as ex:
+            results.append(BulkResult(args, kwargs, None, ex))
+    return results
+
+
+class TestLoadTest(object):
+    def test_patches_sockets_before_importing_bots(self):
+        from dallinger.command_line import load_test
+
+        calls = mock.Mock()
+        patch_all = mock.patch("gevent.monkey.patch_all", calls.patch_all)
+        setup = mock.patch(
+            "dallinger.deployment.setup_experiment", calls.setup_experiment
+        )
+        with patch_all, setup:
+            CliRunner().invoke(load_test, ["--debug", "http://localhost:5000"])
+
+        assert calls.mock_calls[:2] == [
+            mock.call.patch_all(),
+            mock.call.setup_experiment(mock.ANY),
+        ]
+
+
 class TestQualify(object):
     @pytest.fixture
     def qualify(self):
@@ -432,10 +508,18 @@ class TestQualify(object):
 
     @pytest.fixture
     def mturk(self):
-        with mock.patch("dallinger.command_line.MTurkService") as mock_mturk:
+        with mock.patch("dallinger.mturk.MTurkService") as mock_mturk:
             mock_results = [{"id": "some qid", "score": 1}]
             mock_instance = mock.Mock()
             mock_instance.get_workers_with_qualification.return_value = mock_results
+
+            def assign_qualifications(qid, workers, score, notify=False):
+                return fake_bulk_results(
+                    mock_instance.assign_qualification,
+                    [((qid, worker, score), {"notify": notify}) for worker in workers],
+                )
+
+            mock_instance.assign_qualifications.side_effect = assign_qualifications
             mock_mturk.return_value = mock_instance
 
             yield mock_instance
@@ -460,7 +544,7 @@ class TestQualify(object):
 
     def test_uses_mturk_sandbox_if_specified(self, qualify):
         qual_value = 1
-        with mock.patch("dallinger.command_line.MTurkService") as mock_mturk:
+        with mock.patch("dallinger.mturk.MTurkService") as mock_mturk:
             mock_mturk.return_value = mock.Mock()
             CliRunner().invoke(
                 qualify,
@@ -502,6 +586,16 @@ class TestQualify(object):
             "some qid", "some worker id", qual_value, notify=True
         )
 
+    def test_qualify_reports_failed_workers(self, qualify, mturk):
+        mturk.assign_qualification.side_effect = [True, Exception("Boom!")]
+        result = CliRunner().invoke(
+            qualify,
+            ["--qualification", "some qid", "--value", "1", "worker1", "worker2"],
+        )
+        assert result.exit_code == 0
+        assert "worker1 OK" in result.output
+        assert "worker2 failed: Boom!" in result.output
+
     def test_qualify_multiple_workers(self, qualify, mturk):
         qual_value = 1
         result = CliRunner().invoke(
@@ -573,7 +667,7 @@ class TestEmailTest(object):
         from dallinger.notifications import SMTPMailer
 
         mock_mailer = mock.Mock(spec=SMTPMailer)
-        with mock.patch("dallinger.command_line.SMTPMailer") as klass:
+        with mock.patch("dallinger.notifications.SMTPMailer") as klass:
             klass.return_value = mock_mailer
             yield mock_mailer
 
@@ -625,7 +719,7 @@ class TestCompensate(object):
         return recruiter
 
     def test_compensate_with_notification(self, compensate, mturkrecruiter):
-        with mock.patch("dallinger.command_line.by_name") as by_name:
+        with mock.patch("dallinger.recruiters.by_name") as by_name:
             by_name.return_value = mturkrecruiter
             result = CliRunner().invoke(
                 compensate,
@@ -649,7 +743,7 @@ class TestCompensate(object):
         )
 
     def test_compensate_without_notification(self, compensate, mturkrecruiter):
-        with mock.patch("dallinger.command_line.by_name") as by_name:
+        with mock.patch("dallinger.recruiters.by_name") as by_name:
             by_name.return_value = mturkrecruiter
             result = CliRunner().invoke(
                 compensate,
@@ -674,7 +768,7 @@ class TestCompensate(object):
     def test_traps_errors_and_forwards_message_portion(
         self, compensate, mturkrecruiter
     ):
-        with mock.patch("dallinger.command_line.by_name") as by_name:
+        with mock.patch("dallinger.recruiters.by_name") as by_name:
             by_name.return_value = mturkrecruiter
             mturkrecruiter.compensate_worker.side_effect = Exception("Boom!")
             result = CliRunner().invoke(
@@ -697,7 +791,7 @@ class TestExtendMTurkHIT(object):
 
     @pytest.fixture
     def mturk(self):
-        with mock.patch("dallinger.command_line.MTurkService") as mock_mturk:
+        with mock.patch("dallinger.mturk.MTurkService") as mock_mturk:
             mock_instance = mock.Mock()
             mock_instance.extend_hit.return_value = {
                 "title": "HIT Title",
@@ -769,12 +863,20 @@ class TestRevoke(object):
 
     @pytest.fixture
     def mturk(self):
-        with mock.patch("dallinger.command_line.MTurkService") as mock_mturk:
+        with mock.patch("dallinger.mturk.MTurkService") as mock_mturk:
             mock_instance = mock.Mock()
             mock_instance.get_qualification_type_by_name.return_value = "some qid"
             mock_instance.get_workers_with_qualification.return_value = [
                 {"id": "some qid", "score": 1}
             ]
+
+            def revoke_qualifications(qid, workers, reason=""):
+                return fake_bulk_results(
+                    mock_instance.revoke_qualification,
+                    [((qid, worker, reason), {}) for worker in workers],
+                )
+
+            mock_instance.revoke_qualifications.side_effect = revoke_qualifications
             mock_mturk.return_value = mock_instance
 
             yield mock_instance
@@ -812,7 +914,7 @@ class TestRevoke(object):
         mturk.revoke_qualification.assert_not_called()
 
     def test_uses_mturk_sandbox_if_specified(self, revoke):
-        with mock.patch("dallinger.command_line.MTurkService") as mock_mturk:
+        with mock.patch("dallinger.mturk.MTurkService") as mock_mturk:
             mock_mturk.return_value = mock.Mock()
             CliRunner().invoke(
                 revoke,
@@ -1041,7 +1143,7 @@ class TestMonitor(object):
 
     @pytest.fixture
     def command_line_check_call(self):
-        with mock.patch("dallinger.command_line.check_call") as call:
+        with mock.patch("dallinger.utils.check_call") as call:
             yield call
 
     @pytest.fixture
@@ -206,6 +206,84 @@ worldwide = false
         redis_conn.set("auto_recruit", 1)
         assert active_config.get("auto_recruit") is True
 
+    def test_changeable_params_are_cached(self, active_config, redis_conn):
+        redis_conn.set("auto_recruit", 1)
+        assert active_config.get("auto_recruit") is True
+
+        redis_conn.set("auto_recruit", 0)
+        assert active_config.get("auto_recruit") is True
+
+    def test_cached_changeable_params_expire(
+        self, active_config, redis_conn, monkeypatch
+    ):
+        redis_conn.set("auto_recruit", 1)
+        active_config.get("auto_recruit")
+        monkeypatch.setattr(active_config._changeable, "TTL", 0)
+
+        redis_conn.set("auto_recruit", 0)
+        assert active_config.get("auto_recruit") is False
+
+    def test_set_changeable_updates_other_processes(self, active_config, redis_conn):
+        import time
+
+        other = Configuration()
+        other.register("auto_recruit", bool)
+        active_config.set_changeable("auto_recruit", True)
+        assert other.get("auto_recruit") is True
+
+        active_config.set_changeable("auto_recruit", False)
+        for _ in range(100):
+            if other.get("auto_recruit") is False:
+                break
+            time.sleep(0.01)
+        assert other.get("auto_recruit") is False
+        assert active_config.get("auto_recruit") is False
+
+    def test_set_changeable_rejects_other_params(self, active_config):
+        with pytest.raises(KeyError):
+            active_config.set_changeable("title", "changed")
+
+    def test_later_layers_take_precedence(self):
+        config = Configuration()
+        config.register("num_participants", int)
+        config.ready = True
+        config.extend({"num_participants": 1})
+        config.extend({"num_participants": 2})
+        assert config.get("num_participants") == 2
+
+        with config.override({"num_participants": 3}):
+            assert config.get("num_participants") == 3
+        assert config.get("num_participants") == 2
+
+    def test_editing_layers_in_place(self):
+        config = Configuration()
+        config.register("num_participants", int)
+        config.ready = True
+        config.extend({"num_participants": 1})
+        config.extend({"num_participants": 2})
+        assert config.get("num_participants") == 2
+
+        config.data[0]["num_participants"] = 3
+        assert config.get("num_participants") == 3
+
+        del config.data[0]["num_participants"]
+        assert config.get("num_participants") == 1
+
+        config.data[1].clear()
+        assert config.get("num_participants", None) is None
+
+    def test_revision_counts_changes(self):
+        config = Configuration()
+        config.register("num_participants", int)
+        revision = config.revision
+
+        config.extend({"num_participants": 1})
+        config.data[0]["num_participants"] = 2
+        with config.override({"num_participants": 3}):
+            pass
+
+        assert config.revision == revision + 4
+
 
 @pytest.mark.usefixtures("experiment_dir_merged")
 class TestConfigurationIntegrationTests(object):
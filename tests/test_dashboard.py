@@ -649,6 +649,31 @@ class TestDashboardLifeCycleRoutes(object):
         ) in resp.data.decode("utf8")
 
 
+@pytest.mark.usefixtures("experiment_dir_merged")
+class TestDashboardSQLProfileRoutes(object):
+    def test_requires_login(self, webapp):
+        assert webapp.get("/dashboard/sql_profile").status_code == 401
+
+    def test_shows_profiled_routes(self, active_config, webapp_admin, redis_conn):
+        active_config.set("sql_profile_sample_rate", 1.0)
+        webapp_admin.get("/summary")
+
+        resp = webapp_admin.get("/dashboard/sql_profile")
+
+        assert resp.status_code == 200
+        assert "GET /summary" in resp.data.decode("utf8")
+
+    def test_reset_discards_profiles(self, active_config, webapp_admin, redis_conn):
+        active_config.set("sql_profile_sample_rate", 1.0)
+        webapp_admin.get("/summary")
+
+        webapp_admin.post("/dashboard/sql_profile/reset")
+        active_config.set("sql_profile_sample_rate", 0.0)
+        resp = webapp_admin.get("/dashboard/sql_profile")
+
+        assert "GET /summary" not in resp.data.decode("utf8")
+
+
 @pytest.mark.usefixtures("experiment_dir_merged")
 class TestDashboardHerokuRoutes(object):
     def test_requires_login(self, webapp):
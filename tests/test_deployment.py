@@ -8,6 +8,7 @@ import shutil
 import sys
 import tempfile
 import textwrap
+import threading
 import uuid
 from pathlib import Path
 
@@ -46,6 +47,7 @@ def faster(tempdir, active_config):
         "dallinger.deployment", time=mock.DEFAULT, setup_experiment=mock.DEFAULT
     ) as mocks:
         mocks["setup_experiment"].return_value = ("fake-uid", tempdir)
+        mocks["time"].monotonic.return_value = 0
         # setup_experiment normally sets the dashboard credentials if unset
         active_config.extend(
             {
@@ -643,6 +645,21 @@ class TestDeploySandboxSharedSetupNoExternalCalls(object):
         )
 
     def test_installs_addons(self, dsss, heroku_mock):
+        dsss(log=mock.Mock())
+        heroku_mock.addon.assert_has_calls(
+            [
+                mock.call("heroku-postgresql:standard-0"),
+                mock.call("heroku-redis:premium-0"),
+                mock.call("papertrail"),
+                mock.call("sentry"),
+            ],
+            any_order=True,
+        )
+
+    def test_installs_addons_in_order_when_sequential(
+        self, dsss, heroku_mock, active_config
+    ):
+        active_config.set("heroku_parallel_provisioning", False)
         dsss(log=mock.Mock())
         heroku_mock.addon.assert_has_calls(
             [
@@ -683,7 +700,8 @@ class TestDeploySandboxSharedSetupNoExternalCalls(object):
                 mock.call("web", 1, "free"),
                 mock.call("worker", 1, "free"),
                 mock.call("clock", 1, "free"),
-            ]
+            ],
+            any_order=True,
         )
 
     def test_scales_different_dynos(self, dsss, heroku_mock, active_config):
@@ -692,9 +710,25 @@ class TestDeploySandboxSharedSetupNoExternalCalls(object):
         active_config.set("dyno_type_worker", "massive")
         dsss(log=mock.Mock())
         heroku_mock.scale_up_dyno.assert_has_calls(
-            [mock.call("web", 1, "tiny"), mock.call("worker", 1, "massive")]
+            [mock.call("web", 1, "tiny"), mock.call("worker", 1, "massive")],
+            any_order=True,
         )
 
+    def test_pushes_after_saving_config(self, dsss, heroku_mock, fake_git):
+        dsss(log=mock.Mock())
+        git = fake_git.return_value
+        assert git.method_calls[-3:] == [
+            mock.call.add("config.txt"),
+            mock.call.commit("Save URLs for heroku addon management"),
+            mock.call.push(remote="heroku", branch="HEAD:master"),
+        ]
+
+    def test_logs_step_timings(self, dsss, heroku_mock):
+        log = mock.Mock()
+        dsss(log=log)
+        log.assert_any_call("✓ bootstrap (0.0s)", chevrons=False)
+        log.assert_any_call("✓ web dynos (0.0s)", chevrons=False)
+
     def test_calls_launch(self, dsss, heroku_mock, launch):
         log = mock.Mock()
         dsss(log=log)
@@ -716,6 +750,58 @@ class TestDeploySandboxSharedSetupNoExternalCalls(object):
         action.assert_called_once_with(heroku_mock, active_config)
 
 
+class TestProvisioningGraph(object):
+    @pytest.fixture
+    def graph(self):
+        from dallinger.deployment import ProvisioningGraph
+
+        return ProvisioningGraph(log=mock.Mock())
+
+    def test_runs_steps_after_their_requirements(self, graph):
+        order = []
+        both_started = threading.Barrier(2, timeout=5)
+
+        def step(name, concurrent=False):
+            def run():
+                if concurrent:
+                    both_started.wait()
+                order.append(name)
+
+            return run
+
+        graph.add("first", step("first"))
+        graph.add("left", step("left", concurrent=True), requires=["first"])
+        graph.add("right", step("right", concurrent=True), requires=["first"])
+        graph.add("last", step("last"), requires=["left", "right"])
+        graph.run()
+
+        assert order[0] == "first"
+        assert sorted(order[1:3]) == ["left", "right"]
+        assert order[3] == "last"
+
+    def test_runs_steps_in_order_when_sequential(self, graph):
+        order = []
+        for name in ["a", "b", "c"]:
+            graph.add(name, lambda name=name: order.append(name))
+        graph.run(parallel=False)
+
+        assert order == ["a", "b", "c"]
+
+    def test_raises_first_error_and_skips_dependent_steps(self, graph):
+        after = mock.Mock()
+        graph.add("broken", mock.Mock(side_effect=ValueError("boom")))
+        graph.add("after", after, requires=["broken"])
+
+        with raises(ValueError, match="boom"):
+            graph.run()
+        after.assert_not_called()
+        graph.log.assert_any_call("✗ broken failed", chevrons=False)
+
+    def test_rejects_unknown_requirements(self, graph):
+        with raises(ValueError):
+            graph.add("step", mock.Mock(), requires=["missing"])
+
+
 @pytest.mark.usefixtures("check_heroku")
 @pytest.mark.usefixtures("bartlett_dir", "active_config", "launch", "herokuapp")
 class TestDeploySandboxSharedSetupFullSystem(object):
@@ -1,5 +1,6 @@
 from pathlib import Path
 
+import pytest
 import yaml
 
 
@@ -86,3 +87,100 @@ def test_num_dynos():
     result = get_yaml({"num_dynos_worker": n})
     for i in range(n):
         assert f"worker_{i + 1}" in result["services"]
+
+
+def make_bundle(tempdir, monkeypatch):
+    """A fake Dallinger frontend, and a bundle of files copied from it and
+    from an experiment.
+    """
+    from dallinger.bundles import LINK_MIN_SIZE
+
+    monkeypatch.setenv("DALLINGER_BUNDLE_CACHE", str(Path(tempdir) / "cache"))
+    package = Path(tempdir) / "dallinger"
+    (package / "frontend" / "static" / "scripts").mkdir(parents=True)
+    (package / "frontend" / "static" / "scripts" / "dallinger2.js").write_text("core")
+    (package / "frontend" / "static" / "robots.txt").write_text("core")
+    monkeypatch.setattr(
+        "dallinger.docker.tools.dallinger_package_path", lambda: str(package)
+    )
+
+    bundle = Path(tempdir) / "bundle"
+    (bundle / "static" / "scripts").mkdir(parents=True)
+    (bundle / "static" / "scripts" / "dallinger2.js").write_text("core")
+    (bundle / "static" / "robots.txt").write_text("experiment")
+    (bundle / "static" / "stimulus.png").write_text("png")
+    (bundle / "video.mp4").write_bytes(b"x" * LINK_MIN_SIZE)
+    (bundle / "experiment.py").write_text("import dallinger")
+    (bundle / "requirements.txt").write_text("dallinger")
+    (bundle / "prepare_docker_image.sh").write_text("")
+    (bundle / "dallinger-10.0.0-py3-none-any.whl").write_text("wheel")
+    return bundle
+
+
+def test_split_image_layers(tempdir, monkeypatch):
+    from dallinger.docker.tools import split_image_layers
+
+    bundle = make_bundle(tempdir, monkeypatch)
+
+    assert split_image_layers(str(bundle)) == {
+        "dallinger": ["static/scripts/dallinger2.js"],
+        "assets": ["static/robots.txt", "static/stimulus.png", "video.mp4"],
+        "code": ["experiment.py"],
+    }
+
+
+def test_stage_build_context(tempdir, monkeypatch):
+    from dallinger.docker.tools import stage_build_context
+
+    bundle = make_bundle(tempdir, monkeypatch)
+    context = Path(tempdir) / "context"
+    context.mkdir()
+
+    stage_build_context(str(bundle), str(context))
+
+    assert (context / "requirements.txt").exists()
+    assert (context / "prepare_docker_image.sh").exists()
+    assert (context / "dallinger-10.0.0-py3-none-any.whl").exists()
+    assert (context / "layers" / "code" / "experiment.py").exists()
+    assert (
+        context / "layers" / "dallinger" / "static" / "scripts" / "dallinger2.js"
+    ).read_text() == "core"
+    assert not (context / "layers" / "code" / "requirements.txt").exists()
+
+
+def test_run_on_servers_groups_output_and_reports_failures(capsys):
+    import threading
+
+    from dallinger.command_line.docker_ssh import run_on_servers
+
+    both_started = threading.Barrier(2, timeout=5)
+
+    def deploy(server):
+        print(f"starting on {server}")
+        both_started.wait()
+        if server == "broken":
+            raise RuntimeError("no route to host")
+        print(f"finished on {server}")
+        return server.upper()
+
+    results = run_on_servers(["ok", "broken"], deploy, "Deploying to")
+
+    assert results["ok"].result == "OK"
+    assert str(results["broken"].error) == "no route to host"
+    output = capsys.readouterr().out
+    assert "starting on ok\nfinished on ok\n" in output
+    assert "1 of 2 succeeded" in output
+    assert "broken: no route to host" in output
+
+
+def test_raise_for_failures():
+    import click
+
+    from dallinger.bulk import BulkResult
+    from dallinger.command_line.docker_ssh import raise_for_failures
+
+    raise_for_failures({"ok": BulkResult(("ok",), {}, None, None)})
+    with pytest.raises(click.ClickException, match="broken"):
+        raise_for_failures(
+            {"broken": BulkResult(("broken",), {}, None, RuntimeError("oops"))}
+        )
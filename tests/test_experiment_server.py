@@ -622,6 +622,45 @@ class TestSimpleGETRoutes(object):
             assert b"Informed Consent Form" in resp.data
             normalizer.assert_called_once_with({"some_random_info": "1"})
 
+    def test_consent_rendered_once_for_all_participants(self, webapp, monkeypatch):
+        from dallinger.experiment_server import page_cache
+
+        monkeypatch.setattr(webapp.application.jinja_env, "auto_reload", False)
+        with mock.patch.object(
+            page_cache, "render_template", wraps=page_cache.render_template
+        ) as render:
+            first = webapp.get("/consent", query_string={"worker_id": "<1>"})
+            second = webapp.get("/consent", query_string={"worker_id": "2"})
+
+        assert render.call_count == 1
+        assert b"worker_id=&lt;1&gt;&" in first.data
+        assert b"worker_id=2&" in second.data
+        assert first.headers["Cache-Control"] == "no-cache"
+
+    def test_cached_page_returns_304_if_unchanged(self, webapp, monkeypatch):
+        monkeypatch.setattr(webapp.application.jinja_env, "auto_reload", False)
+        resp = webapp.get("/default")
+        etag = resp.headers["ETag"]
+
+        resp = webapp.get("/default", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    def test_page_cache_emptied_when_bundle_changes(self, webapp, monkeypatch):
+        from dallinger.experiment_server import page_cache
+
+        monkeypatch.setattr(webapp.application.jinja_env, "auto_reload", False)
+        webapp.get("/default")
+        with mock.patch.multiple(
+            page_cache,
+            manifest_signature=mock.Mock(return_value=[1, 2, 3]),
+            render_template=mock.Mock(wraps=page_cache.render_template),
+        ):
+            webapp.get("/default")
+            webapp.get("/default")
+            render = page_cache.render_template
+
+        assert render.call_count == 1
+
     def test_not_found(self, webapp):
         resp = webapp.get("/BOGUS")
         assert resp.status_code == 404
@@ -799,6 +838,47 @@ class TestParticipantCreateRoute(object):
 
         assert data.get("participant").get("status") == "overrecruited"
 
+    def test_overrecruits_once_quorum_is_reached(self, webapp):
+        from dallinger.experiment_server import experiment_server
+
+        load_experiment = experiment_server.Experiment
+
+        def experiment_with_quorum(args):
+            exp = load_experiment(args)
+            exp.quorum = 1
+            return exp
+
+        with mock.patch(
+            "dallinger.experiment_server.experiment_server.Experiment",
+            side_effect=experiment_with_quorum,
+        ):
+            first = webapp.post("/participant/1/1/1/debug").get_json()
+            second = webapp.post("/participant/2/1/2/debug").get_json()
+
+        assert first["participant"]["status"] == "working"
+        assert first["quorum"] == {"q": 1, "n": 1, "overrecruited": False}
+        assert second["participant"]["status"] == "overrecruited"
+        assert second["quorum"] == {"q": 1, "n": 2, "overrecruited": True}
+
+    def test_rejects_participant_with_known_fingerprint_when_live(self, a, webapp):
+        a.participant(worker_id="1", fingerprint_hash="fingerprint")
+        a.db.commit()
+
+        resp = webapp.post("/participant/2/2/2/live?fingerprint_hash=fingerprint")
+
+        assert resp.status_code == 403
+        assert b"Same participant" in resp.data
+
+    def test_replaces_working_participant_with_reused_assignment(self, a, webapp):
+        p = a.participant(worker_id="1", assignment_id="A")
+        a.db.commit()
+
+        with mock.patch("dallinger.experiment_server.experiment_server.q") as q:
+            resp = webapp.post("/participant/2/1/A/debug")
+
+        assert resp.status_code == 200
+        assert q.enqueue.call_args[0][1:] == ("AssignmentReassigned", None, p.id)
+
     def test_creates_participant_with_unknown_recruiter(self, webapp):
         worker_id = "1"
         hit_id = "1"
@@ -1008,6 +1088,45 @@ class TestSummaryRoute(object):
             "unfilled_networks": 1,
         }
 
+    def test_summary_ignores_failed_nodes(self, a, webapp):
+        network = a.star()
+        network.add_node(a.node(network=network, participant=a.participant()))
+        failed = a.node(network=network, participant=a.participant())
+        network.add_node(failed)
+        failed.fail()
+        network.calculate_full()
+
+        resp = webapp.get("/summary")
+        data = json.loads(resp.data)
+        assert data["unfilled_networks"] == 1
+        assert data["nodes_remaining"] == 1
+
+    def test_summary_returns_304_if_unchanged(self, a, webapp):
+        resp = webapp.get("/summary")
+        etag = resp.headers["ETag"]
+
+        resp = webapp.get("/summary", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+        a.participant()
+        resp = webapp.get("/summary", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert json.loads(resp.data)["summary"] == [["working", 1]]
+
+    def test_summary_is_cached_for_configured_ttl(
+        self, a, webapp, active_config, redis_conn
+    ):
+        active_config.extend({"summary_cache_ttl": 60.0})
+        webapp.get("/summary")
+        a.participant()
+
+        resp = webapp.get("/summary")
+        assert json.loads(resp.data)["summary"] == []
+
+        redis_conn.delete("summary")
+        resp = webapp.get("/summary")
+        assert json.loads(resp.data)["summary"] == [["working", 1]]
+
 
 @pytest.mark.usefixtures("experiment_dir")
 @pytest.mark.slow
@@ -1156,6 +1275,43 @@ class TestRequestParameter(object):
             assert b"unknown parameter type: bad_type" in result.data
 
 
+@pytest.mark.usefixtures("experiment_dir")
+class TestRequestParameters(object):
+    def test_returns_dict_of_parsed_values(self, test_request):
+        from dallinger.experiment_server.experiment_server import (
+            Parameter,
+            request_parameters,
+        )
+
+        schema = [
+            Parameter("foo", parameter_type="int"),
+            Parameter("bar", parameter_type="bool", default=False),
+            Parameter("baz", optional=True),
+        ]
+        with test_request("/robots.txt?foo=1"):
+            assert request_parameters(schema) == {"foo": 1, "bar": False, "baz": None}
+
+    def test_returns_first_error(self, test_request):
+        from dallinger.experiment_server.experiment_server import (
+            Parameter,
+            request_parameters,
+        )
+
+        schema = [Parameter("foo", parameter_type="int"), Parameter("bar")]
+        with test_request("/robots.txt?foo=bar"):
+            result = request_parameters(schema)
+            assert b"non-numeric foo: bar" in result.data
+
+    def test_shares_one_experiment_per_request(self, test_request):
+        from dallinger.experiment_server import experiment_server
+
+        with test_request("/robots.txt"):
+            assert (
+                experiment_server.request_experiment()
+                is experiment_server.request_experiment()
+            )
+
+
 @pytest.mark.usefixtures("experiment_dir", "db_session")
 @pytest.mark.slow
 class TestNodeRoutePOST(object):
@@ -1315,6 +1471,28 @@ class TestInfoRoutePOST(object):
             resp = webapp.post("/info/{}".format(node.id), data=data)
         assert b"/info POST server error" in resp.data
 
+    def test_loads_experiment_once_per_request(self, a, webapp):
+        from dallinger.experiment_server import experiment_server
+
+        node = a.node()
+        data = {
+            "contents": "foo",
+            "info_type": "Info",
+            "details": '{"key": "value"}',
+            "property1": "bar",
+        }
+        with mock.patch(
+            "dallinger.experiment_server.experiment_server.Experiment",
+            wraps=experiment_server.Experiment,
+        ) as mock_class:
+            for _ in range(3):
+                resp = webapp.post("/info/{}".format(node.id), data=data)
+                assert resp.status_code == 200
+        # One instance per request, plus one without a session per request
+        # for the protected route check.
+        assert [c[0] for c in mock_class.call_args_list].count((None,)) == 3
+        assert mock_class.call_count == 6
+
 
 @pytest.mark.usefixtures("experiment_dir", "db_session")
 @pytest.mark.slow
@@ -1336,6 +1514,41 @@ class TestTrackingEventRoutePOST(object):
         assert data["details"] == {"key": "value"}
 
 
+@pytest.mark.usefixtures("experiment_dir", "db_session")
+@pytest.mark.slow
+class TestTrackingEventsRoutePOST(object):
+    def test_queues_events(self, a, webapp, redis_conn):
+        from dallinger import tracking
+
+        node = a.node()
+        data = {"events": '[{"event": "click"}, {"event": "scroll"}]'}
+        resp = webapp.post("/tracking_events/{}".format(node.id), data=data)
+        data = json.loads(resp.data.decode("utf8"))
+        assert data["status"] == "success"
+        assert data["accepted"] == 2
+        assert tracking.pending() == 2
+
+    def test_rejects_events_which_are_not_a_list_of_objects(self, a, webapp):
+        node = a.node()
+        resp = webapp.post(
+            "/tracking_events/{}".format(node.id), data={"events": '{"a": 1}'}
+        )
+        assert resp.status_code == 400
+
+    def test_refuses_events_when_too_many_are_waiting(
+        self, a, webapp, redis_conn, monkeypatch
+    ):
+        from dallinger import tracking
+
+        monkeypatch.setattr(tracking, "MAX_PENDING", 1)
+        node = a.node()
+        resp = webapp.post(
+            "/tracking_events/{}".format(node.id), data={"events": "[{}, {}]"}
+        )
+        assert resp.status_code == 503
+        assert tracking.pending() == 0
+
+
 @pytest.mark.usefixtures("experiment_dir")
 @pytest.mark.slow
 class TestNodeNeighbors(object):
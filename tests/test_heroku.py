@@ -124,6 +124,44 @@ class TestHerokuClockTasks(object):
 
         recruiters.by_name.assert_called_once_with(participants[0].recruiter_id)
 
+    def test_overdue_participants_excludes_current_and_non_working(
+        self, a, active_config
+    ):
+        from dallinger.heroku.clock import overdue_participants
+
+        current = a.participant()
+        late = a.participant()
+        late_but_submitted = a.participant()
+        late_but_submitted.status = "submitted"
+        five_minutes_over = 60 * active_config.get("duration") + 5
+        for participant in (late, late_but_submitted):
+            participant.creation_time = datetime.datetime.now() - datetime.timedelta(
+                minutes=five_minutes_over
+            )
+
+        overdue = overdue_participants(active_config, datetime.datetime.now()).all()
+
+        assert overdue == [late]
+        assert current not in overdue
+
+    def test_check_db_for_missing_notifications_only_passes_overdue(
+        self, a, active_config, recruiters
+    ):
+        from dallinger.heroku.clock import check_db_for_missing_notifications
+
+        a.participant()
+        late = a.participant(recruiter_id="hotair")
+        five_minutes_over = 60 * active_config.get("duration") + 5
+        late.creation_time = datetime.datetime.now() - datetime.timedelta(
+            minutes=five_minutes_over
+        )
+
+        check_db_for_missing_notifications()
+
+        recruiters.by_name.assert_called_once_with("hotair")
+        notified = recruiters.by_name.return_value.notify_duration_exceeded
+        assert notified.call_args[0][0] == [late]
+
 
 class TestHerokuUtilFunctions(object):
     @pytest.fixture
@@ -0,0 +1,125 @@
+import mock
+import pytest
+import requests
+
+
+class TestHelpers(object):
+    def test_route_for_drops_ids(self):
+        from dallinger.loadtest import route_for
+
+        assert route_for("post", "http://host/info/12?x=1") == "POST /info"
+        assert (
+            route_for("post", "http://host/participant/w/h/a/debug?r=bots")
+            == "POST /participant"
+        )
+        assert route_for("get", "http://host/") == "GET /"
+
+    def test_think_time_sampler(self):
+        from dallinger.loadtest import think_time_sampler
+
+        assert think_time_sampler(0) is None
+        assert think_time_sampler(2, "constant")() == 2
+        assert 0 <= think_time_sampler(2, "uniform")() <= 4
+        assert think_time_sampler(2, "exponential")() >= 0
+        with pytest.raises(ValueError):
+            think_time_sampler(2, "bogus")
+
+
+class TestLoadStats(object):
+    def test_summary_by_route(self):
+        from dallinger.loadtest import LoadStats
+
+        stats = LoadStats()
+        for i in range(1, 11):
+            stats.record("GET /a", i / 1000.0, error=(i == 10))
+        stats.record("POST /b", 0.5)
+        stats.stop()
+
+        summary = stats.summary()
+        assert list(summary) == ["GET /a", "POST /b"]
+        assert summary["GET /a"]["requests"] == 10
+        assert summary["GET /a"]["errors"] == 1
+        assert summary["GET /a"]["error_rate"] == 0.1
+        assert summary["GET /a"]["p50_ms"] == pytest.approx(5)
+        assert summary["GET /a"]["p95_ms"] == pytest.approx(10)
+        assert summary["POST /b"]["max_ms"] == pytest.approx(500)
+
+
+class TestTimedSession(object):
+    @pytest.fixture
+    def session(self):
+        from dallinger.loadtest import LoadStats, TimedSession
+
+        session = TimedSession()
+        session.stats = LoadStats()
+        return session
+
+    def test_records_responses(self, session):
+        response = mock.Mock(status_code=500)
+        with mock.patch("requests.Session.request", return_value=response):
+            assert session.post("http://host/info/1") is response
+
+        assert session.stats.errors["POST /info"] == 1
+        assert len(session.stats.latencies["POST /info"]) == 1
+
+    def test_records_failed_requests_as_errors(self, session):
+        with mock.patch(
+            "requests.Session.request", side_effect=requests.ConnectionError
+        ):
+            with pytest.raises(requests.ConnectionError):
+                session.get("http://host/summary")
+
+        assert session.stats.errors["GET /summary"] == 1
+
+
+class TestLoadDriver(object):
+    @pytest.fixture
+    def bot_class(self):
+        from dallinger.bots import HighPerformanceBotBase
+
+        class FakeBot(HighPerformanceBotBase):
+            runs = []
+
+            def run_experiment(self):
+                if "fail" in self.URL:
+                    raise Exception("boom")
+                FakeBot.runs.append(self)
+                self.http.get("http://host/summary")
+
+        return FakeBot
+
+    def test_runs_every_bot_with_shared_settings(self, bot_class):
+        from dallinger.loadtest import LoadDriver
+
+        driver = LoadDriver(
+            bot_class,
+            "http://host/",
+            bots=5,
+            think_time=1,
+            think_distribution="constant",
+        )
+        with mock.patch(
+            "requests.Session.request", return_value=mock.Mock(status_code=200)
+        ):
+            driver.run()
+
+        assert len(bot_class.runs) == 5
+        assert len({bot.worker_id for bot in bot_class.runs}) == 5
+        for bot in bot_class.runs:
+            assert bot.http is driver.session
+            assert bot.think_time() == 1
+            assert bot.listen_for_quorum is False
+            assert bot.URL.startswith("http://host/ad?recruiter=bots&")
+
+        report = driver.report()
+        assert report["completed"] == 5
+        assert report["failed"] == 0
+        assert report["routes"]["GET /summary"]["requests"] == 5
+
+    def test_counts_failed_bots(self, bot_class):
+        from dallinger.loadtest import LoadDriver
+
+        driver = LoadDriver(bot_class, "http://host/fail", bots=3, arrival_rate=1000)
+        driver.run()
+
+        assert driver.report()["failed"] == 3
@@ -0,0 +1,143 @@
+import pytest
+
+
+@pytest.fixture
+def metrics(active_config, redis_conn):
+    from dallinger import metrics
+
+    active_config.set("enable_metrics", True)
+    return metrics
+
+
+@pytest.mark.usefixtures("db_session")
+class TestRender(object):
+    def test_counters(self, metrics):
+        metrics.inc("dallinger_clock_job_runs_total", job="check", outcome="success")
+        metrics.inc("dallinger_clock_job_runs_total", job="check", outcome="success")
+
+        text = metrics.render()
+
+        assert "# TYPE dallinger_clock_job_runs_total counter" in text
+        assert 'dallinger_clock_job_runs_total{job="check",outcome="success"} 2' in text
+
+    def test_histogram_buckets_are_cumulative(self, metrics):
+        metrics.record_job("high", "finished", 0.2)
+        metrics.record_job("high", "finished", 20)
+
+        lines = metrics.render().splitlines()
+
+        labels = 'queue="high",status="finished"'
+        assert (
+            'dallinger_job_duration_seconds_bucket{{{},le="0.1"}} 0'.format(labels)
+            in lines
+        )
+        assert (
+            'dallinger_job_duration_seconds_bucket{{{},le="0.25"}} 1'.format(labels)
+            in lines
+        )
+        assert (
+            'dallinger_job_duration_seconds_bucket{{{},le="+Inf"}} 2'.format(labels)
+            in lines
+        )
+        assert "dallinger_job_duration_seconds_sum{{{}}} 20.2".format(labels) in lines
+        assert "dallinger_job_duration_seconds_count{{{}}} 2".format(labels) in lines
+
+    def test_escapes_label_values(self, metrics):
+        metrics.inc("dallinger_clock_job_runs_total", job='say "hi"', outcome="error")
+        assert 'job="say \\"hi\\""' in metrics.render()
+
+    def test_experiment_gauges(self, metrics, a):
+        a.participant()
+        a.participant(worker_id="2").status = "approved"
+
+        text = metrics.render()
+
+        assert 'dallinger_queue_jobs{queue="high"} 0' in text
+        assert 'dallinger_participants{status="working"} 1' in text
+        assert 'dallinger_participants{status="approved"} 1' in text
+
+    def test_oldest_job_age(self, metrics, redis_conn):
+        from rq import Queue
+
+        Queue("low", connection=redis_conn).enqueue("time.sleep", 1)
+
+        text = metrics.render()
+
+        assert 'dallinger_queue_jobs{queue="low"} 1' in text
+        assert 'dallinger_queue_oldest_job_age_seconds{queue="high"} 0' in text
+        assert 'dallinger_queue_oldest_job_age_seconds{queue="low"}' in text
+
+    def test_job_wait(self, metrics):
+        metrics.record_job_wait("default", 3)
+
+        assert (
+            'dallinger_job_wait_seconds_bucket{queue="default",le="5"} 1'
+            in metrics.render()
+        )
+
+
+@pytest.mark.usefixtures("db_session")
+class TestProcessGauges(object):
+    def test_published_gauges_are_labelled_with_the_process(self, metrics):
+        metrics.publish_process_gauges(
+            "web", [("dallinger_websocket_clients", {"channel": "chat"}, 3)]
+        )
+
+        text = metrics.render()
+
+        process = metrics.process_name("web")
+        assert (
+            'dallinger_websocket_clients{{channel="chat",process="{}"}} 3'.format(
+                process
+            )
+            in text
+        )
+        assert 'dallinger_db_pool_size{{process="{}"}}'.format(process) in text
+
+    def test_publishing_is_rate_limited(self, metrics):
+        sample = 'dallinger_websocket_clients{{channel="chat",process="{}"}} {}'
+        process = metrics.process_name("web")
+        gauges = [("dallinger_websocket_clients", {"channel": "chat"}, 1)]
+        metrics.publish_process_gauges("web", gauges)
+        gauges = [("dallinger_websocket_clients", {"channel": "chat"}, 2)]
+        metrics.publish_process_gauges("web", gauges)
+        assert sample.format(process, 1) in metrics.render()
+
+        metrics.publish_process_gauges("web", gauges, force=True)
+        assert sample.format(process, 2) in metrics.render()
+
+    def test_expired_processes_are_forgotten(self, metrics, redis_conn):
+        metrics.publish_process_gauges("worker")
+        key = metrics.PROCESS_KEY.format(metrics.process_name("worker"))
+        redis_conn.delete(key)
+
+        assert "process=" not in metrics.render()
+        assert not redis_conn.smembers(metrics.PROCESSES_KEY)
+
+
+@pytest.mark.usefixtures("experiment_dir_merged")
+class TestMetricsRoute(object):
+    def test_requires_login(self, webapp):
+        assert webapp.get("/metrics").status_code == 401
+
+    def test_exports_request_latencies(self, metrics, webapp_admin):
+        webapp_admin.get("/summary")
+
+        resp = webapp_admin.get("/metrics")
+
+        assert resp.status_code == 200
+        assert resp.content_type == metrics.CONTENT_TYPE
+        assert (
+            'dallinger_request_duration_seconds_count{method="GET",'
+            'route="/summary",status="200"} 1'
+        ) in resp.data.decode("utf8")
+
+    def test_records_nothing_when_disabled(self, metrics, active_config, webapp_admin):
+        active_config.set("enable_metrics", False)
+        webapp_admin.get("/summary")
+
+        resp = webapp_admin.get("/metrics")
+
+        assert "dallinger_request_duration_seconds_count" not in resp.data.decode(
+            "utf8"
+        )
@@ -681,6 +681,85 @@ class TestModels(object):
         self.add(db_session, node)
         assert tuple(node.details["my_data"]) == (1, 2, 3)
 
+    def test_typed_property_stored_in_details(self, db_session):
+        net = models.Network()
+        db_session.add(net)
+        agent = Agent(network=net)
+        agent.fitness = 2
+        self.add(db_session, agent)
+
+        assert agent.fitness == 2.0
+        assert isinstance(agent.fitness, float)
+        assert agent.details == {"fitness": 2.0}
+        assert agent.property1 == "2.0"
+
+    def test_typed_property_defaults_when_unset(self, db_session):
+        net = models.Network()
+        db_session.add(net)
+        agent = Agent(network=net)
+        self.add(db_session, agent)
+
+        assert agent.fitness is None
+
+    def test_typed_property_orders_in_sql(self, db_session):
+        net = models.Network()
+        db_session.add(net)
+        agents = [Agent(network=net) for _ in range(3)]
+        for agent, fitness in zip(agents, [0.5, 2.5, 1.5]):
+            agent.fitness = fitness
+        self.add(db_session, *agents)
+
+        fittest = Agent.query.order_by(Agent.fitness.desc()).first()
+        assert fittest is agents[1]
+
+    def test_typed_property_reads_values_stored_in_its_column(self, db_session):
+        net = models.Network()
+        db_session.add(net)
+        old, new, unset = [Agent(network=net) for _ in range(3)]
+        old.property1 = "2.5"
+        new.fitness = 1.5
+        unset.property1 = "None"
+        self.add(db_session, old, new, unset)
+
+        assert old.fitness == 2.5
+        assert unset.fitness is None
+        fittest = Agent.query.filter(Agent.fitness > 1).order_by(Agent.fitness.desc())
+        assert fittest.all() == [old, new]
+
+    def test_typed_property_parses_booleans_stored_as_text(self, db_session):
+        from dallinger.networks import SplitSampleNetwork
+
+        net = SplitSampleNetwork()
+        net.property1 = "False"
+        net.details = {}
+        self.add(db_session, net)
+        assert net.exploratory is False
+
+        net.details = {"exploratory": "true"}
+        assert net.exploratory is True
+
+    def test_typed_property_nested_path(self, db_session):
+        class ScoredNode(models.Node):
+            __mapper_args__ = {"polymorphic_identity": "test_scored_node"}
+            score = models.typed_property(int, path=("scores", "total"))
+
+        net = models.Network()
+        db_session.add(net)
+        node = ScoredNode(network=net)
+        node.score = "3"
+        self.add(db_session, node)
+
+        assert node.details == {"scores": {"total": 3}}
+        assert ScoredNode.query.filter(ScoredNode.score > 2).one() is node
+
+    def test_typed_property_index_added_to_table(self):
+        table = Base.metadata.tables["node"]
+        assert "ix_node_details_fitness" in {index.name for index in table.indexes}
+
+    def test_typed_property_rejects_unknown_type(self):
+        with raises(TypeError):
+            models.typed_property(complex)
+
     ##################################################################
     # Participant
     ##################################################################
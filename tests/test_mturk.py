@@ -1179,6 +1179,44 @@ class TestMTurkServiceWithFakeConnection(object):
 
         assert execinfo.match("Failed to approve assignment fake_id")
 
+    def test_approve_assignments_runs_each_and_reports_failures(self, with_mock):
+        with_mock.mturk.configure_mock(
+            **{
+                "approve_assignment.side_effect": lambda AssignmentId: (
+                    response_metadata()
+                    if AssignmentId != "bad id"
+                    else {"unexpected": "response"}
+                )
+            }
+        )
+
+        results = with_mock.approve_assignments(["id 1", "bad id", "id 2"])
+
+        assert [r.args[0] for r in results] == ["id 1", "bad id", "id 2"]
+        assert [r.result for r in results] == [True, False, True]
+        assert with_mock.mturk.approve_assignment.call_count == 3
+
+    def test_assign_qualifications_retries_throttled_calls(self, with_mock):
+        throttled = ClientError(
+            {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+            "AssociateQualificationWithWorker",
+        )
+        with_mock.mturk.configure_mock(
+            **{
+                "associate_qualification_with_worker.side_effect": [
+                    throttled,
+                    response_metadata(),
+                ]
+            }
+        )
+        with_mock.executor.backoff = 0
+
+        results = with_mock.assign_qualifications("qid", ["some worker"], score=1)
+
+        assert results[0].error is None
+        assert results[0].result is True
+        assert with_mock.mturk.associate_qualification_with_worker.call_count == 2
+
     def test_create_qualification_type(self, with_mock):
         with_mock.mturk.configure_mock(
             **{
@@ -646,6 +646,29 @@ class TestDiscreteGenerational(object):
         for agent in first_generation:
             assert source not in agent.neighbors(direction="from")
 
+    def test_parent_selection_is_weighted_by_fitness(self, net):
+        nodes.RandomBinaryStringSource(network=net)
+        first_generation = []
+        for i in range(self.gen_size):
+            agent = GenerationalAgent(network=net)
+            agent.fitness = 1.0 if i == 2 else 0.0
+            net.add_node(agent)
+            first_generation.append(agent)
+
+        for _ in range(10):
+            parent = net._select_fit_node_from_generation(
+                node_type=GenerationalAgent, generation=0
+            )
+            assert parent is first_generation[2]
+
+    def test_parent_selection_from_empty_generation_returns_none(self, net):
+        assert (
+            net._select_fit_node_from_generation(
+                node_type=GenerationalAgent, generation=0
+            )
+            is None
+        )
+
     def test_assigns_generation_correctly_when_addition_non_agent_included(self, net):
         nodes.RandomBinaryStringSource(network=net)
         net.max_size += 1  # Necessary hack if you want to add another Node.
@@ -42,6 +42,7 @@ class TestSMTPMailer(object):
         orig_server = notifications.get_email_server
         notifications.get_email_server = mock.Mock(return_value=server)
         yield server
+        notifications.close_connections()
         notifications.get_email_server = orig_server
 
     @pytest.fixture
@@ -60,10 +61,43 @@ class TestSMTPMailer(object):
         smtp.starttls.assert_called()
         smtp.login.assert_called_once_with("username", "password")
         smtp.sendmail.assert_called_once()
-        smtp.quit.assert_called()
 
         assert len(mailer._sent) == 1
 
+    def test_reuses_connection(self, mailer, smtp):
+        from dallinger import notifications
+
+        for i in range(3):
+            mailer.send(
+                subject="Some subject",
+                sender="from@example.com",
+                recipients=["to@example.com"],
+                body="Message {}".format(i),
+            )
+        smtp.login.assert_called_once_with("username", "password")
+        assert smtp.sendmail.call_count == 3
+        smtp.quit.assert_not_called()
+
+        notifications.close_connections()
+        smtp.quit.assert_called_once()
+
+    def test_reconnects_when_the_server_drops_the_connection(self, mailer, smtp):
+        import smtplib
+
+        message = {
+            "subject": "Some subject",
+            "sender": "from@example.com",
+            "recipients": ["to@example.com"],
+            "body": "Some\nbody",
+        }
+        mailer.send(**message)
+        smtp.sendmail.side_effect = [smtplib.SMTPServerDisconnected(), {}]
+
+        mailer.send(**message)
+
+        assert smtp.login.call_count == 2
+        assert len(mailer._sent) == 2
+
     def test_wraps_mail_server_exceptions(self, mailer, smtp):
         import smtplib
 
@@ -90,6 +124,113 @@ class TestSMTPMailer(object):
         assert ex_info.match("Unknown error")
 
 
+class TestSMTPMailerWithServer(object):
+    def test_sends_messages_over_one_connection(self, smtp_server):
+        from dallinger.notifications import SMTPMailer
+
+        mailer = SMTPMailer(smtp_server.host, "username", "password", starttls=False)
+        for i in range(2):
+            mailer.send(
+                subject="Subject {}".format(i),
+                sender="from@example.com",
+                recipients=["to@example.com"],
+                body="Some\nbody",
+            )
+
+        assert smtp_server.connections == 1
+        assert [m[:2] for m in smtp_server.messages] == [
+            ("from@example.com", ["to@example.com"])
+        ] * 2
+        assert "Subject: Subject 1" in smtp_server.messages[1][2]
+
+
+@pytest.mark.usefixtures("redis_conn")
+class TestQueuedMailer(object):
+    @pytest.fixture
+    def notifications(self, active_config, monkeypatch):
+        from dallinger import notifications
+        from dallinger.notifications import LoggingMailer
+
+        mailer = LoggingMailer()
+        monkeypatch.setattr(notifications, "get_mailer", lambda config: mailer)
+        notifications.sent = mailer._sent
+        return notifications
+
+    def test_queues_messages_for_a_worker(self, notifications, redis_conn):
+        from rq import Queue
+
+        mailer = notifications.QueuedMailer()
+        mailer.send("Error", "from@example.com", ["to@example.com"], "Boom")
+        mailer.send("Error", "from@example.com", ["to@example.com"], "Boom")
+
+        assert redis_conn.llen(notifications.PENDING_KEY) == 2
+        assert Queue("low", connection=redis_conn).count == 1
+        assert notifications.sent == []
+
+    def test_send_queued_sends_digests(self, notifications, redis_conn):
+        mailer = notifications.QueuedMailer()
+        for body in ["Boom", "Boom", "Bang"]:
+            mailer.send("Error", "from@example.com", ["to@example.com"], body)
+
+        notifications.send_queued()
+
+        assert len(notifications.sent) == 1
+        assert "Subject: Error (3 notifications)" in notifications.sent[0]
+        assert "Sent 2 times:\n\nBoom" in notifications.sent[0]
+        assert not redis_conn.exists(notifications.PENDING_KEY)
+
+    def test_send_queued_schedules_the_next_digest(self, notifications, redis_conn):
+        from rq import Queue
+
+        mailer = notifications.QueuedMailer()
+        mailer.send("Error", "from@example.com", ["to@example.com"], "Boom")
+
+        notifications.send_queued()
+
+        queue = Queue("low", connection=redis_conn)
+        assert queue.scheduled_job_registry.count == 1
+        assert redis_conn.exists(notifications.DIGEST_SCHEDULED_KEY)
+
+        # Messages queued meanwhile wait for the scheduled job.
+        mailer.send("Error", "from@example.com", ["to@example.com"], "Bang")
+        assert queue.count == 1
+
+    def test_send_queued_releases_schedule_when_nothing_is_queued(
+        self, notifications, redis_conn
+    ):
+        from rq import Queue
+
+        redis_conn.set(notifications.DIGEST_SCHEDULED_KEY, 1)
+
+        notifications.send_queued()
+
+        assert notifications.sent == []
+        assert not redis_conn.exists(notifications.DIGEST_SCHEDULED_KEY)
+        queue = Queue("low", connection=redis_conn)
+        assert queue.scheduled_job_registry.count == 0
+
+
+class TestDigest(object):
+    def test_combines_messages_by_subject(self):
+        from dallinger.notifications import digest
+
+        def message(subject, body):
+            return {
+                "subject": subject,
+                "sender": "from@example.com",
+                "recipients": ["to@example.com"],
+                "body": body,
+            }
+
+        combined = digest(
+            [message("A", "one"), message("B", "two"), message("A", "three")]
+        )
+
+        assert [m["subject"] for m in combined] == ["A (2 notifications)", "B"]
+        assert combined[0]["body"] == "one\n\n----------\n\nthree"
+        assert combined[1]["body"] == "two"
+
+
 class TestMailerFactory(object):
     @pytest.fixture
     def factory(self):
@@ -146,6 +287,12 @@ class TestMessengerFactory(object):
         stub_config.extend({"mode": "sandbox", "dallinger_email_address": ""})
         assert isinstance(factory(stub_config).mailer, LoggingMailer)
 
+    def test_returns_queued_version_if_requested(self, factory, stub_config):
+        from dallinger.notifications import QueuedMailer
+
+        stub_config.extend({"mode": "sandbox"})
+        assert isinstance(factory(stub_config, queued=True).mailer, QueuedMailer)
+
 
 class TestNotifiesAdmin(object):
     @pytest.fixture
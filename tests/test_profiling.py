@@ -0,0 +1,122 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+
+
+class TestFingerprint(object):
+    @pytest.fixture
+    def fingerprint(self):
+        from dallinger.profiling import fingerprint
+
+        return fingerprint
+
+    def test_replaces_parameters(self, fingerprint):
+        assert (
+            fingerprint("SELECT * FROM node WHERE node.id = %(id_1)s")
+            == "SELECT * FROM node WHERE node.id = ?"
+        )
+
+    def test_replaces_literals(self, fingerprint):
+        assert (
+            fingerprint("SELECT * FROM info WHERE contents = 'it''s' LIMIT 10")
+            == "SELECT * FROM info WHERE contents = ? LIMIT ?"
+        )
+
+    def test_collapses_in_lists_and_whitespace(self, fingerprint):
+        assert (
+            fingerprint("SELECT *\n  FROM node WHERE id IN (%s, %s,  %s)")
+            == "SELECT * FROM node WHERE id IN (?)"
+        )
+
+    def test_keeps_numbered_identifiers(self, fingerprint):
+        assert fingerprint("SELECT property1 FROM node") == (
+            "SELECT property1 FROM node"
+        )
+
+
+class TestQueryProfile(object):
+    def test_groups_statements_by_fingerprint(self):
+        from dallinger.profiling import QueryProfile
+
+        profile = QueryProfile("GET /node")
+        profile.record("SELECT 1 FROM node WHERE id = %(id)s", 0.001)
+        profile.record("SELECT 1 FROM node WHERE id = %(id)s", 0.002)
+        profile.record("SELECT 1 FROM info", 0.01)
+
+        assert profile.statements == 3
+        assert profile.db_time == pytest.approx(0.013)
+        assert profile.by_fingerprint() == [
+            ("SELECT ? FROM info", 1, pytest.approx(0.01)),
+            ("SELECT ? FROM node WHERE id = ?", 2, pytest.approx(0.003)),
+        ]
+
+
+@pytest.mark.usefixtures("db_session")
+class TestProfiling(object):
+    @pytest.fixture
+    def profiling(self, active_config, redis_conn):
+        from dallinger import profiling
+
+        active_config.set("sql_profile_sample_rate", 1.0)
+        yield profiling
+        profiling.finish()
+
+    def test_does_nothing_when_disabled(self, profiling, active_config):
+        active_config.set("sql_profile_sample_rate", 0.0)
+        assert profiling.start("GET /") is None
+        assert profiling.finish() is None
+
+    def test_counts_statements(self, profiling, db_session):
+        profiling.start("GET /")
+        db_session.execute(text("SELECT 1"))
+        db_session.execute(text("SELECT 1"))
+        profile = profiling.finish()
+
+        assert profile.statements >= 2
+        assert profiling.current() is None
+
+    def test_nested_profiles_count_towards_the_outer(self, profiling):
+        outer = profiling.start("GET /")
+        assert profiling.start("worker_function:TrackingEvent") is None
+        assert profiling.current() is outer
+
+    def test_aggregates_route_stats(self, profiling, db_session):
+        for _ in range(2):
+            profiling.start("GET /")
+            db_session.execute(text("SELECT 1"))
+            profiling.finish()
+
+        [stats] = profiling.route_stats()
+        assert stats["name"] == "GET /"
+        assert stats["count"] == 2
+        assert stats["slow"] == 0
+        assert stats["mean_statements"] >= 1
+        assert "SELECT ?" in [fp for fp, ms in stats["top_statements"]]
+
+    def test_logs_slow_profiles(self, profiling, active_config, db_session, caplog):
+        active_config.set("sql_profile_max_statements", 1)
+        profiling.start("GET /")
+        db_session.execute(text("SELECT 1"))
+
+        with caplog.at_level(logging.WARNING):
+            profiling.finish()
+
+        assert "GET /:" in caplog.text
+        assert "SELECT ?" in caplog.text
+        assert profiling.route_stats()[0]["slow"] == 1
+
+    def test_reset(self, profiling, db_session):
+        profiling.start("GET /")
+        profiling.finish()
+        profiling.reset()
+
+        assert profiling.route_stats() == []
+
+    def test_profiled_names_jobs_after_their_first_argument(self, profiling):
+        @profiling.profiled
+        def job(event_type):
+            return profiling.current().name
+
+        assert job("TrackingEvent") == "job:TrackingEvent"
+        assert profiling.current() is None
@@ -1,3 +1,7 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import mock
 import pytest
 
@@ -89,7 +93,7 @@ def test_requests_are_logged(subject):
     with mock.patch("dallinger.prolific.logger") as logger:
         subject.who_am_i()
 
-    logger.warning.assert_called_once_with(
+    logger.debug.assert_called_once_with(
         'Prolific API request: {"URL": "https://api.prolific.co/api/v1/users/me/", "method": "GET", "args": {}}'
     )
 
@@ -114,3 +118,161 @@ def test_can_add_to_available_place_count(subject):
 
     assert updated["total_available_places"] == initial_spaces + 1
     assert subject.delete_study(study_id=result["id"])
+
+
+class FakeProlificHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def respond(self, status, body):
+        data = json.dumps(body).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length)) if length else None
+        path = self.path[len("/api/v1") :]
+        self.server.requests.append((self.command, path, payload))
+        if self.server.failures:
+            status = self.server.failures.pop(0)
+            return self.respond(status, {"error": {"detail": "Try again"}})
+        if path.startswith("/submissions/bonus-payments/"):
+            return self.respond(
+                201, {"id": "bonus-{}".format(len(self.server.requests))}
+            )
+        if path.endswith("/transition/"):
+            return self.respond(200, {"status": "APPROVED"})
+        if path.startswith("/submissions/"):
+            status = "AWAITING REVIEW"
+            if self.server.statuses:
+                status = self.server.statuses.pop(0)
+            return self.respond(200, {"status": status})
+        return self.respond(200, {})
+
+    do_GET = do_POST = do_PATCH = do_DELETE = handle_request
+
+
+@pytest.fixture
+def fake_prolific():
+    """A local stand-in for the Prolific API, which records ``requests`` as
+    ``(method, path, payload)`` tuples and first responds with the statuses
+    listed in ``failures``, then gives submissions the ``statuses`` listed
+    before they await review.
+    """
+    server = ThreadingHTTPServer(("localhost", 0), FakeProlificHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.failures = []
+    server.statuses = []
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local_subject(fake_prolific):
+    from dallinger.prolific import ProlificService
+
+    return ProlificService(
+        api_token="fake-token",
+        api_version="v1",
+        referer_header="https://github.com/Dallinger/Dallinger/tests",
+        api_host="http://localhost:{}".format(fake_prolific.server_address[1]),
+        max_concurrency=2,
+        backoff=0.01,
+    )
+
+
+class TestProlificServiceAgainstFakeServer(object):
+    def test_reuses_connections(self, local_subject, fake_prolific):
+        for _ in range(3):
+            local_subject.get_participant_session("abc123")
+
+        assert len(fake_prolific.requests) == 3
+        assert fake_prolific.connections == 1
+
+    def test_retries_rate_limited_requests(self, local_subject, fake_prolific):
+        fake_prolific.failures = [429, 429]
+
+        result = local_subject.pay_session_bonus("study", "worker", 1.5)
+
+        assert result == {}
+        assert [r[1] for r in fake_prolific.requests] == [
+            "/submissions/bonus-payments/"
+        ] * 3 + ["/bulk-bonus-payments/bonus-3/pay/"]
+
+    def test_does_not_retry_server_errors_on_posts(self, local_subject, fake_prolific):
+        from dallinger.prolific import ProlificServiceException
+
+        fake_prolific.failures = [503]
+
+        with pytest.raises(ProlificServiceException):
+            local_subject.pay_session_bonus("study", "worker", 1.5)
+        assert len(fake_prolific.requests) == 1
+
+    def test_retries_server_errors_on_gets(self, local_subject, fake_prolific):
+        fake_prolific.failures = [503, 502]
+
+        result = local_subject.get_participant_session("abc123")
+
+        assert result == {"status": "AWAITING REVIEW"}
+        assert len(fake_prolific.requests) == 3
+
+    def test_approves_sessions_in_bulk(self, local_subject, fake_prolific):
+        results = local_subject.approve_participant_sessions(["a1", "a2", "a3"])
+
+        assert [r.result for r in results] == [{"status": "APPROVED"}] * 3
+        assert [r.error for r in results] == [None] * 3
+        assert fake_prolific.connections <= 2
+
+    def test_approval_waits_for_submission(self, local_subject, fake_prolific):
+        from dallinger.prolific import ProlificService
+
+        fake_prolific.statuses = ["ACTIVE", "ACTIVE"]
+        with mock.patch.object(
+            ProlificService.approve_participant_session.retry, "sleep"
+        ):
+            result = local_subject.approve_participant_session("abc123")
+
+        assert result == {"status": "APPROVED"}
+        assert [r[0] for r in fake_prolific.requests] == ["GET"] * 3 + ["POST"]
+
+    def test_approval_retries_rate_limits_only_once(self, local_subject, fake_prolific):
+        from dallinger.prolific import ProlificService, ProlificServiceException
+
+        fake_prolific.failures = [429] * 30
+        with mock.patch.object(
+            ProlificService.approve_participant_session.retry, "sleep"
+        ) as sleep:
+            with pytest.raises(ProlificServiceException):
+                local_subject.approve_participant_session("abc123")
+
+        assert len(fake_prolific.requests) == local_subject.max_attempts
+        sleep.assert_not_called()
+
+    def test_pays_bonuses_in_batches(self, local_subject, fake_prolific):
+        local_subject.BONUS_BATCH_SIZE = 2
+        bonuses = [("w1", 1), ("w2", 2.5), ("w3", 0.25)]
+
+        results = local_subject.pay_session_bonuses("study", bonuses)
+
+        assert [r.args[1] for r in results] == [bonuses[:2], bonuses[2:]]
+        setups = sorted(
+            r[2]["csv_bonuses"]
+            for r in fake_prolific.requests
+            if r[1] == "/submissions/bonus-payments/"
+        )
+        assert setups == ["w1,1.00\nw2,2.50", "w3,0.25"]
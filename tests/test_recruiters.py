@@ -46,6 +46,37 @@ class TestModuleFunctions(object):
     def test_by_name_with_invalid_name(self, mod):
         assert mod.by_name("blah") is None
 
+    def test_by_name_shares_instances(self, mod, active_config):
+        assert mod.by_name("bots") is mod.by_name("BotRecruiter")
+
+    def test_by_name_with_kwargs_returns_new_instance(self, mod, active_config):
+        shared = mod.by_name("prolific")
+        assert mod.by_name("prolific", store=mock.Mock()) is not shared
+
+    def test_by_name_replaces_instances_when_config_changes(self, mod, active_config):
+        from dallinger import config
+
+        shared = mod.by_name("bots")
+        config.config = config.Configuration()
+        assert mod.by_name("bots") is not shared
+
+    def test_by_name_replaces_instances_when_config_values_change(
+        self, mod, active_config
+    ):
+        shared = mod.by_name("bots")
+        assert mod.by_name("bots") is shared
+
+        active_config.set("mode", "sandbox")
+        assert mod.by_name("bots") is not shared
+
+    def test_by_name_sees_recruiters_defined_after_first_lookup(self, mod):
+        assert mod.by_name("custom") is None
+
+        class CustomRecruiter(mod.CLIRecruiter):
+            nickname = "custom"
+
+        assert isinstance(mod.by_name("custom"), CustomRecruiter)
+
     def test_for_debug_mode(self, mod, stub_config):
         r = mod.from_config(stub_config)
         assert isinstance(r, mod.HotAirRecruiter)
@@ -724,6 +755,30 @@ class TestRedisStore(object):
         redis_store.set("some key", "some value")
         assert redis_store.get("some key") == "some value"
 
+    def test_clear_removes_stored_keys(self, redis_store):
+        redis_store.set("some key", "some value")
+        redis_store.clear()
+        assert redis_store.get("some key") is None
+
+    def test_clear_cost_independent_of_unrelated_keys(self, redis_store, redis_conn):
+        def commands_to_clear():
+            redis_store.set("some key", "some value")
+            with mock.patch.object(
+                redis_conn, "execute_command", wraps=redis_conn.execute_command
+            ) as execute:
+                redis_store.clear()
+            return [call[0][0] for call in execute.call_args_list]
+
+        without_unrelated_keys = commands_to_clear()
+
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for i in range(10):
+                pipe.set("unrelated:{}".format(i), i)
+            pipe.execute()
+
+        assert commands_to_clear() == without_unrelated_keys == ["UNLINK"]
+        assert redis_conn.get("unrelated:0") == b"0"
+
 
 @pytest.fixture
 def queue():
@@ -744,6 +799,7 @@ def requests():
 
 @pytest.fixture
 def mturkservice(active_config, fake_parsed_hit):
+    from dallinger.bulk import BulkExecutor
     from dallinger.mturk import MTurkService
 
     mturk = mock.create_autospec(
@@ -758,6 +814,11 @@ def mturkservice(active_config, fake_parsed_hit):
         return {"id": "QualificationType id", "name": name, "description": description}
 
     mturk.check_credentials.return_value = True
+    # The real bulk lookup, running the fake get_assignment for each ID.
+    mturk.executor = BulkExecutor(max_workers=2)
+    mturk.get_assignments.side_effect = lambda assignment_ids: (
+        MTurkService.get_assignments(mturk, assignment_ids)
+    )
     mturk.create_hit.return_value = fake_parsed_hit
     mturk.create_qualification_type.side_effect = create_qual
     mturk.get_hits.return_value = iter([])
@@ -1208,9 +1269,15 @@ class TestMTurkRecruiter(object):
         assert requests.patch.call_args[1]["data"] == '{"auto_recruit": "false"}'
 
     def test_treats_mturk_exception_as_status_none(self, a, recruiter):
-        recruiter.mturkservice.get_assignment.side_effect = Exception("Boom!")
+        from dallinger.mturk import MTurkService
+
+        service = MTurkService("fake key", "fake secret", "us-east-1")
+        service.mturk = mock.Mock()
+        service.mturk.get_assignment.side_effect = Exception("Boom!")
+        recruiter.mturkservice = service
 
-        assert recruiter._mturk_status_for(mock.Mock()) is None
+        assert recruiter._mturk_statuses_for([mock.Mock()]) == [None]
+        service.mturk.get_assignment.assert_called_once()
 
     def test_sends_notification_missing_if_no_status_from_mturk(
         self, a, recruiter, queue
@@ -1275,6 +1342,10 @@ class TestRedisTally(object):
         redis_tally.increment(3)
         assert redis_tally.current == 3
 
+    def test_increment_returns_new_total(self, redis_tally):
+        assert redis_tally.increment(3) == 3
+        assert redis_tally.increment(2) == 5
+
 
 @pytest.mark.usefixtures("active_config")
 class TestMTurkLargeRecruiter(object):
@@ -1286,6 +1357,7 @@ class TestMTurkLargeRecruiter(object):
 
             def increment(self, count):
                 self._count += count
+                return self._count
 
             @property
             def current(self):
@@ -0,0 +1,156 @@
+import mock
+import pytest
+
+
+@pytest.fixture
+def worker_module():
+    # Importing the module patches the standard library for gevent, which
+    # the worker process wants but the test process doesn't.
+    with mock.patch("gevent.monkey.patch_all"):
+        from dallinger.heroku import rq_gevent_worker
+    return rq_gevent_worker
+
+
+@pytest.fixture
+def make_worker(worker_module, redis_conn):
+    from rq import Queue
+
+    def make(**kwargs):
+        queues = [
+            Queue(name, connection=redis_conn) for name in ("high", "default", "low")
+        ]
+        return worker_module.GeventWorker(queues, connection=redis_conn, **kwargs)
+
+    return make
+
+
+def complete(limit, jobs, seconds, db_available=True):
+    for _ in range(jobs):
+        limit.record(seconds, db_available)
+
+
+class TestQueueLimit(object):
+    def test_fixed_limit_is_the_maximum(self, worker_module):
+        limit = worker_module.QueueLimit(10, initial=4)
+        complete(limit, 40, 1.0)
+
+        assert limit.limit == 10
+
+    def test_grows_while_reached_and_latency_holds(self, worker_module):
+        limit = worker_module.QueueLimit(10, initial=4, adaptive=True, window=2)
+        limit.saturated = True
+        complete(limit, 2, 1.0)
+        assert limit.limit == 5
+
+        complete(limit, 2, 1.0)
+        assert limit.limit == 5
+
+    def test_does_not_grow_past_maximum(self, worker_module):
+        limit = worker_module.QueueLimit(5, initial=5, adaptive=True, window=2)
+        limit.saturated = True
+        complete(limit, 2, 1.0)
+
+        assert limit.limit == 5
+
+    def test_shrinks_when_latency_degrades(self, worker_module):
+        limit = worker_module.QueueLimit(10, initial=8, adaptive=True, window=2)
+        complete(limit, 2, 1.0)
+        limit.saturated = True
+        complete(limit, 2, 10.0)
+
+        assert limit.limit == 6
+
+    def test_shrinks_when_database_connections_run_out(self, worker_module):
+        limit = worker_module.QueueLimit(10, initial=8, adaptive=True, window=2)
+        limit.saturated = True
+        complete(limit, 2, 1.0, db_available=False)
+
+        assert limit.limit == 6
+
+
+class TestGeventWorker(object):
+    def test_default_reservation(self, make_worker):
+        assert make_worker().reservations == {"high": 2}
+
+    def test_default_reservation_fits_small_pools(self, make_worker):
+        assert make_worker(pool_size=2).reservations == {"high": 1}
+        assert make_worker(pool_size=1).reservations == {}
+
+    def test_configured_reservations_must_fit_pool(self, make_worker):
+        with pytest.raises(ValueError):
+            make_worker(pool_size=2, queue_reservations={"high": 2})
+
+    def test_available_queues_keep_reserved_slots_free(self, make_worker):
+        worker = make_worker(pool_size=3)
+        with mock.patch.object(worker.gevent_pool, "free_count", return_value=2):
+            assert [q.name for q in worker.available_queues()] == ["high"]
+
+            worker.active["high"] = 1
+            assert [q.name for q in worker.available_queues()] == [
+                "high",
+                "default",
+                "low",
+            ]
+
+    def test_available_queues_respect_queue_limits(self, make_worker):
+        worker = make_worker(queue_pool_sizes={"low": 1})
+        worker.active["low"] = 1
+
+        assert [q.name for q in worker.available_queues()] == ["high", "default"]
+        assert worker.queue_limits["low"].saturated
+
+    def test_available_queues_sampled_by_weight(self, make_worker, worker_module):
+        worker = make_worker(queue_weights={"high": 1, "default": 0, "low": 4})
+        with mock.patch.object(worker_module.random, "random", return_value=0.5):
+            assert [q.name for q in worker.available_queues()] == [
+                "low",
+                "high",
+                "default",
+            ]
+
+    def test_waits_for_capacity_with_heartbeat_timeout(self, make_worker):
+        worker = make_worker()
+        with mock.patch.multiple(
+            worker,
+            available_queues=mock.Mock(side_effect=[[], worker.queues]),
+            capacity_freed=mock.DEFAULT,
+            maybe_heartbeat=mock.DEFAULT,
+        ) as patched:
+            with mock.patch.object(
+                worker.queue_class, "dequeue_any", return_value=None
+            ):
+                assert worker.dequeue_job_and_maintain_ttl(None) is None
+
+        patched["capacity_freed"].wait.assert_called_once_with(
+            timeout=worker.HEARTBEAT_INTERVAL
+        )
+        assert patched["maybe_heartbeat"].call_count == 3
+
+    def test_heartbeats_at_most_once_per_interval(self, make_worker, worker_module):
+        worker = make_worker()
+        with mock.patch.object(worker_module, "time") as clock:
+            with mock.patch.object(worker, "heartbeat") as heartbeat:
+                heartbeat.side_effect = lambda: setattr(
+                    worker, "last_heartbeat", clock.monotonic()
+                )
+                clock.monotonic.return_value = 100
+                worker.maybe_heartbeat()
+                clock.monotonic.return_value = 100 + worker.HEARTBEAT_INTERVAL - 1
+                worker.maybe_heartbeat()
+                assert heartbeat.call_count == 1
+
+                clock.monotonic.return_value = 100 + worker.HEARTBEAT_INTERVAL
+                worker.maybe_heartbeat()
+                assert heartbeat.call_count == 2
+
+    def test_starts_scheduler_when_asked(self, make_worker):
+        worker = make_worker()
+        with mock.patch.multiple(
+            worker,
+            _install_signal_handlers=mock.DEFAULT,
+            _start_scheduler=mock.DEFAULT,
+            dequeue_job_and_maintain_ttl=mock.Mock(return_value=None),
+        ) as patched:
+            worker.work(burst=True, with_scheduler=True)
+
+        patched["_start_scheduler"].assert_called_once_with(True, mock.ANY)
@@ -0,0 +1,132 @@
+import mock
+import pytest
+
+
+@pytest.fixture
+def tracking(db_session, redis_conn):
+    from dallinger import tracking
+
+    return tracking
+
+
+class TestTracking(object):
+    def test_append_queues_events_without_inserting(self, a, tracking):
+        from dallinger.information import TrackingEvent
+
+        node = a.node()
+
+        assert tracking.append(node.id, [{"event": "click"}, {"event": "scroll"}])
+        assert tracking.pending() == 2
+        assert TrackingEvent.query.count() == 0
+
+    def test_drain_inserts_events(self, a, tracking):
+        from dallinger.information import TrackingEvent
+
+        node = a.node()
+        node_id, network_id = node.id, node.network_id
+        tracking.append(node_id, [{"event": "click"}, {"event": "scroll"}])
+
+        tracking.drain()
+
+        events = TrackingEvent.query.order_by(TrackingEvent.id).all()
+        assert [e.details for e in events] == [{"event": "click"}, {"event": "scroll"}]
+        assert events[0].origin_id == node_id
+        assert events[0].network_id == network_id
+        assert tracking.pending() == 0
+
+    def test_drain_inserts_in_batches(self, a, tracking):
+        from dallinger.information import TrackingEvent
+
+        node = a.node()
+        tracking.append(node.id, [{"n": i} for i in range(25)])
+
+        assert tracking.insert_batch(size=10) == 10
+        assert tracking.pending() == 15
+        tracking.drain()
+
+        assert TrackingEvent.query.count() == 25
+
+    def test_drain_hands_on_events_left_after_its_time(
+        self, a, tracking, redis_conn, monkeypatch
+    ):
+        from rq import Queue
+
+        from dallinger.information import TrackingEvent
+
+        node = a.node()
+        tracking.append(node.id, [{"n": i} for i in range(25)])
+        monkeypatch.setattr(tracking, "INSERT_BATCH", 10)
+        monkeypatch.setattr(tracking, "DRAIN_SECONDS", 0)
+
+        tracking.drain()
+
+        assert TrackingEvent.query.count() == 10
+        assert tracking.pending() == 15
+        jobs = Queue("low", connection=redis_conn).jobs
+        assert len(jobs) == 2
+        assert jobs[-1].timeout == tracking.DRAIN_TIMEOUT
+
+    def test_drops_batches_that_fail_to_insert(self, a, tracking):
+        node = a.node()
+        tracking.append(node.id, [{}, {}])
+
+        with mock.patch.object(
+            tracking.db.session, "commit", side_effect=RuntimeError("Boom!")
+        ):
+            with pytest.raises(RuntimeError):
+                tracking.insert_batch()
+
+        assert tracking.pending() == 0
+
+    def test_discards_events_for_missing_or_failed_nodes(self, a, tracking):
+        from dallinger.information import TrackingEvent
+
+        node_id = a.node().id
+        failed = a.node()
+        failed.fail()
+        a.db.commit()
+        tracking.append(node_id, [{}])
+        tracking.append(failed.id, [{}])
+        tracking.append(999, [{}])
+
+        tracking.drain()
+
+        assert [e.origin_id for e in TrackingEvent.query.all()] == [node_id]
+        assert tracking.pending() == 0
+
+    def test_refuses_events_when_too_many_are_waiting(self, a, tracking, monkeypatch):
+        node = a.node()
+        monkeypatch.setattr(tracking, "MAX_PENDING", 3)
+        assert tracking.append(node.id, [{}, {}])
+
+        assert not tracking.append(node.id, [{}, {}])
+        assert tracking.pending() == 2
+
+    def test_schedules_one_drain_at_a_time(self, a, tracking, redis_conn):
+        from rq import Queue
+
+        node = a.node()
+        tracking.append(node.id, [{}])
+        tracking.append(node.id, [{}])
+
+        assert Queue("low", connection=redis_conn).count == 1
+
+    def test_counts_outcomes(self, a, active_config, tracking):
+        from dallinger import metrics
+
+        active_config.set("enable_metrics", True)
+        node = a.node()
+        tracking.append(node.id, [{}, {}], dropped=3)
+        tracking.append(999, [{}])
+        tracking.drain()
+
+        text = metrics.render()
+
+        for outcome, events in [
+            ("accepted", 3),
+            ("dropped", 3),
+            ("inserted", 2),
+            ("invalid", 1),
+        ]:
+            sample = 'dallinger_tracking_events_total{{outcome="{}"}} {}'
+            assert sample.format(outcome, events) in text
@@ -326,3 +326,21 @@ def test_check_experiment_dependencies_unsuccessful():
             str(e.value)
             == "Please install the 'NOTINSTALLED' package to run this experiment."
         )
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert utils.percentile(values, 50) == 50
+    assert utils.percentile(values, 99) == 99
+    assert utils.percentile(values, 100) == 100
+    assert utils.percentile([3], 95) == 3
+    assert utils.percentile([], 50) is None
+
+
+def test_latency_percentiles_in_milliseconds():
+    latencies = [n / 1000.0 for n in range(1, 101)]
+    assert list(utils.latency_percentiles(latencies).items()) == [
+        ("p50_ms", 50.0),
+        ("p95_ms", 95.0),
+        ("p99_ms", 99.0),
+    ]
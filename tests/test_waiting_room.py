@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import mock
+import pytest
+
+
+@pytest.fixture
+def waiting_room(db_session, redis_conn):
+    from dallinger import waiting_room
+
+    return waiting_room
+
+
+class TestWaitingRoom(object):
+    def test_admit_counts_participants(self, waiting_room):
+        assert waiting_room.admit("worker 1") == 1
+        assert waiting_room.admit("worker 2") == 2
+
+    def test_admitting_again_does_not_count_twice(self, waiting_room):
+        waiting_room.admit("worker 1")
+        assert waiting_room.admit("worker 1") == 1
+
+    def test_concurrent_sign_ups_get_distinct_counts(self, waiting_room):
+        quorum = 100
+
+        with ThreadPoolExecutor(max_workers=50) as pool:
+            counts = list(
+                pool.map(
+                    waiting_room.admit, ["worker {}".format(i) for i in range(500)]
+                )
+            )
+
+        assert sorted(counts) == list(range(1, 501))
+        assert len([n for n in counts if n > quorum]) == 400
+
+    def test_first_admission_counts_existing_participants(self, a, waiting_room):
+        a.participant(worker_id="working")
+        a.participant(worker_id="submitted").status = "submitted"
+        a.participant(worker_id="returned").status = "returned"
+        a.db.commit()
+
+        assert waiting_room.admit("new") == 3
+
+    def test_reconcile_removes_failed_participants(self, a, waiting_room):
+        p = a.participant(worker_id="quitter")
+        a.db.commit()
+        waiting_room.admit("quitter")
+
+        p.status = "returned"
+        a.db.commit()
+        waiting_room.reconcile()
+
+        assert waiting_room.admit("new") == 1
+
+    def test_reconcile_keeps_recent_uncommitted_sign_ups(self, waiting_room):
+        waiting_room.admit("signing up")
+        waiting_room.reconcile()
+
+        assert waiting_room.admit("new") == 2
+
+    def test_reconcile_removes_stale_uncommitted_sign_ups(
+        self, waiting_room, redis_conn
+    ):
+        redis_conn.zadd(waiting_room.NONFAILED_KEY, {"rolled back": 0})
+        waiting_room.reconcile()
+
+        assert waiting_room.admit("new") == 1
+
+    def test_reset(self, waiting_room):
+        waiting_room.admit("worker 1")
+        waiting_room.reset()
+
+        assert waiting_room.admit("worker 2") == 1
+
+    def test_init_db_resets_only_for_the_apps_database(self, waiting_room):
+        from dallinger import db
+
+        with mock.patch.multiple(
+            db.Base.metadata, drop_all=mock.DEFAULT, create_all=mock.DEFAULT
+        ):
+            with mock.patch.object(waiting_room, "reset") as reset:
+                db.init_db(drop_all=True, bind=mock.Mock())
+                reset.assert_not_called()
+
+                db.init_db(drop_all=True)
+                reset.assert_called_once_with()